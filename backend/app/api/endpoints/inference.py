@@ -0,0 +1,116 @@
+from fastapi import APIRouter, HTTPException, Depends, status
+from typing import Any, Dict, List
+from pydantic import BaseModel
+from app.core.config import settings
+from app.core.security import get_current_user
+from app.api.endpoints.model import get_model_record, resolve_model_path
+from app.ml.frameworks.registry import configure_handler, get_handler
+from app.ml.inference.batcher import batcher_pool as batchers
+import asyncio
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Pydantic Models
+class PredictionRequest(BaseModel):
+    instances: List[Any]
+
+class PredictionResponse(BaseModel):
+    model_id: str
+    predictions: List[Any]
+
+# Serving loads map weights from the page cache instead of copying them per worker
+SERVING_LOAD_OPTIONS: Dict[str, Dict[str, Any]] = {
+    "pytorch": {"mmap": True},
+    "scikit-learn": {"mmap_mode": "r"}
+}
+
+configure_handler(
+    "pytorch",
+    compile_mode=settings.PYTORCH_COMPILE_MODE,
+    trust_pickled_models=settings.PYTORCH_TRUST_PICKLED_MODELS
+)
+configure_handler(
+    "onnx",
+    intra_op_threads=settings.ONNX_INTRA_OP_THREADS,
+    inter_op_threads=settings.ONNX_INTER_OP_THREADS,
+    optimization_level=settings.ONNX_GRAPH_OPTIMIZATION
+)
+configure_handler(
+    "tensorflow",
+    intra_op_threads=settings.TENSORFLOW_INTRA_OP_THREADS,
+    inter_op_threads=settings.TENSORFLOW_INTER_OP_THREADS
+)
+
+batchers.configure(
+    max_batch_size=settings.INFERENCE_MAX_BATCH_SIZE,
+    max_wait_ms=settings.INFERENCE_MAX_WAIT_MS
+)
+
+def make_predict_fn(model_id: str, framework: str, path: str, digest: str):
+    """Build the batch predict function of a model, loading it through the model cache"""
+    handler = get_handler(framework)
+    load_options = SERVING_LOAD_OPTIONS.get(framework, {})
+
+    def predict_fn(rows: List[Any]) -> List[Any]:
+        model = handler.load_cached(path, key=model_id, version=digest, **load_options)
+        return handler.predict_batch(model, rows)
+
+    return predict_fn
+
+def to_jsonable(output: Any) -> Any:
+    return output.tolist() if hasattr(output, "tolist") else output
+
+@router.post("/predict/{model_id}", response_model=PredictionResponse)
+async def predict(
+    model_id: str,
+    request: PredictionRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Run predictions for one or more instances.
+    Each instance joins the model's request queue and is batched together with
+    concurrent requests into a single predict call.
+    """
+    if not request.instances:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one instance is required"
+        )
+
+    record = get_model_record(model_id)
+    path = resolve_model_path(model_id)
+
+    try:
+        batcher = batchers.get(
+            model_id,
+            make_predict_fn(model_id, record["framework"], path, record["sha256"])
+        )
+        outputs = await asyncio.gather(*(batcher.submit(row) for row in request.instances))
+        return PredictionResponse(
+            model_id=model_id,
+            predictions=[to_jsonable(output) for output in outputs]
+        )
+
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Prediction failed for model {model_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Prediction failed: {str(e)}"
+        )
+
+@router.get("/stats")
+async def get_batching_stats(current_user: dict = Depends(get_current_user)):
+    """
+    Batch counts and average batch size per model
+    """
+    return batchers.stats()
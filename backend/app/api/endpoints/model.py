@@ -1,7 +1,22 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, status
+from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, Header, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Dict, Optional, Any
 from pydantic import BaseModel
+from app.core.config import settings
 from app.core.security import get_current_user
+from app.api.utils.uploads import (
+    UploadSessionStore, UploadTooLargeError, UploadOffsetError,
+    hash_file, iter_upload_file, stream_to_file
+)
+from app.api.utils.blob_store import BlobStore
+from app.api.utils.model_index import ModelIndex, SORTABLE_FIELDS
+from app.ml.frameworks.model_cache import model_cache
+from app.ml.inference.batcher import batcher_pool
+from app.ml.frameworks.onnx_export import DEFAULT_OPSET, export_in_subprocess
+from app.api.utils.downloads import (
+    FileRangeResponse, RangeNotSatisfiableError, plan_download
+)
+import hashlib
 import os
 import logging
 from datetime import datetime
@@ -27,18 +42,55 @@ class ModelResponse(BaseModel):
     created_at: str
     last_modified: Optional[str] = None
     size: Optional[int] = None
+    sha256: Optional[str] = None
+
+class ModelListResponse(BaseModel):
+    items: List[ModelResponse]
+    next_cursor: Optional[str] = None
+
+class OnnxExportRequest(BaseModel):
+    input_shape: List[int]
+    opset: Optional[int] = DEFAULT_OPSET
 
 class ModelUpdateRequest(BaseModel):
     info: Optional[ModelInfo] = None
     status: Optional[str] = None
 
+class UploadSessionRequest(BaseModel):
+    filename: str
+    total_size: Optional[int] = None
+
+class UploadSessionResponse(BaseModel):
+    upload_id: str
+    filename: str
+    offset: int
+    total_size: Optional[int] = None
+    chunk_size: int
+    created_at: str
+
 # Constants
-ALLOWED_FRAMEWORKS = ["pytorch", "tensorflow", "scikit-learn"]
-ALLOWED_EXTENSIONS = [".pt", ".pth", ".h5", ".keras", ".pkl", ".joblib"]
+ALLOWED_FRAMEWORKS = ["pytorch", "tensorflow", "scikit-learn", "onnx"]
+ALLOWED_EXTENSIONS = [".pt", ".pth", ".safetensors", ".h5", ".keras", ".pkl", ".joblib", ".onnx"]
 MODEL_STORAGE_PATH = "models"
-
-# Ensure model storage directory exists
-os.makedirs(MODEL_STORAGE_PATH, exist_ok=True)
+UPLOAD_STAGING_PATH = os.path.join(MODEL_STORAGE_PATH, ".uploads")
+
+# Opened at startup (see init_model_storage), importing the module touches no files
+blob_store: Optional[BlobStore] = None
+model_index: Optional[ModelIndex] = None
+upload_sessions: Optional[UploadSessionStore] = None
+
+def init_model_storage() -> None:
+    """Open the model stores, moving in model files uploaded before the blob store"""
+    global blob_store, model_index, upload_sessions
+    os.makedirs(MODEL_STORAGE_PATH, exist_ok=True)
+    blob_store = BlobStore(MODEL_STORAGE_PATH)
+    imported = blob_store.import_files(MODEL_STORAGE_PATH, ALLOWED_EXTENSIONS)
+    if imported:
+        logger.info(f"Imported {imported} model files into the blob store")
+    model_index = ModelIndex(os.path.join(MODEL_STORAGE_PATH, "index.sqlite3"))
+    model_index.sync(blob_store)
+    model_cache.resize(settings.MODEL_CACHE_MAX_BYTES)
+    upload_sessions = UploadSessionStore(UPLOAD_STAGING_PATH, chunk_size=settings.UPLOAD_CHUNK_SIZE)
 
 def validate_model_file(filename: str) -> bool:
     """Validate model file extension"""
@@ -48,6 +100,96 @@ def get_file_size(file_path: str) -> int:
     """Get file size in bytes"""
     return os.path.getsize(file_path)
 
+def get_model_record(model_id: str) -> Dict[str, Any]:
+    """Look up a model in the metadata index, raising 404 if it is unknown"""
+    record = model_index.get(model_id)
+    if record is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Model {model_id} not found"
+        )
+    return record
+
+def record_to_response(record: Dict[str, Any]) -> ModelResponse:
+    return ModelResponse(
+        id=record["id"],
+        info=ModelInfo(
+            name=record["name"],
+            framework=record["framework"],
+            params=record["params"],
+            description=record["description"],
+            version=record["version"]
+        ),
+        status=record["status"],
+        created_at=record["created_at"],
+        last_modified=record["last_modified"],
+        size=record["size"],
+        sha256=record["sha256"]
+    )
+
+def resolve_model_path(model_id: str) -> str:
+    """Resolve a model ID through the blob store, raising 404 if it is unknown"""
+    file_path = blob_store.resolve(model_id)
+    if file_path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Model {model_id} not found"
+        )
+    return file_path
+
+def validate_model_info(model_info: ModelInfo, filename: str) -> None:
+    """Validate framework and file extension of an incoming model"""
+    if model_info.framework not in ALLOWED_FRAMEWORKS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Framework must be one of {ALLOWED_FRAMEWORKS}"
+        )
+
+    if not validate_model_file(filename):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File must have one of these extensions: {ALLOWED_EXTENSIONS}"
+        )
+
+async def store_model_file(
+    staged_path: str,
+    filename: str,
+    model_info: ModelInfo,
+    file_size: int,
+    digest: str
+) -> ModelResponse:
+    """Move a fully staged upload into the content-addressed model store"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    extension = os.path.splitext(filename)[1]
+
+    unique_filename = f"{model_info.name}_{timestamp}{extension}"
+    suffix = 1
+    while blob_store.resolve(unique_filename) is not None:
+        unique_filename = f"{model_info.name}_{timestamp}_{suffix}{extension}"
+        suffix += 1
+
+    deduplicated = await run_in_threadpool(blob_store.put, staged_path, digest, unique_filename)
+
+    if deduplicated:
+        logger.info(f"Model {unique_filename} uploaded successfully (deduplicated blob {digest[:12]})")
+    else:
+        logger.info(f"Model {unique_filename} uploaded successfully")
+
+    record = {
+        **model_info.dict(),
+        "id": unique_filename,
+        "status": "uploaded",
+        "size": file_size,
+        "sha256": digest,
+        "created_at": datetime.now().isoformat(),
+        "last_modified": None
+    }
+    model_index.upsert(record)
+    return record_to_response(record)
+
+def upload_session_response(session: Dict) -> UploadSessionResponse:
+    return UploadSessionResponse(chunk_size=settings.UPLOAD_CHUNK_SIZE, **session)
+
 @router.post("/upload", response_model=ModelResponse)
 async def upload_model(
     file: UploadFile = File(...),
@@ -55,93 +197,236 @@ async def upload_model(
     current_user: dict = Depends(get_current_user)
 ):
     """
-    Upload a new model file with metadata
+    Upload a new model file with metadata.
+    The file is streamed to disk in UPLOAD_CHUNK_SIZE chunks and hashed on the way.
+    Uploads are stored as is: PyTorch checkpoints saved with torch.save since 1.6
+    use the zipfile format and are memory-mapped at load time, legacy ones can be
+    rewritten offline with PyTorchHandler.convert_for_mmap before uploading.
+    PyTorch models are served and trained from TorchScript archives (torch.jit.save);
+    .safetensors and other state dicts are stored but have no architecture to run.
     """
+    staged_path = None
     try:
-        # Validate framework
-        if model_info.framework not in ALLOWED_FRAMEWORKS:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Framework must be one of {ALLOWED_FRAMEWORKS}"
-            )
+        validate_model_info(model_info, file.filename)
+
+        staged_path = os.path.join(UPLOAD_STAGING_PATH, f"{os.urandom(16).hex()}.part")
+        hasher = hashlib.sha256()
+        file_size = await stream_to_file(
+            iter_upload_file(file, settings.UPLOAD_CHUNK_SIZE),
+            staged_path,
+            settings.MAX_MODEL_SIZE,
+            hasher=hasher,
+            chunk_size=settings.UPLOAD_CHUNK_SIZE
+        )
 
-        # Validate file extension
-        if not validate_model_file(file.filename):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"File must have one of these extensions: {ALLOWED_EXTENSIONS}"
-            )
+        response = await store_model_file(
+            staged_path, file.filename, model_info, file_size, hasher.hexdigest()
+        )
+        staged_path = None
+        return response
 
-        # Create unique filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        unique_filename = f"{model_info.name}_{timestamp}{os.path.splitext(file.filename)[1]}"
-        file_path = os.path.join(MODEL_STORAGE_PATH, unique_filename)
+    except HTTPException:
+        raise
+    except UploadTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error uploading model: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+    finally:
+        if staged_path and os.path.exists(staged_path):
+            os.remove(staged_path)
 
-        # Save file
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+@router.post("/uploads", response_model=UploadSessionResponse)
+async def create_upload_session(
+    request: UploadSessionRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Start a resumable upload session
+    """
+    if not validate_model_file(request.filename):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File must have one of these extensions: {ALLOWED_EXTENSIONS}"
+        )
+    if request.total_size is not None and request.total_size > settings.MAX_MODEL_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Upload exceeds maximum size of {settings.MAX_MODEL_SIZE} bytes"
+        )
+
+    expired = upload_sessions.purge_expired(settings.UPLOAD_SESSION_TTL)
+    if expired:
+        logger.info(f"Purged {expired} expired upload sessions")
+
+    session = upload_sessions.create(request.filename, request.total_size)
+    logger.info(f"Upload session {session['upload_id']} created for {request.filename}")
+    return upload_session_response(session)
 
-        # Get file size
-        file_size = get_file_size(file_path)
+@router.get("/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def get_upload_session(
+    upload_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get the current offset of an upload session, used to resume after a dropped connection
+    """
+    session = upload_sessions.get(upload_id)
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Upload session {upload_id} not found"
+        )
+    return upload_session_response(session)
 
-        response = ModelResponse(
-            id=unique_filename,
-            info=model_info,
-            status="uploaded",
-            created_at=datetime.now().isoformat(),
-            size=file_size
+@router.put("/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def append_upload_chunk(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0, description="Byte offset this chunk starts at"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Append the raw request body to an upload session at the given offset
+    """
+    try:
+        session = await upload_sessions.append(
+            upload_id, request.stream(), offset, settings.MAX_MODEL_SIZE
         )
+        return upload_session_response(session)
 
-        logger.info(f"Model {unique_filename} uploaded successfully")
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Upload session {upload_id} not found"
+        )
+    except UploadOffsetError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    except UploadTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+
+@router.post("/uploads/{upload_id}/complete", response_model=ModelResponse)
+async def complete_upload_session(
+    upload_id: str,
+    model_info: ModelInfo = Depends(),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Finalize an upload session and register the model
+    """
+    session = upload_sessions.get(upload_id)
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Upload session {upload_id} not found"
+        )
+    validate_model_info(model_info, session["filename"])
+    if session["total_size"] is not None and session["offset"] != session["total_size"]:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload incomplete: {session['offset']} of {session['total_size']} bytes received"
+        )
+
+    staged_path = None
+    try:
+        staged_path, file_size, digest = await upload_sessions.finalize(upload_id)
+        response = await store_model_file(
+            staged_path, session["filename"], model_info, file_size, digest
+        )
+        staged_path = None
         return response
 
     except Exception as e:
-        logger.error(f"Error uploading model: {str(e)}")
+        logger.error(f"Error completing upload {upload_id}: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
+    finally:
+        if staged_path and os.path.exists(staged_path):
+            os.remove(staged_path)
+
+@router.delete("/uploads/{upload_id}")
+async def abort_upload_session(
+    upload_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Abort an upload session and discard the received data
+    """
+    if not upload_sessions.abort(upload_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Upload session {upload_id} not found"
+        )
+    return {"message": f"Upload session {upload_id} aborted"}
 
-@router.get("/list", response_model=List[ModelResponse])
+@router.post("/gc")
+async def collect_garbage(current_user: dict = Depends(get_current_user)):
+    """
+    Remove blobs that are no longer referenced by any model
+    """
+    removed, freed = await run_in_threadpool(blob_store.gc)
+    logger.info(f"Garbage collection removed {removed} blobs ({freed} bytes)")
+    return {"blobs_removed": removed, "bytes_freed": freed}
+
+@router.get("/cache/stats")
+async def get_cache_stats(current_user: dict = Depends(get_current_user)):
+    """
+    Hit, miss and eviction counters of the in-process loaded-model cache
+    """
+    return model_cache.stats()
+
+@router.get("/list", response_model=ModelListResponse)
 async def list_models(
     framework: Optional[str] = None,
+    model_status: Optional[str] = Query(None, alias="status"),
+    sort_by: str = Query("created_at", description=f"One of {SORTABLE_FIELDS}"),
+    order: str = Query("asc", description="Sort order ('asc' or 'desc')"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     current_user: dict = Depends(get_current_user)
 ):
     """
-    List all available models with optional framework filter
+    List models from the metadata index with optional filters and cursor pagination
     """
-    try:
-        models = []
-        for filename in os.listdir(MODEL_STORAGE_PATH):
-            if not validate_model_file(filename):
-                continue
-
-            file_path = os.path.join(MODEL_STORAGE_PATH, filename)
-            file_stats = os.stat(file_path)
-
-            # Extract model info from filename
-            name_parts = os.path.splitext(filename)[0].split('_')
-            model_name = name_parts[0]
-            
-            model = ModelResponse(
-                id=filename,
-                info=ModelInfo(
-                    name=model_name,
-                    framework="auto-detected",
-                    version="1.0"
-                ),
-                status="available",
-                created_at=datetime.fromtimestamp(file_stats.st_ctime).isoformat(),
-                last_modified=datetime.fromtimestamp(file_stats.st_mtime).isoformat(),
-                size=file_stats.st_size
-            )
-
-            if framework is None or model.info.framework == framework:
-                models.append(model)
+    if sort_by not in SORTABLE_FIELDS or order not in ("asc", "desc"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"sort_by must be one of {SORTABLE_FIELDS} and order 'asc' or 'desc'"
+        )
 
-        return models
+    try:
+        records, next_cursor = model_index.page(
+            framework=framework,
+            status=model_status,
+            sort_by=sort_by,
+            descending=order == "desc",
+            limit=limit,
+            cursor=cursor
+        )
+        return ModelListResponse(
+            items=[record_to_response(record) for record in records],
+            next_cursor=next_cursor
+        )
 
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error listing models: {str(e)}")
         raise HTTPException(
@@ -158,29 +443,7 @@ async def get_model(
     Get details of a specific model
     """
     try:
-        file_path = os.path.join(MODEL_STORAGE_PATH, model_id)
-        if not os.path.exists(file_path):
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Model {model_id} not found"
-            )
-
-        file_stats = os.stat(file_path)
-        name_parts = os.path.splitext(model_id)[0].split('_')
-        model_name = name_parts[0]
-
-        return ModelResponse(
-            id=model_id,
-            info=ModelInfo(
-                name=model_name,
-                framework="auto-detected",
-                version="1.0"
-            ),
-            status="available",
-            created_at=datetime.fromtimestamp(file_stats.st_ctime).isoformat(),
-            last_modified=datetime.fromtimestamp(file_stats.st_mtime).isoformat(),
-            size=file_stats.st_size
-        )
+        return record_to_response(get_model_record(model_id))
 
     except HTTPException:
         raise
@@ -191,23 +454,120 @@ async def get_model(
             detail=str(e)
         )
 
+@router.api_route("/{model_id}/download", methods=["GET", "HEAD"])
+async def download_model(
+    model_id: str,
+    request: Request,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_none_match: Optional[str] = Header(None),
+    if_range: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Download a model file, with support for Range requests and ETag revalidation.
+    The ETag is the content sha256, so it is stable across re-uploads of the same artifact.
+    """
+    record = get_model_record(model_id)
+    file_path = resolve_model_path(model_id)
+    file_size = os.path.getsize(file_path)
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="{model_id}"'
+    }
+    etag = f'"{record["sha256"]}"' if record["sha256"] else None
+    if etag:
+        headers["ETag"] = etag
+    try:
+        status_code, start, end = plan_download(file_size, etag, range_header, if_none_match, if_range)
+    except RangeNotSatisfiableError:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail=f"Range {range_header} not satisfiable",
+            headers={"Content-Range": f"bytes */{file_size}"}
+        )
+
+    if status_code == status.HTTP_304_NOT_MODIFIED:
+        return Response(status_code=status_code, headers=headers)
+    if status_code == status.HTTP_206_PARTIAL_CONTENT:
+        headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+
+    return FileRangeResponse(
+        file_path,
+        start,
+        end,
+        status_code=status_code,
+        headers=headers,
+        send_body=request.method != "HEAD",
+        chunk_size=settings.UPLOAD_CHUNK_SIZE
+    )
+
+@router.post("/{model_id}/export/onnx", response_model=ModelResponse)
+async def export_model_to_onnx(
+    model_id: str,
+    request: OnnxExportRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Export a PyTorch, Keras or scikit-learn model to ONNX and register it as a new model
+    """
+    record = get_model_record(model_id)
+    if record["framework"] == "onnx":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Model {model_id} is already an ONNX model"
+        )
+    path = resolve_model_path(model_id)
+
+    staged_path = os.path.join(UPLOAD_STAGING_PATH, f"{os.urandom(16).hex()}.onnx")
+    try:
+        await run_in_threadpool(
+            export_in_subprocess, record["framework"], path, request.input_shape, staged_path, request.opset
+        )
+        digest = await run_in_threadpool(hash_file, staged_path, settings.UPLOAD_CHUNK_SIZE)
+        model_info = ModelInfo(
+            name=record["name"],
+            framework="onnx",
+            params={"source_model_id": model_id, "input_shape": request.input_shape, "opset": request.opset},
+            description=record["description"],
+            version=record["version"]
+        )
+        response = await store_model_file(
+            staged_path, f"{record['name']}.onnx", model_info, os.path.getsize(staged_path), digest
+        )
+        staged_path = None
+        return response
+
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error exporting model {model_id} to ONNX: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+    finally:
+        if staged_path and os.path.exists(staged_path):
+            os.remove(staged_path)
+
 @router.delete("/{model_id}")
 async def delete_model(
     model_id: str,
     current_user: dict = Depends(get_current_user)
 ):
     """
-    Delete a model file
+    Delete a model reference; the underlying blob is removed once no other model references it
     """
     try:
-        file_path = os.path.join(MODEL_STORAGE_PATH, model_id)
-        if not os.path.exists(file_path):
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Model {model_id} not found"
-            )
+        get_model_record(model_id)
 
-        os.remove(file_path)
+        await run_in_threadpool(blob_store.delete, model_id)
+        model_index.delete(model_id)
+        model_cache.invalidate(model_id)
+        batcher_pool.remove(model_id)
         logger.info(f"Model {model_id} deleted successfully")
         
         return {"message": f"Model {model_id} deleted successfully"}
@@ -231,33 +591,21 @@ async def update_model(
     Update model metadata
     """
     try:
-        file_path = os.path.join(MODEL_STORAGE_PATH, model_id)
-        if not os.path.exists(file_path):
+        get_model_record(model_id)
+
+        changes = update_data.info.dict(exclude_unset=True) if update_data.info else {}
+        if update_data.status:
+            changes["status"] = update_data.status
+
+        record = model_index.update(model_id, changes)
+        if record is None:
+            # Deleted since it was looked up
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Model {model_id} not found"
             )
-
-        file_stats = os.stat(file_path)
-        name_parts = os.path.splitext(model_id)[0].split('_')
-        model_name = name_parts[0]
-
-        current_info = ModelInfo(
-            name=model_name,
-            framework="auto-detected",
-            version="1.0"
-        )
-
-        updated_info = current_info.copy(update=update_data.info.dict(exclude_unset=True)) if update_data.info else current_info
-
-        return ModelResponse(
-            id=model_id,
-            info=updated_info,
-            status=update_data.status or "available",
-            created_at=datetime.fromtimestamp(file_stats.st_ctime).isoformat(),
-            last_modified=datetime.now().isoformat(),
-            size=file_stats.st_size
-        )
+        logger.info(f"Model {model_id} updated successfully")
+        return record_to_response(record)
 
     except HTTPException:
         raise
@@ -266,4 +614,4 @@ async def update_model(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
-        )
\ No newline at end of file
+        )
@@ -1,8 +1,16 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, status
+from fastapi.responses import StreamingResponse
 from typing import Dict, Any, Optional, List
 from pydantic import BaseModel
+from app.core.config import settings
 from app.core.security import get_current_user
-from app.ml.training.hyperparameter import HyperparameterTuner
+from app.api.utils.job_events import JobEventBroadcaster
+from app.api.utils.job_store import JobStore, new_job_id, process_owner
+from app.api.endpoints import model as models
+from app.ml.training.scheduler import SchedulerFullError, TrainingScheduler
+from app.ml.training.tasks import train_model_task
+import json
+import os
 import time
 import logging
 
@@ -16,8 +24,11 @@ router = APIRouter()
 class TrainingConfig(BaseModel):
     model_id: str
     dataset_path: str
+    validation_dataset_path: Optional[str] = None
     hyperparameters: Dict[str, Any]
     framework: Optional[str] = None
+    priority: int = 0
+    resume_from_job: Optional[str] = None
 
 class TrainingJob(BaseModel):
     job_id: str
@@ -25,91 +36,195 @@ class TrainingJob(BaseModel):
     progress: float
     metrics: Optional[Dict[str, float]] = None
     error_message: Optional[str] = None
+    priority: int = 0
+    queue_position: Optional[int] = None
+    submitted_at: Optional[float] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    wait_time: Optional[float] = None
+    run_time: Optional[float] = None
+
+class TrainingJobListResponse(BaseModel):
+    items: List[TrainingJob]
+    next_cursor: Optional[str] = None
 
 class TrainingResponse(BaseModel):
     job_id: str
     status: str
     message: str
 
-# Storage for active training jobs
-active_jobs: Dict[str, TrainingJob] = {}
-
 # Training Status Enum
 TRAINING_STATUS = {
     "INITIALIZED": "initialized",
+    "QUEUED": "queued",
     "RUNNING": "running",
     "COMPLETED": "completed",
-    "FAILED": "failed"
+    "FAILED": "failed",
+    "CANCELLED": "cancelled"
 }
 
-def train_model_task(job_id: str, config: TrainingConfig):
-    """
-    Background task for model training
-    """
-    try:
-        logger.info(f"Starting training job {job_id}")
-        active_jobs[job_id].status = TRAINING_STATUS["RUNNING"]
-        
-        # Initialize tuner
-        tuner = HyperparameterTuner(model=None, dataset=None)
-        
-        # Simulate training progress
-        total_steps = 10
-        for i in range(total_steps):
-            if job_id not in active_jobs:
-                logger.warning(f"Job {job_id} was cancelled")
-                return
-                
-            time.sleep(1)  # Simulate work
-            progress = (i + 1) / total_steps
-            active_jobs[job_id].progress = progress
-            logger.info(f"Job {job_id} progress: {progress:.2%}")
-        
-        # Update job with completion status and metrics
-        active_jobs[job_id].status = TRAINING_STATUS["COMPLETED"]
-        active_jobs[job_id].metrics = {
-            "accuracy": 0.95,
-            "loss": 0.05,
-            "validation_accuracy": 0.93,
-            "validation_loss": 0.07
-        }
-        logger.info(f"Job {job_id} completed successfully")
-        
-    except Exception as e:
-        error_msg = str(e)
-        logger.error(f"Training failed for job {job_id}: {error_msg}")
-        active_jobs[job_id].status = TRAINING_STATUS["FAILED"]
-        active_jobs[job_id].error_message = error_msg
+STREAM_KEEPALIVE_INTERVAL = 15.0  # seconds
+
+FINAL_STATUSES = [TRAINING_STATUS["COMPLETED"], TRAINING_STATUS["FAILED"], TRAINING_STATUS["CANCELLED"]]
+
+# Job records are shared by every API worker through the job store, opened at startup
+TRAINING_STORAGE_PATH = "training"
+job_store: Optional[JobStore] = None
+
+def init_job_store() -> None:
+    """Open the job store and fail the jobs of API processes that are gone"""
+    global job_store
+    os.makedirs(TRAINING_STORAGE_PATH, exist_ok=True)
+    job_store = JobStore(os.path.join(TRAINING_STORAGE_PATH, "jobs.sqlite3"))
+    job_store.recover_orphans()
+
+def checkpoint_dir(job_id: str) -> str:
+    return os.path.join(TRAINING_STORAGE_PATH, "checkpoints", job_id)
+
+def latest_job_checkpoint(job_id: str) -> Optional[str]:
+    # torch is only imported when a job is resumed
+    from app.ml.training.checkpoint import latest_checkpoint
+    return latest_checkpoint(checkpoint_dir(job_id))
+
+def apply_job_update(job_id: str, changes: Dict[str, Any]) -> None:
+    """Apply changes reported by the scheduler or a training worker to a job"""
+    record = job_store.get(job_id)
+    if record is None:
+        return
+    cancelled = TRAINING_STATUS["CANCELLED"]
+    if record["status"] != cancelled and job_store.update(job_id, changes, unless_status=cancelled):
+        job_events.notify(job_id)
+        return
+    # Cancelled through another API worker, stop the worker that runs it here
+    scheduler.cancel(job_id)
+
+def claim_training_slot(job_id: str) -> bool:
+    """Take one of the MAX_TRAINING_JOBS slots shared by every API worker for a queued job"""
+    if job_store.claim(job_id, settings.MAX_TRAINING_JOBS):
+        return True
+    record = job_store.get(job_id)
+    if record is None or record["status"] != TRAINING_STATUS["QUEUED"]:
+        # Cancelled through another API worker while it was queued here
+        scheduler.dequeue(job_id)
+    return False
+
+def get_job(job_id: str) -> TrainingJob:
+    record = job_store.get(job_id)
+    if record is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Training job {job_id} not found"
+        )
+    return record_to_job(record)
+
+def record_to_job(record: Dict[str, Any]) -> TrainingJob:
+    return TrainingJob(
+        job_id=record["id"],
+        **{field: record[field] for field in [
+            "status", "progress", "metrics", "error_message", "priority",
+            "submitted_at", "started_at", "finished_at"
+        ]}
+    )
+
+# Fields sent to streaming clients when they change
+STREAM_FIELDS = ["status", "progress", "metrics", "error_message", "started_at", "finished_at"]
+
+def fetch_stream_state(job_id: str) -> Optional[Dict[str, Any]]:
+    record = job_store.get(job_id)
+    if record is None:
+        return None
+    return {field: record[field] for field in STREAM_FIELDS}
+
+job_events = JobEventBroadcaster(
+    fetch_stream_state,
+    final_statuses=FINAL_STATUSES,
+    interval=settings.TRAINING_STREAM_INTERVAL
+)
+
+scheduler = TrainingScheduler(
+    target=train_model_task,
+    on_update=apply_job_update,
+    max_running=settings.MAX_TRAINING_JOBS,
+    max_queued=settings.MAX_QUEUED_TRAINING_JOBS,
+    max_run_time=settings.MAX_TRAINING_TIME,
+    cancel_grace_period=settings.TRAINING_CANCEL_GRACE_PERIOD,
+    claim=claim_training_slot
+)
+
+def with_timing(job: TrainingJob, positions: Dict[str, int]) -> TrainingJob:
+    """Copy of a job with its queue position, wait time and run time filled in"""
+    now = time.time()
+    timing = {"queue_position": positions.get(job.job_id)}
+    if job.submitted_at is not None:
+        timing["wait_time"] = (job.started_at or now) - job.submitted_at
+    if job.started_at is not None:
+        timing["run_time"] = (job.finished_at or now) - job.started_at
+    return job.copy(update=timing)
 
 @router.post("/start", response_model=TrainingResponse)
 async def start_training(
     config: TrainingConfig,
-    background_tasks: BackgroundTasks,
     current_user: dict = Depends(get_current_user)
 ):
     """
-    Start a new training job
+    Queue a new training job.
+    Jobs run in worker processes, at most MAX_TRAINING_JOBS at a time across
+    every API worker, and each API worker starts the jobs submitted to it by
+    priority then submission order. With resume_from_job the
+    new job continues from that job's latest checkpoint.
     """
+    resume_from = None
+    if config.resume_from_job:
+        get_job(config.resume_from_job)
+        resume_from = latest_job_checkpoint(config.resume_from_job)
+        if resume_from is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Training job {config.resume_from_job} has no checkpoint to resume from"
+            )
+
     try:
-        job_id = f"job_{len(active_jobs) + 1}"
+        job_id = new_job_id()
         
-        # Create new job
-        job = TrainingJob(
-            job_id=job_id,
-            status=TRAINING_STATUS["INITIALIZED"],
-            progress=0.0
-        )
-        active_jobs[job_id] = job
+        # Create new job, the queue limit counts every API worker's jobs
+        admitted = job_store.admit({
+            "id": job_id,
+            "status": TRAINING_STATUS["QUEUED"],
+            "progress": 0.0,
+            "priority": config.priority,
+            "config": config.dict(),
+            "owner": process_owner(),
+            "submitted_at": time.time()
+        }, settings.MAX_QUEUED_TRAINING_JOBS)
+        if not admitted:
+            raise SchedulerFullError(settings.MAX_QUEUED_TRAINING_JOBS)
         
-        # Add training task to background tasks
-        background_tasks.add_task(train_model_task, job_id, config)
+        try:
+            model_record = models.model_index.get(config.model_id)
+            task_config = {
+                **config.dict(),
+                "framework": config.framework or (model_record or {}).get("framework"),
+                "model_path": models.blob_store.resolve(config.model_id),
+                "checkpoint_dir": checkpoint_dir(job_id),
+                "resume_from": resume_from
+            }
+            scheduler.submit(job_id, (task_config,), priority=config.priority)
+        except Exception:
+            job_store.delete(job_id)
+            raise
         
+        position = job_store.queue_positions().get(job_id)
         return TrainingResponse(
             job_id=job_id,
-            status=TRAINING_STATUS["INITIALIZED"],
-            message="Training job started successfully"
+            status=TRAINING_STATUS["QUEUED"],
+            message=f"Training job queued at position {position}" if position else "Training job started"
         )
         
+    except SchedulerFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error starting training: {str(e)}")
         raise HTTPException(
@@ -125,19 +240,77 @@ async def get_training_status(
     """
     Get the status of a training job
     """
-    if job_id not in active_jobs:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Training job {job_id} not found"
-        )
-    return active_jobs[job_id]
+    return with_timing(get_job(job_id), job_store.queue_positions())
 
-@router.get("/list", response_model=List[TrainingJob])
-async def list_training_jobs(current_user: dict = Depends(get_current_user)):
+@router.get("/stream/{job_id}")
+async def stream_training_status(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Stream a training job's changes as Server-Sent Events.
+    The first `update` event carries the job's current state and later ones
+    only the fields that changed, at most once per TRAINING_STREAM_INTERVAL.
+    An `end` event follows the job's final status.
+    """
+    get_job(job_id)
+
+    async def event_stream():
+        subscription = job_events.subscribe(job_id)
+        try:
+            while True:
+                delta = await subscription.get(timeout=STREAM_KEEPALIVE_INTERVAL)
+                if delta:
+                    yield f"event: update\ndata: {json.dumps(delta)}\n\n"
+                elif subscription.closed:
+                    yield "event: end\ndata: {}\n\n"
+                    return
+                else:
+                    yield ": keep-alive\n\n"
+        finally:
+            job_events.unsubscribe(job_id, subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/queue")
+async def get_queue_stats(current_user: dict = Depends(get_current_user)):
+    """
+    Number of queued and running training jobs across every API worker and of streamed jobs
+    """
+    return {
+        **job_store.counts(),
+        "max_running": settings.MAX_TRAINING_JOBS,
+        "max_queued": settings.MAX_QUEUED_TRAINING_JOBS,
+        "streams": job_events.stats()
+    }
+
+@router.get("/list", response_model=TrainingJobListResponse)
+async def list_training_jobs(
+    job_status: Optional[str] = Query(None, alias="status"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    current_user: dict = Depends(get_current_user)
+):
     """
-    List all training jobs
+    List training jobs, newest first, with cursor pagination
     """
-    return list(active_jobs.values())
+    try:
+        records, next_cursor = job_store.page(status=job_status, limit=limit, cursor=cursor)
+        positions = job_store.queue_positions()
+        return TrainingJobListResponse(
+            items=[with_timing(record_to_job(record), positions) for record in records],
+            next_cursor=next_cursor
+        )
+
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
 @router.delete("/cancel/{job_id}", response_model=TrainingResponse)
 async def cancel_training(
@@ -147,21 +320,17 @@ async def cancel_training(
     """
     Cancel a training job
     """
-    if job_id not in active_jobs:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Training job {job_id} not found"
-        )
-    
-    job = active_jobs[job_id]
-    if job.status in [TRAINING_STATUS["COMPLETED"], TRAINING_STATUS["FAILED"]]:
+    job = get_job(job_id)
+    if job.status in FINAL_STATUSES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Cannot cancel job in {job.status} status"
         )
     
-    # Remove job from active jobs
-    del active_jobs[job_id]
+    # Record the cancellation first so late reports from the worker are dropped
+    job_store.update(job_id, {"status": TRAINING_STATUS["CANCELLED"], "finished_at": time.time()})
+    job_events.notify(job_id)
+    scheduler.cancel(job_id)
     
     return TrainingResponse(
         job_id=job_id,
@@ -175,15 +344,13 @@ async def get_training_metrics(
     current_user: dict = Depends(get_current_user)
 ):
     """
-    Get detailed metrics for a training job
+    Get detailed metrics for a training job.
+    PyTorch, TensorFlow and scikit-learn jobs report their latest epoch's
+    losses (scikit-learn: scores), samples_per_second, tokens_per_second
+    (PyTorch token ID inputs), step_time_p50/p95/p99, and data_wait_time,
+    compute_time, optimizer_time (PyTorch) and peak_rss_mb.
     """
-    if job_id not in active_jobs:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Training job {job_id} not found"
-        )
-    
-    job = active_jobs[job_id]
+    job = get_job(job_id)
     if not job.metrics:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,162 @@
+from typing import Iterable, Iterator, Optional, Tuple
+import os
+import stat
+from .uploads import hash_file
+
+HASH_ALGORITHM = "sha256"
+
+
+class BlobStore:
+    """
+    Content-addressed, deduplicated storage for model artifacts.
+
+    Every distinct artifact is stored once under blobs/sha256/<ab>/<digest>.
+    A model ID is a hard link refs/<model_id> to its blob plus a
+    refs/<model_id>.sha256 file holding the digest, so handlers can keep
+    loading models from a regular path with the original extension.
+
+    The blob's link count is its reference count: uploading identical content
+    under a new ID adds a link instead of a copy, and a blob whose only
+    remaining link is the blob path itself is garbage.
+
+    Because every ref of a blob is the same file, stored content is immutable:
+    blobs are made read-only, and a changed model must be put under a new ID
+    rather than written in place.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.blobs_path = os.path.join(root, "blobs", HASH_ALGORITHM)
+        self.refs_path = os.path.join(root, "refs")
+        os.makedirs(self.blobs_path, exist_ok=True)
+        os.makedirs(self.refs_path, exist_ok=True)
+
+    @staticmethod
+    def is_valid_id(model_id: str) -> bool:
+        return (
+            bool(model_id)
+            and not model_id.startswith(".")
+            and not model_id.endswith(f".{HASH_ALGORITHM}")
+            and os.path.basename(model_id) == model_id
+        )
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.blobs_path, digest[:2], digest)
+
+    def ref_path(self, model_id: str) -> str:
+        return os.path.join(self.refs_path, model_id)
+
+    def _digest_path(self, model_id: str) -> str:
+        return os.path.join(self.refs_path, f"{model_id}.{HASH_ALGORITHM}")
+
+    def put(self, staged_path: str, digest: str, model_id: str) -> bool:
+        """
+        Move a staged file into the store and reference it as model_id.
+        Returns True if the content was already stored and the upload was deduplicated.
+        """
+        if not self.is_valid_id(model_id):
+            raise ValueError(f"Invalid model id: {model_id}")
+        if os.path.exists(self.ref_path(model_id)):
+            raise FileExistsError(f"Model {model_id} already exists")
+
+        blob_path = self.blob_path(digest)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+
+        deduplicated = False
+        while True:
+            try:
+                # os.link only creates the blob if no identical content is stored yet
+                os.link(staged_path, blob_path)
+            except FileExistsError:
+                deduplicated = True
+            try:
+                os.link(blob_path, self.ref_path(model_id))
+                break
+            except FileNotFoundError:
+                # Collected between the two links, store it again
+                deduplicated = False
+        os.remove(staged_path)
+        os.chmod(blob_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+
+        with open(self._digest_path(model_id), "w") as buffer:
+            buffer.write(digest)
+        return deduplicated
+
+    def import_files(self, directory: str, extensions: Iterable[str]) -> int:
+        """
+        Move model files kept directly in directory, as they were before the
+        blob store, into the store under their file name. Returns the number
+        imported; files already imported are gone, so repeated calls are cheap.
+        """
+        extensions = tuple(extensions)
+        imported = 0
+        for entry in os.scandir(directory):
+            if not (entry.is_file() and entry.name.endswith(extensions) and self.is_valid_id(entry.name)):
+                continue
+            if os.path.exists(self.ref_path(entry.name)):
+                continue
+            self.put(entry.path, hash_file(entry.path), entry.name)
+            imported += 1
+        return imported
+
+    def resolve(self, model_id: str) -> Optional[str]:
+        """Return the readable path of a model, or None if it does not exist"""
+        if not self.is_valid_id(model_id):
+            return None
+        path = self.ref_path(model_id)
+        return path if os.path.isfile(path) else None
+
+    def digest(self, model_id: str) -> Optional[str]:
+        try:
+            with open(self._digest_path(model_id)) as buffer:
+                return buffer.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def refcount(self, digest: str) -> int:
+        try:
+            return os.stat(self.blob_path(digest)).st_nlink - 1
+        except FileNotFoundError:
+            return 0
+
+    def list_ids(self) -> Iterator[str]:
+        for entry in os.scandir(self.refs_path):
+            if entry.is_file() and self.is_valid_id(entry.name):
+                yield entry.name
+
+    def delete(self, model_id: str) -> bool:
+        """Drop a model reference and collect its blob once nothing else links to it"""
+        path = self.resolve(model_id)
+        if path is None:
+            return False
+        digest = self.digest(model_id)
+        os.remove(path)
+        if os.path.exists(self._digest_path(model_id)):
+            os.remove(self._digest_path(model_id))
+        if digest:
+            self._collect(digest)
+        return True
+
+    def _collect(self, digest: str) -> int:
+        blob_path = self.blob_path(digest)
+        try:
+            stats = os.stat(blob_path)
+            if stats.st_nlink > 1:
+                return 0
+            os.remove(blob_path)
+            return stats.st_size
+        except FileNotFoundError:
+            return 0
+
+    def gc(self) -> Tuple[int, int]:
+        """Remove every unreferenced blob, returns (blobs removed, bytes freed)"""
+        removed, freed = 0, 0
+        for prefix in os.scandir(self.blobs_path):
+            if not prefix.is_dir():
+                continue
+            for blob in os.scandir(prefix.path):
+                size = self._collect(blob.name)
+                if size or not os.path.exists(blob.path):
+                    removed += 1
+                    freed += size
+        return removed, freed
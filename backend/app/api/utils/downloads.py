@@ -0,0 +1,152 @@
+from typing import Dict, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from starlette import status
+from starlette.responses import Response
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024  # 1MB
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+
+class RangeNotSatisfiableError(Exception):
+    """Raised when a Range header does not overlap the file"""
+
+
+def parse_range(header: Optional[str], file_size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single `bytes=` range into an inclusive (start, end) pair.
+    Returns None when the whole file should be served, which includes
+    malformed and multi-range headers (RFC 9110 allows ignoring them).
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].strip()
+    if "," in spec or "-" not in spec:
+        return None
+
+    first, last = (part.strip() for part in spec.split("-", 1))
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else file_size - 1
+        else:
+            start = max(file_size - int(last), 0)
+            end = file_size - 1
+    except ValueError:
+        return None
+
+    if start >= file_size:
+        raise RangeNotSatisfiableError(header)
+    if start < 0 or end < start:
+        return None
+    return start, min(end, file_size - 1)
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def if_range_matches(header: Optional[str], etag: Optional[str]) -> bool:
+    """
+    Strong comparison of an If-Range header against an ETag (RFC 9110 13.1.5).
+    Weak validators and dates never match, so the whole file is sent.
+    """
+    return bool(header and etag) and header.strip() == etag and not etag.startswith("W/")
+
+
+def plan_download(
+    file_size: int,
+    etag: Optional[str],
+    range_header: Optional[str] = None,
+    if_none_match: Optional[str] = None,
+    if_range: Optional[str] = None
+) -> Tuple[int, int, int]:
+    """
+    Decide how to answer a download request, returns (status, start, end).
+    304 when If-None-Match matches the ETag, 206 for a satisfiable single
+    range whose If-Range (if sent) still matches, 200 with the whole file
+    otherwise. Raises RangeNotSatisfiableError for a range past the end.
+    """
+    if etag and etag_matches(if_none_match, etag):
+        return status.HTTP_304_NOT_MODIFIED, 0, -1
+    byte_range = None
+    if if_range is None or if_range_matches(if_range, etag):
+        byte_range = parse_range(range_header, file_size)
+    if byte_range is None:
+        return status.HTTP_200_OK, 0, file_size - 1
+    return status.HTTP_206_PARTIAL_CONTENT, byte_range[0], byte_range[1]
+
+
+class FileRangeResponse(Response):
+    """
+    Stream a byte range of a file without reading it into Python memory.
+
+    When the server offers the ASGI zero-copy extension the kernel sendfile
+    path is used with the range's offset and count; otherwise the range is
+    sent in chunk_size reads from the threadpool.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        start: int,
+        end: int,
+        status_code: int = 200,
+        headers: Optional[Dict[str, str]] = None,
+        media_type: str = "application/octet-stream",
+        send_body: bool = True,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.end = end
+        self.send_body = send_body
+        self.chunk_size = chunk_size
+        self.headers["content-length"] = str(max(end - start + 1, 0))
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers
+        })
+        count = self.end - self.start + 1
+        if not self.send_body or count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        buffer = await run_in_threadpool(open, self.path, "rb")
+        try:
+            if ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+                await send({
+                    "type": ZEROCOPY_EXTENSION,
+                    "file": buffer,
+                    "offset": self.start,
+                    "count": count,
+                    "more_body": False
+                })
+                return
+
+            await run_in_threadpool(buffer.seek, self.start)
+            remaining = count
+            while remaining > 0:
+                chunk = await run_in_threadpool(buffer.read, min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            await run_in_threadpool(buffer.close)
@@ -0,0 +1,141 @@
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+from fastapi.concurrency import run_in_threadpool
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    One client's view of a job's changes.
+    Deltas that arrive faster than the client reads them are merged, so a slow
+    client gets the latest values instead of an ever-growing backlog.
+    """
+
+    def __init__(self):
+        self.pending: Dict[str, Any] = {}
+        self.closed = False
+        self._ready = asyncio.Event()
+
+    def push(self, delta: Dict[str, Any]) -> None:
+        self.pending.update(delta)
+        self._ready.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self._ready.set()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Wait for the next merged delta, returns None on timeout or once closed and drained"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._ready.clear()
+        delta, self.pending = self.pending, {}
+        if self.closed:
+            # Keep returning immediately once closed
+            self._ready.set()
+        return delta or None
+
+
+class _Topic:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.wake = asyncio.Event()
+        self.subscribers: Set[Subscription] = set()
+        self.snapshot: Optional[Dict[str, Any]] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class JobEventBroadcaster:
+    """
+    Fan-out of job changes to streaming clients.
+
+    Each job has a single upstream reader per process, however many clients
+    follow it. The reader re-reads the job when notify() reports a local
+    change, or every poll_interval for jobs run by another API worker, and
+    never more often than once per interval. It sends each subscriber the
+    fields that changed since the last read, and closes the subscriptions
+    once the job reaches a final status.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Optional[Dict[str, Any]]],
+        final_statuses: Iterable[str],
+        interval: float = 0.5,
+        poll_interval: float = 2.0
+    ):
+        self.fetch = fetch
+        self.final_statuses = set(final_statuses)
+        self.interval = interval
+        self.poll_interval = poll_interval
+        self.reads = 0
+        self._topics: Dict[str, _Topic] = {}
+
+    def subscribe(self, job_id: str) -> Subscription:
+        """Follow a job, must be called from the event loop"""
+        subscription = Subscription()
+        topic = self._topics.get(job_id)
+        if topic is None:
+            topic = _Topic(asyncio.get_running_loop())
+            self._topics[job_id] = topic
+            topic.task = asyncio.create_task(self._run(job_id, topic))
+        elif topic.snapshot is not None:
+            subscription.push(topic.snapshot)
+        topic.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, job_id: str, subscription: Subscription) -> None:
+        topic = self._topics.get(job_id)
+        if topic is not None:
+            topic.subscribers.discard(subscription)
+            topic.wake.set()
+
+    def notify(self, job_id: str) -> None:
+        """Signal that a job changed, safe to call from any thread"""
+        topic = self._topics.get(job_id)
+        if topic is not None and not topic.loop.is_closed():
+            topic.loop.call_soon_threadsafe(topic.wake.set)
+
+    async def _run(self, job_id: str, topic: _Topic) -> None:
+        try:
+            while topic.subscribers:
+                topic.wake.clear()
+                record = await run_in_threadpool(self.fetch, job_id)
+                self.reads += 1
+                if record is None:
+                    break
+
+                if topic.snapshot is None:
+                    delta = dict(record)
+                else:
+                    delta = {field: value for field, value in record.items() if topic.snapshot.get(field) != value}
+                topic.snapshot = record
+                if delta:
+                    for subscription in topic.subscribers:
+                        subscription.push(delta)
+                if record.get("status") in self.final_statuses:
+                    break
+
+                await asyncio.sleep(self.interval)
+                if not topic.wake.is_set():
+                    try:
+                        await asyncio.wait_for(topic.wake.wait(), self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+        except Exception as e:
+            logger.error(f"Event stream for job {job_id} failed: {str(e)}")
+        finally:
+            self._topics.pop(job_id, None)
+            for subscription in topic.subscribers:
+                subscription.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "jobs": len(self._topics),
+            "subscribers": sum(len(topic.subscribers) for topic in self._topics.values()),
+            "reads": self.reads
+        }
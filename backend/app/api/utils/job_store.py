@@ -0,0 +1,280 @@
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from .model_index import decode_cursor, encode_cursor
+
+# Fields written on the flush interval instead of on every report
+BUFFERED_FIELDS = {"progress"}
+ACTIVE_STATUSES = ("queued", "running")
+JSON_FIELDS = ("config", "metrics")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    priority INTEGER NOT NULL DEFAULT 0,
+    config TEXT,
+    metrics TEXT,
+    error_message TEXT,
+    owner TEXT,
+    submitted_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_submitted_at ON jobs (submitted_at, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, submitted_at, id);
+"""
+
+COLUMNS = [
+    "id", "status", "progress", "priority", "config", "metrics",
+    "error_message", "owner", "submitted_at", "started_at", "finished_at"
+]
+
+
+def new_job_id() -> str:
+    return f"job_{uuid.uuid4().hex}"
+
+
+def process_owner() -> str:
+    """Identifies the API process that schedules a job"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobStore:
+    """
+    SQLite store of training jobs, shared by every API worker on the host.
+
+    The database runs in WAL mode so workers read while one writes. Progress
+    reports are kept in memory and written in one transaction every
+    flush_interval seconds; any other change is written immediately, together
+    with the job's pending progress.
+    """
+
+    def __init__(self, db_path: str, flush_interval: float = 1.0):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._flusher: Optional[threading.Thread] = None
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def _to_record(row: sqlite3.Row) -> Dict[str, Any]:
+        record = dict(row)
+        for field in JSON_FIELDS:
+            record[field] = json.loads(record[field]) if record[field] else None
+        return record
+
+    @staticmethod
+    def _to_row(changes: Dict[str, Any]) -> Dict[str, Any]:
+        row = {field: value for field, value in changes.items() if field in COLUMNS}
+        for field in JSON_FIELDS:
+            if row.get(field) is not None:
+                row[field] = json.dumps(row[field])
+        return row
+
+    def create(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        row = self._to_row(record)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT INTO jobs ({', '.join(row)}) VALUES ({', '.join('?' for _ in row)})",
+                list(row.values())
+            )
+        return record
+
+    def admit(self, record: Dict[str, Any], max_queued: int) -> bool:
+        """
+        Create a queued job unless max_queued jobs are already queued across
+        every API worker, returns False when it was not admitted
+        """
+        row = self._to_row(record)
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                f"INSERT INTO jobs ({', '.join(row)}) SELECT {', '.join('?' for _ in row)} "
+                "WHERE (SELECT COUNT(*) FROM jobs WHERE status = 'queued') < ?",
+                [*row.values(), max_queued]
+            )
+        return cursor.rowcount > 0
+
+    def claim(self, job_id: str, max_running: int) -> bool:
+        """
+        Mark a queued job running if fewer than max_running jobs run across
+        every API worker. One statement, so two workers never take the last slot.
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'running' WHERE id = ? AND status = 'queued' "
+                "AND (SELECT COUNT(*) FROM jobs WHERE status = 'running') < ?",
+                (job_id, max_running)
+            )
+        return cursor.rowcount > 0
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            pending = self._pending.get(job_id)
+        if row is None:
+            return None
+        record = self._to_record(row)
+        if pending:
+            record.update(pending)
+        return record
+
+    def update(self, job_id: str, changes: Dict[str, Any], unless_status: Optional[str] = None) -> bool:
+        """
+        Apply changes to a job, returns False when it was not written.
+        With unless_status the write is skipped, in the same statement, if the
+        job has that status by then. Buffered progress is always accepted.
+        """
+        if set(changes) <= BUFFERED_FIELDS:
+            with self._lock:
+                self._pending.setdefault(job_id, {}).update(changes)
+            self._ensure_flusher()
+            return True
+
+        with self._lock:
+            row = self._to_row({**self._pending.pop(job_id, {}), **changes})
+            if not row:
+                return True
+            query = f"UPDATE jobs SET {', '.join(f'{field} = ?' for field in row)} WHERE id = ?"
+            params = [*row.values(), job_id]
+            if unless_status is not None:
+                query += " AND status != ?"
+                params.append(unless_status)
+            with self._conn:
+                cursor = self._conn.execute(query, params)
+        return cursor.rowcount > 0
+
+    def flush(self) -> int:
+        """Write buffered progress, returns the number of jobs written"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE jobs SET progress = ? WHERE id = ?",
+                    [(changes["progress"], job_id) for job_id, changes in pending.items()]
+                )
+        return len(pending)
+
+    def _ensure_flusher(self) -> None:
+        with self._lock:
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._flush_loop, name="job-store-flush", daemon=True)
+                self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def delete(self, job_id: str) -> bool:
+        with self._lock, self._conn:
+            self._pending.pop(job_id, None)
+            cursor = self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        return cursor.rowcount > 0
+
+    def page(
+        self,
+        status: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return one page of jobs, newest first, and the cursor of the next page"""
+        clauses, params = [], []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if cursor is not None:
+            submitted_at, job_id = decode_cursor(cursor)
+            clauses.append("(submitted_at, id) < (?, ?)")
+            params.extend([submitted_at, job_id])
+
+        query = "SELECT * FROM jobs"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY submitted_at DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            pending = dict(self._pending)
+
+        records = []
+        for row in rows[:limit]:
+            record = self._to_record(row)
+            record.update(pending.get(record["id"], {}))
+            records.append(record)
+        next_cursor = None
+        if len(rows) > limit:
+            last = records[-1]
+            next_cursor = encode_cursor(last["submitted_at"], last["id"])
+        return records, next_cursor
+
+    def queue_positions(self) -> Dict[str, int]:
+        """1-based queue position of every queued job, by priority then submission"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY priority DESC, submitted_at, id"
+            ).fetchall()
+        return {row["id"]: position for position, row in enumerate(rows, start=1)}
+
+    def counts(self) -> Dict[str, int]:
+        """Number of queued and running jobs across every API worker"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT status, COUNT(*) FROM jobs WHERE status IN ({', '.join('?' for _ in ACTIVE_STATUSES)}) "
+                "GROUP BY status",
+                ACTIVE_STATUSES
+            ).fetchall()
+        counts = {status: 0 for status in ACTIVE_STATUSES}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+    def recover_orphans(self) -> int:
+        """
+        Fail queued and running jobs whose API process on this host has exited,
+        returns the number of jobs marked failed
+        """
+        host = socket.gethostname()
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, owner FROM jobs WHERE status IN ({', '.join('?' for _ in ACTIVE_STATUSES)})",
+                ACTIVE_STATUSES
+            ).fetchall()
+
+        orphans = []
+        for job_id, owner in rows:
+            owner_host, _, pid = (owner or "").rpartition(":")
+            if owner_host == host and pid.isdigit() and not _pid_alive(int(pid)):
+                orphans.append(job_id)
+
+        for job_id in orphans:
+            self.update(job_id, {
+                "status": "failed",
+                "error_message": "Interrupted by an API restart",
+                "finished_at": time.time()
+            })
+        return len(orphans)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,199 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+import base64
+import json
+import os
+import re
+import sqlite3
+import threading
+
+SORTABLE_FIELDS = ["created_at", "name", "size"]
+COLUMNS = [
+    "id", "name", "framework", "description", "version", "params",
+    "status", "size", "sha256", "created_at", "last_modified"
+]
+
+FRAMEWORK_BY_EXTENSION = {
+    ".pt": "pytorch",
+    ".pth": "pytorch",
+    ".safetensors": "pytorch",
+    ".h5": "tensorflow",
+    ".keras": "tensorflow",
+    ".pkl": "scikit-learn",
+    ".joblib": "scikit-learn",
+    ".onnx": "onnx"
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS models (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    framework TEXT NOT NULL,
+    description TEXT,
+    version TEXT,
+    params TEXT,
+    status TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT,
+    created_at TEXT NOT NULL,
+    last_modified TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_models_sha256 ON models (sha256);
+CREATE INDEX IF NOT EXISTS idx_models_status ON models (status, created_at, id);
+"""
+
+
+def encode_cursor(value: Any, model_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([value, model_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    try:
+        value, model_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return value, model_id
+
+
+class ModelIndex:
+    """
+    SQLite index of model metadata, kept up to date by upload, patch and delete.
+
+    Listing uses keyset pagination over (sort field, id) with a composite index
+    per sort field, with and without a framework prefix, so a page costs
+    O(page size) however many models are stored.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            for field in SORTABLE_FIELDS:
+                self._conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_models_{field} ON models ({field}, id)"
+                )
+                self._conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_models_framework_{field} "
+                    f"ON models (framework, {field}, id)"
+                )
+
+    @staticmethod
+    def _to_record(row: sqlite3.Row) -> Dict[str, Any]:
+        record = dict(row)
+        record["params"] = json.loads(record["params"]) if record["params"] else None
+        return record
+
+    def upsert(self, record: Dict[str, Any]) -> None:
+        values = {**record, "params": json.dumps(record["params"]) if record.get("params") else None}
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO models ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in COLUMNS)})",
+                [values.get(column) for column in COLUMNS]
+            )
+
+    def get(self, model_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM models WHERE id = ?", (model_id,)).fetchone()
+        return self._to_record(row) if row else None
+
+    def update(self, model_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Change fields of a stored model in one statement, so a concurrent
+        delete is never undone. Returns the new record, None when it is gone.
+        """
+        values = {**changes, "last_modified": datetime.now().isoformat()}
+        unknown = set(values) - set(COLUMNS[1:])
+        if unknown:
+            raise ValueError(f"Unknown model fields: {sorted(unknown)}")
+        if "params" in values:
+            values["params"] = json.dumps(values["params"]) if values["params"] else None
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                f"UPDATE models SET {', '.join(f'{column} = ?' for column in values)} WHERE id = ?",
+                [*values.values(), model_id]
+            )
+            if cursor.rowcount == 0:
+                return None
+            row = self._conn.execute("SELECT * FROM models WHERE id = ?", (model_id,)).fetchone()
+        return self._to_record(row)
+
+    def delete(self, model_id: str) -> bool:
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM models WHERE id = ?", (model_id,))
+        return cursor.rowcount > 0
+
+    def ids(self) -> Iterable[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT id FROM models")]
+
+    def page(
+        self,
+        framework: Optional[str] = None,
+        status: Optional[str] = None,
+        sort_by: str = "created_at",
+        descending: bool = False,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return one page of records and the cursor of the next page"""
+        if sort_by not in SORTABLE_FIELDS:
+            raise ValueError(f"sort_by must be one of {SORTABLE_FIELDS}")
+
+        clauses, params = [], []
+        if framework is not None:
+            clauses.append("framework = ?")
+            params.append(framework)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if cursor is not None:
+            value, model_id = decode_cursor(cursor)
+            clauses.append(f"({sort_by}, id) {'<' if descending else '>'} (?, ?)")
+            params.extend([value, model_id])
+
+        direction = "DESC" if descending else "ASC"
+        query = "SELECT * FROM models"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += f" ORDER BY {sort_by} {direction}, id {direction} LIMIT ?"
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        records = [self._to_record(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = records[-1]
+            next_cursor = encode_cursor(last[sort_by], last["id"])
+        return records, next_cursor
+
+    def sync(self, blob_store) -> int:
+        """Reconcile the index with the blob store, returns the number of entries changed"""
+        known = set(self.ids())
+        stored = set(blob_store.list_ids())
+        changed = 0
+        for model_id in known - stored:
+            changed += int(self.delete(model_id))
+        for model_id in stored - known:
+            stats = os.stat(blob_store.ref_path(model_id))
+            base, extension = os.path.splitext(model_id)
+            # IDs are {name}_{YYYYmmdd}_{HHMMSS}[_{n}], names may contain underscores
+            match = re.match(r"(.+?)_\d{8}_\d{6}(?:_\d+)?$", base)
+            self.upsert({
+                "id": model_id,
+                "name": match.group(1) if match else base,
+                "framework": FRAMEWORK_BY_EXTENSION.get(extension, "unknown"),
+                "status": "available",
+                "size": stats.st_size,
+                "sha256": blob_store.digest(model_id),
+                "created_at": datetime.fromtimestamp(stats.st_mtime).isoformat(),
+                "last_modified": datetime.fromtimestamp(stats.st_mtime).isoformat()
+            })
+            changed += 1
+        return changed
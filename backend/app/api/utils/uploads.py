@@ -0,0 +1,223 @@
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from datetime import datetime
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload grows past the configured size limit"""
+    def __init__(self, max_size: int):
+        super().__init__(f"Upload exceeds maximum size of {max_size} bytes")
+        self.max_size = max_size
+
+
+class UploadOffsetError(Exception):
+    """Raised when a chunk does not start where the session left off"""
+    def __init__(self, expected: int, received: int):
+        super().__init__(f"Chunk offset {received} does not match session offset {expected}")
+        self.expected = expected
+        self.received = received
+
+
+async def iter_upload_file(file: UploadFile, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Yield an UploadFile in fixed-size chunks"""
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def _write_chunk(buffer, hasher, chunk: bytes) -> None:
+    buffer.write(chunk)
+    if hasher is not None:
+        hasher.update(chunk)
+
+
+async def stream_to_file(
+    chunks: AsyncIterator[bytes],
+    file_path: str,
+    max_size: int,
+    offset: int = 0,
+    hasher=None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> int:
+    """
+    Append chunks to file_path without holding more than chunk_size bytes in memory.
+
+    Incoming chunks are coalesced into chunk_size writes, and both the write and the
+    hash update run in the threadpool so the event loop never blocks on disk I/O.
+    Returns the number of bytes written. Raises UploadTooLargeError as soon as
+    offset + written exceeds max_size; the file is truncated back to offset.
+    """
+    written = 0
+    pending = bytearray()
+    buffer = await run_in_threadpool(open, file_path, "ab")
+    try:
+        async for chunk in chunks:
+            written += len(chunk)
+            if offset + written > max_size:
+                raise UploadTooLargeError(max_size)
+            pending += chunk
+            if len(pending) >= chunk_size:
+                await run_in_threadpool(_write_chunk, buffer, hasher, bytes(pending))
+                pending.clear()
+        if pending:
+            await run_in_threadpool(_write_chunk, buffer, hasher, bytes(pending))
+    except BaseException:
+        await run_in_threadpool(buffer.close)
+        await run_in_threadpool(os.truncate, file_path, offset)
+        raise
+    await run_in_threadpool(buffer.close)
+    return written
+
+
+def hash_file(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    """Compute the SHA-256 of a file in chunk_size reads"""
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as buffer:
+        for chunk in iter(lambda: buffer.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class UploadSessionStore:
+    """
+    Resumable multi-part uploads kept under a staging directory.
+
+    Each session is a `{upload_id}.part` data file plus a `{upload_id}.json`
+    descriptor. The part file's size is the source of truth for the offset, so a
+    session survives a dropped connection or an API restart. The running SHA-256
+    is kept in memory; if it is lost (restart, another worker) the digest is
+    recomputed from the part file on finalize.
+    """
+
+    def __init__(self, root: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.root = root
+        self.chunk_size = chunk_size
+        self._hashers: Dict[str, Tuple[int, Any]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        os.makedirs(self.root, exist_ok=True)
+
+    def _meta_path(self, upload_id: str) -> str:
+        return os.path.join(self.root, f"{upload_id}.json")
+
+    def part_path(self, upload_id: str) -> str:
+        return os.path.join(self.root, f"{upload_id}.part")
+
+    def create(self, filename: str, total_size: Optional[int] = None) -> Dict:
+        upload_id = uuid.uuid4().hex
+        session = {
+            "upload_id": upload_id,
+            "filename": filename,
+            "total_size": total_size,
+            "created_at": datetime.now().isoformat()
+        }
+        open(self.part_path(upload_id), "wb").close()
+        with open(self._meta_path(upload_id), "w") as buffer:
+            json.dump(session, buffer)
+        self._hashers[upload_id] = (0, hashlib.sha256())
+        return {**session, "offset": 0}
+
+    def get(self, upload_id: str) -> Optional[Dict]:
+        if not upload_id.isalnum():
+            return None
+        try:
+            with open(self._meta_path(upload_id)) as buffer:
+                session = json.load(buffer)
+            session["offset"] = os.path.getsize(self.part_path(upload_id))
+        except (FileNotFoundError, ValueError):
+            return None
+        return session
+
+    async def append(
+        self,
+        upload_id: str,
+        chunks: AsyncIterator[bytes],
+        offset: int,
+        max_size: int
+    ) -> Dict:
+        """Append a chunk stream at offset and return the updated session"""
+        lock = self._locks.setdefault(upload_id, asyncio.Lock())
+        async with lock:
+            session = self.get(upload_id)
+            if session is None:
+                raise KeyError(upload_id)
+            if offset != session["offset"]:
+                raise UploadOffsetError(session["offset"], offset)
+
+            hashed, hasher = self._hashers.get(upload_id, (-1, None))
+            # Hash into a copy, a failed append truncates its bytes away again
+            hasher = hasher.copy() if hasher is not None and hashed == offset else None
+
+            written = await stream_to_file(
+                chunks,
+                self.part_path(upload_id),
+                max_size,
+                offset=offset,
+                hasher=hasher,
+                chunk_size=self.chunk_size
+            )
+            if hasher is not None:
+                self._hashers[upload_id] = (offset + written, hasher)
+            else:
+                self._hashers.pop(upload_id, None)
+
+            session["offset"] = offset + written
+            return session
+
+    async def finalize(self, upload_id: str) -> Tuple[str, int, str]:
+        """Close a session and return (part_path, size, sha256)"""
+        session = self.get(upload_id)
+        if session is None:
+            raise KeyError(upload_id)
+        part_path = self.part_path(upload_id)
+        size = session["offset"]
+
+        hashed, hasher = self._hashers.pop(upload_id, (-1, None))
+        if hasher is not None and hashed == size:
+            digest = hasher.hexdigest()
+        else:
+            digest = await run_in_threadpool(hash_file, part_path, self.chunk_size)
+
+        os.remove(self._meta_path(upload_id))
+        self._locks.pop(upload_id, None)
+        return part_path, size, digest
+
+    def abort(self, upload_id: str) -> bool:
+        if self.get(upload_id) is None:
+            return False
+        for path in (self._meta_path(upload_id), self.part_path(upload_id)):
+            if os.path.exists(path):
+                os.remove(path)
+        self._hashers.pop(upload_id, None)
+        self._locks.pop(upload_id, None)
+        return True
+
+    def purge_expired(self, ttl: int) -> int:
+        """Remove sessions older than ttl seconds, returns the number removed"""
+        removed = 0
+        cutoff = time.time() - ttl
+        for filename in os.listdir(self.root):
+            if not filename.endswith(".json"):
+                continue
+            upload_id = filename[:-len(".json")]
+            meta_path = os.path.join(self.root, filename)
+            part_path = self.part_path(upload_id)
+            last_activity = os.path.getmtime(part_path if os.path.exists(part_path) else meta_path)
+            if last_activity >= cutoff:
+                continue
+            for path in (meta_path, part_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._hashers.pop(upload_id, None)
+            removed += 1
+        return removed
@@ -27,17 +27,33 @@ class Settings(BaseSettings):
     # Model Storage Settings
     MODEL_STORAGE_PATH: str = "models/"
     MAX_MODEL_SIZE: int = 1000 * 1024 * 1024  # 1000MB
-    ALLOWED_MODEL_EXTENSIONS: List[str] = [".pt", ".pth", ".h5", ".keras", ".pkl", ".joblib"]
+    ALLOWED_MODEL_EXTENSIONS: List[str] = [".pt", ".pth", ".safetensors", ".h5", ".keras", ".pkl", ".joblib", ".onnx"]
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # 1MB
+    UPLOAD_SESSION_TTL: int = 24 * 3600  # 24 hours in seconds
     
     # Training Settings
-    MAX_TRAINING_JOBS: int = 5
+    MAX_TRAINING_JOBS: int = 5  # Training worker processes running at once
+    MAX_QUEUED_TRAINING_JOBS: int = 100
     DEFAULT_BATCH_SIZE: int = 32
     DEFAULT_EPOCHS: int = 10
     MAX_TRAINING_TIME: int = 3600  # 1 hour in seconds
+    TRAINING_CANCEL_GRACE_PERIOD: float = 10.0  # Seconds a cancelled job gets to stop before its worker is killed
+    TRAINING_STREAM_INTERVAL: float = 0.5  # Minimum seconds between streamed updates of a job
+    TRAINING_PROCESSES: int = 1  # Data-parallel CPU ranks per PyTorch job, overridden by hyperparameters.num_processes
     
     # ML Framework Settings
-    SUPPORTED_FRAMEWORKS: List[str] = ["pytorch", "tensorflow", "scikit-learn"]
+    SUPPORTED_FRAMEWORKS: List[str] = ["pytorch", "tensorflow", "scikit-learn", "onnx"]
     DEFAULT_FRAMEWORK: str = "pytorch"
+    MODEL_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024  # 2GB of loaded models per process
+    INFERENCE_MAX_BATCH_SIZE: int = 32
+    INFERENCE_MAX_WAIT_MS: float = 5.0
+    PYTORCH_COMPILE_MODE: Optional[str] = None  # "trace", "script" or "compile", None serves eagerly
+    PYTORCH_TRUST_PICKLED_MODELS: bool = False  # Unpickling whole torch.save models runs their code, trusted uploads only
+    ONNX_INTRA_OP_THREADS: int = 0  # 0 lets ONNX Runtime decide
+    ONNX_INTER_OP_THREADS: int = 0
+    ONNX_GRAPH_OPTIMIZATION: str = "all"
+    TENSORFLOW_INTRA_OP_THREADS: int = 0  # 0 lets TensorFlow decide
+    TENSORFLOW_INTER_OP_THREADS: int = 0
     
     # CORS Settings
     CORS_ORIGINS: List[str] = [
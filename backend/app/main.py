@@ -1,5 +1,6 @@
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
 from typing import Optional, Dict, List
@@ -66,7 +67,7 @@ async def read_user_me(current_user: dict = Depends(get_current_user)):
     return current_user
 
 # Import routers
-from app.api.endpoints import models, training, metrics
+from app.api.endpoints import model as models, training, metrics, inference
 
 # Include routers with prefixes
 app.include_router(
@@ -90,26 +91,40 @@ app.include_router(
     dependencies=[Depends(get_current_user)]
 )
 
+app.include_router(
+    inference.router,
+    prefix="/api/v1/inference",
+    tags=["Inference"],
+    dependencies=[Depends(get_current_user)]
+)
+
 # Error handlers
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
-    return {
-        "detail": exc.detail,
-        "status_code": exc.status_code
-    }
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={
+            "detail": exc.detail,
+            "status_code": exc.status_code
+        },
+        headers=getattr(exc, "headers", None)
+    )
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
-    return {
-        "detail": "Internal server error",
-        "status_code": 500
-    }
+    return JSONResponse(
+        status_code=500,
+        content={
+            "detail": "Internal server error",
+            "status_code": 500
+        }
+    )
 
 # Configuration endpoints
 @app.get("/api/v1/config")
 async def get_config(current_user: dict = Depends(get_current_user)):
     return {
-        "supported_frameworks": ["pytorch", "tensorflow", "scikit-learn"],
+        "supported_frameworks": ["pytorch", "tensorflow", "scikit-learn", "onnx"],
         "available_models": {
             "pytorch": ["bert-base", "roberta-base"],
             "tensorflow": ["bert-base-tf", "distilbert-tf"],
@@ -124,12 +139,15 @@ async def get_config(current_user: dict = Depends(get_current_user)):
 async def startup_event():
     # Add any startup initialization here
     print("Starting Fine-Tuning Labs API...")
+    models.init_model_storage()
+    training.init_job_store()
 
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
     # Add cleanup code here
     print("Shutting down Fine-Tuning Labs API...")
+    training.scheduler.shutdown()
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,5 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Hashable, List, Optional
+import numpy as np
+import os
+from .model_cache import ModelCache, model_cache
 
 class BaseModelHandler(ABC):
     @abstractmethod
@@ -12,4 +15,38 @@ class BaseModelHandler(ABC):
     
     @abstractmethod
     def predict(self, model: Any, data: Any) -> Any:
-        pass
\ No newline at end of file
+        pass
+
+    def predict_batch(self, model: Any, rows: List[Any]) -> List[Any]:
+        """Stack rows into one batch, run a single predict call and split the outputs per row"""
+        outputs = self.predict(model, np.asarray(rows))
+        return list(np.asarray(outputs))
+
+    def estimate_size(self, model: Any, path: str) -> int:
+        """Estimated in-memory size of a loaded model, defaults to its size on disk"""
+        return os.path.getsize(path)
+
+    def load_cached(
+        self,
+        path: str,
+        key: Optional[Hashable] = None,
+        version: Optional[Hashable] = None,
+        cache: Optional[ModelCache] = None,
+        **load_kwargs
+    ) -> Any:
+        """
+        Load a model through the shared model cache.
+        key defaults to the path and version to the file's mtime and size,
+        pass the model ID and content hash when they are known.
+        """
+        cache = cache or model_cache
+        if version is None:
+            stats = os.stat(path)
+            version = (stats.st_mtime_ns, stats.st_size)
+        cache_key = (type(self).__name__, key or path, tuple(sorted(load_kwargs.items())))
+        return cache.get_or_load(
+            cache_key,
+            version,
+            lambda: self.load_model(path, **load_kwargs),
+            lambda model: self.estimate_size(model, path)
+        )
@@ -0,0 +1,132 @@
+from typing import Any, Callable, Dict, Hashable, Tuple
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+import threading
+
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 2GB
+
+
+@dataclass
+class CacheEntry:
+    model: Any
+    size: int
+    version: Hashable
+
+
+class ModelCache:
+    """
+    Process-wide LRU cache of loaded models, bounded by an estimated memory budget.
+
+    Entries are keyed by a model key (model ID or path) and a version (content
+    hash or mtime), so a changed artifact replaces its stale entry instead of
+    being served from cache. Concurrent misses on the same key share a single
+    load: the first caller loads, the others wait on its result.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._inflight: Dict[Tuple[Hashable, Hashable], Future] = {}
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.bytes_loaded = 0
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        version: Hashable,
+        loader: Callable[[], Any],
+        sizer: Callable[[Any], int]
+    ) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.model
+
+            future = self._inflight.get((key, version))
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[(key, version)] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            model = loader()
+            size = sizer(model)
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[(key, version)]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._inflight[(key, version)]
+            self.bytes_loaded += size
+            self._remove(key)
+            if size <= self.max_bytes:
+                self._entries[key] = CacheEntry(model=model, size=size, version=version)
+                self.current_bytes += size
+                self._evict()
+        future.set_result(model)
+        return model
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry.size
+
+    def _evict(self) -> None:
+        while self.current_bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self.current_bytes -= entry.size
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> int:
+        """Drop every entry whose key is, or is a tuple containing, key"""
+        with self._lock:
+            matches = [
+                cached for cached in self._entries
+                if cached == key or (isinstance(cached, tuple) and key in cached)
+            ]
+            for cached in matches:
+                self._remove(cached)
+        return len(matches)
+
+    def resize(self, max_bytes: int) -> None:
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "current_bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "bytes_loaded": self.bytes_loaded
+            }
+
+
+# Shared by every framework handler in this process
+model_cache = ModelCache()
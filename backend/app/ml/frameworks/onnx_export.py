@@ -0,0 +1,107 @@
+from typing import Any, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+
+DEFAULT_OPSET = 17
+
+
+def export_pytorch(model: Any, input_shape: List[int], path: str, opset: int = DEFAULT_OPSET) -> str:
+    """Trace a torch.nn.Module into ONNX with a dynamic batch dimension"""
+    import torch
+    if not isinstance(model, torch.nn.Module):
+        raise ValueError("Only full torch.nn.Module checkpoints can be exported, not state dicts")
+    model.eval()
+    sample = torch.randn(1, *input_shape)
+    torch.onnx.export(
+        model,
+        (sample,),
+        path,
+        opset_version=opset,
+        input_names=["input"],
+        output_names=["output"],
+        dynamic_axes={"input": {0: "batch"}, "output": {0: "batch"}}
+    )
+    return path
+
+
+def export_keras(model: Any, input_shape: List[int], path: str, opset: int = DEFAULT_OPSET) -> str:
+    try:
+        import tf2onnx
+    except ImportError:
+        raise ValueError("Keras models cannot be exported, tf2onnx is not installed")
+    import tensorflow as tf
+    signature = (tf.TensorSpec((None, *input_shape), tf.float32, name="input"),)
+    tf2onnx.convert.from_keras(model, input_signature=signature, opset=opset, output_path=path)
+    return path
+
+
+def export_sklearn(model: Any, input_shape: List[int], path: str, opset: Optional[int] = None) -> str:
+    from skl2onnx import to_onnx
+    from skl2onnx.common.data_types import FloatTensorType
+    onnx_model = to_onnx(
+        model,
+        initial_types=[("input", FloatTensorType([None, *input_shape]))],
+        target_opset=opset
+    )
+    with open(path, "wb") as buffer:
+        buffer.write(onnx_model.SerializeToString())
+    return path
+
+
+EXPORTERS = {
+    "pytorch": export_pytorch,
+    "tensorflow": export_keras,
+    "scikit-learn": export_sklearn
+}
+
+
+def export_to_onnx(
+    framework: str,
+    model: Any,
+    input_shape: List[int],
+    path: str,
+    opset: Optional[int] = DEFAULT_OPSET
+) -> str:
+    """
+    Export a loaded model to an ONNX file.
+    input_shape is the shape of one instance, without the batch dimension.
+    """
+    if framework not in EXPORTERS:
+        raise ValueError(f"ONNX export is not supported for framework {framework}")
+    try:
+        return EXPORTERS[framework](model, input_shape, path, opset)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+
+def export_model_file(
+    framework: str,
+    path: str,
+    input_shape: List[int],
+    output_path: str,
+    opset: Optional[int] = DEFAULT_OPSET
+) -> str:
+    """Load the model file at path and export it to output_path"""
+    from .registry import get_handler
+    model = get_handler(framework).load_model(path)
+    return export_to_onnx(framework, model, input_shape, output_path, opset)
+
+
+def export_in_subprocess(
+    framework: str,
+    path: str,
+    input_shape: List[int],
+    output_path: str,
+    opset: Optional[int] = DEFAULT_OPSET
+) -> str:
+    """
+    Run export_model_file in a fresh process, so the model, the framework it
+    needs and the conversion never load into the calling process, and their
+    memory is returned when the export ends.
+    """
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(export_model_file, framework, path, input_shape, output_path, opset).result()
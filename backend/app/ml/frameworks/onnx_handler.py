@@ -0,0 +1,63 @@
+import onnxruntime as ort
+import numpy as np
+from typing import Any, List, Optional
+from .base_handler import BaseModelHandler
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disabled": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+}
+
+# ONNX tensor element types to numpy dtypes
+ONNX_DTYPES = {
+    "tensor(float)": np.float32,
+    "tensor(double)": np.float64,
+    "tensor(int64)": np.int64,
+    "tensor(int32)": np.int32,
+    "tensor(bool)": np.bool_
+}
+
+class OnnxRuntimeHandler(BaseModelHandler):
+    """
+    Serve exported ONNX models with ONNX Runtime.
+    The loaded model is an InferenceSession, which is thread-safe, so one session
+    per model is reused through the model cache by every request.
+    """
+
+    def __init__(
+        self,
+        intra_op_threads: int = 0,
+        inter_op_threads: int = 0,
+        optimization_level: str = "all",
+        providers: Optional[List[str]] = None
+    ):
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.optimization_level = optimization_level
+        self.providers = providers or ["CPUExecutionProvider"]
+
+    def session_options(self) -> ort.SessionOptions:
+        options = ort.SessionOptions()
+        options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[self.optimization_level]
+        # 0 lets ONNX Runtime pick based on the available cores
+        options.intra_op_num_threads = self.intra_op_threads
+        options.inter_op_num_threads = self.inter_op_threads
+        if self.inter_op_threads > 1:
+            options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+        return options
+
+    def load_model(self, path: str) -> ort.InferenceSession:
+        return ort.InferenceSession(path, sess_options=self.session_options(), providers=self.providers)
+    
+    def save_model(self, model: Any, path: str) -> str:
+        data = model if isinstance(model, bytes) else model.SerializeToString()
+        with open(path, "wb") as buffer:
+            buffer.write(data)
+        return path
+    
+    def predict(self, model: ort.InferenceSession, data: Any) -> Any:
+        model_input = model.get_inputs()[0]
+        dtype = ONNX_DTYPES.get(model_input.type, np.float32)
+        return model.run(None, {model_input.name: np.asarray(data, dtype=dtype)})[0]
@@ -1,19 +1,197 @@
 import torch
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Union
+import numpy as np
+import contextlib
+import logging
+import os
+import pickle
+import threading
+import time
+import weakref
+import zipfile
 from .base_handler import BaseModelHandler
+from app.ml.training.cancellation import CancellationToken, TrainingCancelled
+from app.ml.training.checkpoint import (
+    CheckpointConfig, CheckpointWriter, load_checkpoint, rng_state, set_rng_state, snapshot
+)
+from app.ml.training.data import DatasetSpec, DevicePrefetcher, build_dataloader, select_device, set_sampler_epoch
+from app.ml.training.early_stopping import EarlyStopping
+from app.ml.training.instrumentation import EPOCH_METRICS, StepStats
+
+logger = logging.getLogger(__name__)
+
+SAFETENSORS_EXTENSION = ".safetensors"
+COMPILE_MODES = ["trace", "script", "compile"]
+PRECISIONS = ["fp32", "bf16", "fp16"]
+# Epoch metrics combined over the ranks of a data-parallel job, in the same order on every rank
+REDUCED_METRICS = ["train_loss", "val_loss"] + EPOCH_METRICS
+
+def autocast_settings(precision: Optional[str], device_type: str) -> Tuple[Optional[torch.dtype], bool]:
+    """
+    Autocast dtype and whether a GradScaler is needed for a precision on a device.
+    fp16 needs loss scaling and is only used on CUDA; elsewhere it falls back to
+    bf16, which keeps fp32's exponent range and trains without a scaler.
+    """
+    if precision in (None, "fp32"):
+        return None, False
+    if precision not in PRECISIONS:
+        raise ValueError(f"precision must be one of {PRECISIONS}")
+    if precision == "fp16" and device_type == "cuda":
+        return torch.float16, True
+    if precision == "fp16":
+        logger.warning(f"fp16 autocast is not supported for training on {device_type}, using bf16")
+    return torch.bfloat16, False
+
+def is_torchscript(path: str) -> bool:
+    """Whether a file is a TorchScript archive (torch.jit.save) rather than a torch.save pickle"""
+    if not zipfile.is_zipfile(path):
+        return False
+    with zipfile.ZipFile(path) as archive:
+        return any(name.split("/")[1:2] == ["code"] for name in archive.namelist())
 
 class PyTorchHandler(BaseModelHandler):
-    def load_model(self, path: str) -> torch.nn.Module:
-        return torch.load(path)
+    def __init__(self, compile_mode: Optional[str] = None, trust_pickled_models: bool = False):
+        """
+        compile_mode selects how predict runs a model: None for eager, "trace" or
+        "script" for a frozen TorchScript graph, "compile" for torch.compile.
+        Compiled callables are cached per model and input signature (trailing
+        shape, dtype, device); a model that fails to compile runs eagerly.
+        trust_pickled_models lets load_model unpickle whole nn.Module checkpoints,
+        which runs any code in the file; only enable it for trusted uploads.
+        """
+        if compile_mode is not None and compile_mode not in COMPILE_MODES:
+            raise ValueError(f"compile_mode must be one of {COMPILE_MODES}")
+        self.compile_mode = compile_mode
+        self.trust_pickled_models = trust_pickled_models
+        self._compiled: "weakref.WeakKeyDictionary[torch.nn.Module, Dict[Hashable, Optional[Callable]]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._compile_lock = threading.Lock()
+
+    def load_model(
+        self,
+        path: str,
+        mmap: bool = False,
+        map_location: str = 'cpu'
+    ) -> torch.nn.Module:
+        """
+        Load a checkpoint onto map_location.
+        With mmap=True tensor storages are memory-mapped from the file instead of
+        copied, so pages are shared through the page cache across worker processes
+        and only read when touched. This needs the zipfile checkpoint format (see
+        convert_for_mmap); legacy checkpoints fall back to a regular load.
+        .safetensors files are always memory-mapped and load as a state dict.
+        Whole models load from TorchScript archives; torch.save checkpoints are
+        only unpickled to tensors and containers unless trust_pickled_models is set.
+        """
+        if path.endswith(SAFETENSORS_EXTENSION):
+            from safetensors.torch import load_file
+            return load_file(path, device=map_location)
+        if is_torchscript(path):
+            return torch.jit.load(path, map_location=map_location)
+
+        mmap = mmap and zipfile.is_zipfile(path)
+        try:
+            return torch.load(
+                path, map_location=map_location, mmap=mmap, weights_only=not self.trust_pickled_models
+            )
+        except pickle.UnpicklingError as e:
+            raise ValueError(
+                "Checkpoint holds objects other than tensors, save the model with torch.jit.save "
+                "or enable trust_pickled_models for trusted uploads"
+            ) from e
     
     def save_model(self, model: torch.nn.Module, path: str) -> str:
+        if path.endswith(SAFETENSORS_EXTENSION):
+            from safetensors.torch import save_file
+            save_file(model, path)
+            return path
         torch.save(model, path)
         return path
+
+    def convert_for_mmap(self, path: str, output_path: Optional[str] = None) -> bool:
+        """
+        Rewrite a checkpoint into a format that load_model(mmap=True) can map.
+        Legacy (non-zip) checkpoints are re-saved in the zipfile format; a state
+        dict is written as safetensors when output_path asks for it.
+        Returns False when the file is already mmap-compatible and was left as is.
+        Only tensors and plain containers are unpickled, so whole pickled modules
+        cannot be converted; this is an offline tool, not run on uploads.
+        """
+        output_path = output_path or path
+        to_safetensors = output_path.endswith(SAFETENSORS_EXTENSION)
+        if not to_safetensors and zipfile.is_zipfile(path) and output_path == path:
+            return False
+
+        checkpoint = torch.load(path, map_location='cpu', weights_only=True)
+        temp_path = f"{output_path}.converting"
+        if to_safetensors:
+            from safetensors.torch import save_file
+            save_file({name: tensor.contiguous() for name, tensor in checkpoint.items()}, temp_path)
+        else:
+            torch.save(checkpoint, temp_path)
+        os.replace(temp_path, output_path)
+        return True
+
+    def estimate_size(self, model: Any, path: str) -> int:
+        if isinstance(model, torch.nn.Module):
+            tensors = list(model.parameters()) + list(model.buffers())
+        elif isinstance(model, dict):
+            tensors = [t for t in model.values() if isinstance(t, torch.Tensor)]
+        else:
+            return super().estimate_size(model, path)
+        return sum(t.numel() * t.element_size() for t in tensors)
     
     def predict(self, model: torch.nn.Module, data: torch.Tensor) -> torch.Tensor:
+        if not isinstance(model, torch.nn.Module):
+            raise ValueError("A state dict has no architecture to run, serve a TorchScript archive instead")
         model.eval()
-        with torch.no_grad():
-            return model(data)
+        with torch.inference_mode():
+            if self.compile_mode is None:
+                return model(data)
+
+            signature = (tuple(data.shape[1:]), data.dtype, data.device.type)
+            compiled = self._get_compiled(model, data, signature)
+            if compiled is None:
+                return model(data)
+            try:
+                return compiled(data)
+            except Exception as e:
+                # torch.compile defers most failures to the first call
+                logger.warning(f"Compiled {self.compile_mode} model failed, falling back to eager: {str(e)}")
+                self._compiled[model][signature] = None
+                return model(data)
+
+    def _get_compiled(self, model: torch.nn.Module, example: torch.Tensor, signature: Hashable) -> Optional[Callable]:
+        """Return the compiled callable of a model for an input signature, None to run eagerly"""
+        with self._compile_lock:
+            by_signature = self._compiled.setdefault(model, {})
+            if signature in by_signature:
+                return by_signature[signature]
+            try:
+                compiled = self.compile_model(model, example)
+            except Exception as e:
+                logger.warning(f"Could not {self.compile_mode} model, running eagerly: {str(e)}")
+                compiled = None
+            by_signature[signature] = compiled
+            return compiled
+
+    def compile_model(self, model: torch.nn.Module, example: torch.Tensor) -> Callable:
+        """Build the inference callable of an eval-mode model for the configured compile_mode"""
+        if self.compile_mode == "compile":
+            return torch.compile(model, dynamic=True)
+
+        # TorchScript graphs are built outside inference_mode, whose tensors cannot be traced
+        with torch.inference_mode(False), torch.no_grad():
+            if self.compile_mode == "trace":
+                scripted = torch.jit.trace(model, example.clone())
+            else:
+                scripted = torch.jit.script(model)
+            return torch.jit.freeze(scripted)
+
+    def predict_batch(self, model: torch.nn.Module, rows: List[Any]) -> List[Any]:
+        batch = torch.as_tensor(np.asarray(rows, dtype=np.float32))
+        return list(self.predict(model, batch).cpu().numpy())
     
     def train_step(
         self,
@@ -21,36 +199,308 @@ class PyTorchHandler(BaseModelHandler):
         data: torch.Tensor,
         labels: torch.Tensor,
         optimizer: torch.optim.Optimizer,
-        criterion: torch.nn.Module
+        criterion: torch.nn.Module,
+        autocast_dtype: Optional[torch.dtype] = None,
+        scaler: Optional[torch.amp.GradScaler] = None,
+        loss_scale: float = 1.0,
+        zero_grad: bool = True,
+        step: bool = True,
+        stats: Optional[StepStats] = None
     ) -> float:
+        """
+        Forward and backward pass of one batch, run under autocast_dtype when set.
+        For gradient accumulation pass loss_scale=1/N, zero_grad only on the first
+        micro-batch of a group and step only on its last. The optimizer step's
+        time is added to stats.optimizer_time.
+        """
         model.train()
-        optimizer.zero_grad()
-        outputs = model(data)
-        loss = criterion(outputs, labels)
-        loss.backward()
-        optimizer.step()
+        if zero_grad:
+            optimizer.zero_grad()
+        with torch.autocast(data.device.type, dtype=autocast_dtype, enabled=autocast_dtype is not None):
+            outputs = model(data)
+            loss = criterion(outputs, labels)
+        scaled_loss = loss * loss_scale if loss_scale != 1.0 else loss
+        if scaler is not None:
+            scaler.scale(scaled_loss).backward()
+        else:
+            scaled_loss.backward()
+        if step:
+            started = time.perf_counter()
+            if scaler is not None:
+                scaler.step(optimizer)
+                scaler.update()
+            else:
+                optimizer.step()
+            if stats is not None:
+                stats.optimizer_time += time.perf_counter() - started
         return loss.item()
     
     def train(
         self,
         model: torch.nn.Module,
-        train_loader: torch.utils.data.DataLoader,
+        train_loader: Union[torch.utils.data.DataLoader, DatasetSpec],
         criterion: torch.nn.Module,
         optimizer: torch.optim.Optimizer,
         epochs: int,
-        device: str = 'cuda'
+        device: Optional[str] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        checkpoint: Optional[CheckpointConfig] = None,
+        precision: Optional[str] = None,
+        accumulation_steps: int = 1,
+        epoch_callback: Optional[Callable[[int, Dict], None]] = None,
+        val_loader: Optional[Union[torch.utils.data.DataLoader, DatasetSpec]] = None,
+        early_stopping: Optional[EarlyStopping] = None
     ) -> Dict:
+        """
+        Train for a number of epochs.
+        train_loader is a DataLoader or a DatasetSpec to build one from, and
+        device defaults to the best available accelerator. Batches are moved
+        to device by a DevicePrefetcher. Besides losses, history records per
+        epoch the StepStats metrics: throughput in samples and, for integer
+        token ID inputs, tokens per second, step time percentiles, seconds
+        spent waiting for data, computing and stepping the optimizer, and the
+        process's peak RSS.
+        precision ('fp32', 'bf16' or 'fp16') selects autocast mixed precision,
+        with a GradScaler for fp16 on CUDA. With accumulation_steps > 1 the
+        gradients of that many batches are summed before each optimizer step,
+        for an effective batch size of accumulation_steps * batch size; step
+        counts below are optimizer steps. epoch_callback(epoch, history) is
+        called after every epoch.
+        With val_loader the model is evaluated after every epoch into
+        history['val_loss']. early_stopping is fed each epoch's history and
+        ends training once its monitored metric plateaus, restoring the best
+        epoch's weights when it keeps them.
+        cancel_token is checked before every batch; on cancellation gradients
+        and optimizer state are dropped before TrainingCancelled propagates.
+
+        With checkpoint set, model, optimizer, history, RNG states and the
+        position in the epoch are saved every checkpoint.every_steps steps and
+        every_epochs epochs by a background CheckpointWriter. Resuming from a
+        mid-epoch checkpoint replays the epoch's shuffle order and skips the
+        batches already trained on.
+
+        Inside an initialized torch.distributed process group (see
+        app.ml.training.distributed.launch) every rank trains a
+        DistributedDataParallel copy of the model on its shard of a
+        DatasetSpec, cancellation is agreed on by all ranks, history holds
+        values averaged over ranks (throughputs and peak_rss_mb are summed
+        over them), and only rank 0 writes checkpoints and
+        calls epoch_callback.
+        """
+        if accumulation_steps < 1:
+            raise ValueError("accumulation_steps must be at least 1")
+        device = select_device(device)
+        device_type = device.type
+        distributed = torch.distributed.is_available() and torch.distributed.is_initialized()
+        rank = torch.distributed.get_rank() if distributed else 0
+        world_size = torch.distributed.get_world_size() if distributed else 1
+        if isinstance(train_loader, DatasetSpec):
+            train_loader = build_dataloader(train_loader, device, rank=rank, world_size=world_size)
+        if isinstance(val_loader, DatasetSpec):
+            val_loader = build_dataloader(val_loader, device, rank=rank, world_size=world_size)
         model.to(device)
+        autocast_dtype, use_scaler = autocast_settings(precision, device_type)
+        scaler = torch.amp.GradScaler(device_type) if use_scaler else None
+        num_batches = len(train_loader)
         history = {'train_loss': []}
+        if val_loader is not None:
+            history['val_loss'] = []
+        start_epoch, start_batch, global_step, resumed_loss = 0, 0, 0, 0.0
+        resume_state = None
+        writer = None
+        if checkpoint is not None:
+            if checkpoint.resume_from:
+                resume_state = load_checkpoint(checkpoint.resume_from, map_location=device)
+                model.load_state_dict(resume_state['model'])
+                optimizer.load_state_dict(resume_state['optimizer'])
+                if scaler is not None and resume_state.get('scaler'):
+                    scaler.load_state_dict(resume_state['scaler'])
+                history = resume_state['history']
+                start_epoch = resume_state['epoch']
+                start_batch = resume_state['batch']
+                global_step = resume_state['step']
+                resumed_loss = resume_state['epoch_loss']
+                # The epoch's shuffle order is drawn when its iterator is created
+                set_rng_state(resume_state['epoch_rng'] if start_batch else resume_state['rng'])
+                # Checkpoints written without validation
+                if val_loader is not None:
+                    history.setdefault('val_loss', [])
+                if early_stopping is not None and resume_state.get('early_stopping'):
+                    early_stopping.load_state_dict(resume_state['early_stopping'])
+            if rank == 0:
+                writer = CheckpointWriter(checkpoint.directory, keep_last=checkpoint.keep_last)
+        # Wrapped after the resume so checkpoints keep plain module state dicts
+        train_model = torch.nn.parallel.DistributedDataParallel(model) if distributed else model
         
-        for epoch in range(epochs):
-            epoch_loss = 0
-            for batch_data, batch_labels in train_loader:
-                batch_data = batch_data.to(device)
-                batch_labels = batch_labels.to(device)
-                loss = self.train_step(model, batch_data, batch_labels, optimizer, criterion)
-                epoch_loss += loss
-            
-            history['train_loss'].append(epoch_loss / len(train_loader))
+        try:
+            for epoch in range(start_epoch, epochs):
+                epoch_rng = rng_state() if writer is not None else None
+                set_sampler_epoch(train_loader, epoch)
+                batches = iter(train_loader)
+                skip = start_batch if epoch == start_epoch else 0
+                epoch_loss = resumed_loss if skip else 0
+                if skip:
+                    # Skipped batches are drawn before the prefetcher so they are never copied to device
+                    for _ in range(skip):
+                        next(batches)
+                    set_rng_state(resume_state['rng'])
+                batches = DevicePrefetcher(batches, device)
+                stats = StepStats()
+                
+                for batch_index in range(skip, num_batches):
+                    if cancel_token is not None:
+                        self._check_cancelled(cancel_token, distributed)
+                    started = time.perf_counter()
+                    batch = next(batches, None)
+                    if batch is None:
+                        break
+                    batch_data, batch_labels = batch
+                    fetched = time.perf_counter()
+                    # The last group of an epoch may hold fewer than accumulation_steps batches
+                    group_start = batch_index - batch_index % accumulation_steps
+                    group_size = min(accumulation_steps, num_batches - group_start)
+                    is_last = batch_index - group_start == group_size - 1
+                    # Gradients are only all-reduced on the micro-batch that steps
+                    sync = contextlib.nullcontext() if is_last or not distributed else train_model.no_sync()
+                    with sync:
+                        loss = self.train_step(
+                            train_model, batch_data, batch_labels, optimizer, criterion,
+                            autocast_dtype=autocast_dtype,
+                            scaler=scaler,
+                            loss_scale=1.0 / group_size,
+                            zero_grad=batch_index == group_start,
+                            step=is_last,
+                            stats=stats
+                        )
+                    # loss.item() synchronizes with the device, so this covers the batch's full compute
+                    stats.record(
+                        time.perf_counter() - started, len(batch_labels),
+                        tokens=self._count_tokens(batch_data), data_wait=fetched - started
+                    )
+                    epoch_loss += loss
+                    if not is_last:
+                        continue
+                    global_step += 1
+                    
+                    if writer is not None and checkpoint.every_steps and global_step % checkpoint.every_steps == 0:
+                        writer.save(global_step, self._checkpoint_state(
+                            model, optimizer, scaler, history, epoch, batch_index + 1, global_step, epoch_loss, epoch_rng,
+                            early_stopping
+                        ))
+                
+                epoch_metrics = {'train_loss': epoch_loss / num_batches, **stats.summary()}
+                if val_loader is not None:
+                    epoch_metrics['val_loss'] = self.evaluate(model, val_loader, criterion, device, autocast_dtype)
+                if distributed:
+                    epoch_metrics = self._reduce_over_ranks(epoch_metrics)
+                for name, value in epoch_metrics.items():
+                    history.setdefault(name, []).append(value)
+                # Every rank sees the same averaged metrics, so they all stop at the same epoch
+                stop = early_stopping is not None and early_stopping.update(
+                    epoch + 1, history, lambda: snapshot(model.state_dict())
+                )
+                if epoch_callback is not None and rank == 0:
+                    epoch_callback(epoch + 1, history)
+                if writer is not None and checkpoint.every_epochs and (epoch + 1) % checkpoint.every_epochs == 0:
+                    writer.save(global_step, self._checkpoint_state(
+                        model, optimizer, scaler, history, epoch + 1, 0, global_step, 0.0, None, early_stopping
+                    ))
+                if stop:
+                    logger.info(f"Early stopping after epoch {epoch + 1}, best epoch {early_stopping.best_epoch}")
+                    break
+        except TrainingCancelled:
+            model.zero_grad(set_to_none=True)
+            optimizer.state.clear()
+            raise
+        finally:
+            if writer is not None:
+                writer.close()
         
-        return history
\ No newline at end of file
+        if early_stopping is not None and early_stopping.best_weights is not None:
+            model.load_state_dict(early_stopping.best_weights)
+        return history
+
+    def evaluate(
+        self,
+        model: torch.nn.Module,
+        loader: torch.utils.data.DataLoader,
+        criterion: torch.nn.Module,
+        device: Optional[str] = None,
+        autocast_dtype: Optional[torch.dtype] = None
+    ) -> float:
+        """Mean loss per sample over a loader"""
+        device = select_device(device)
+        model.eval()
+        total_loss, total_samples = 0.0, 0
+        with torch.inference_mode(), torch.autocast(
+            device.type, dtype=autocast_dtype, enabled=autocast_dtype is not None
+        ):
+            for batch_data, batch_labels in DevicePrefetcher(iter(loader), device):
+                loss = criterion(model(batch_data), batch_labels)
+                total_loss += loss.item() * len(batch_labels)
+                total_samples += len(batch_labels)
+        return total_loss / max(total_samples, 1)
+
+    @staticmethod
+    def _check_cancelled(cancel_token: CancellationToken, distributed: bool) -> None:
+        """Raise TrainingCancelled, on every rank at the same batch when distributed"""
+        if not distributed:
+            cancel_token.raise_if_cancelled()
+            return
+        # A rank that stopped alone would leave the others blocked in the gradient all-reduce
+        flag = torch.tensor([1 if cancel_token.cancelled else 0])
+        torch.distributed.all_reduce(flag, op=torch.distributed.ReduceOp.MAX)
+        if flag.item():
+            raise TrainingCancelled()
+
+    @staticmethod
+    def _reduce_over_ranks(metrics: Dict[str, float]) -> Dict[str, float]:
+        """
+        Metrics averaged over the ranks that report them, except throughputs
+        and peak memory which are summed into the job's. Ranks may leave out
+        different metrics, so every rank reduces the same ordered REDUCED_METRICS,
+        each with a flag of whether it reported it; other names stay per rank.
+        """
+        values = torch.tensor(
+            [[metrics.get(name, 0.0), float(name in metrics)] for name in REDUCED_METRICS], dtype=torch.float64
+        )
+        torch.distributed.all_reduce(values)
+        reduced = {name: value for name, value in metrics.items() if name not in REDUCED_METRICS}
+        for name, (total, reporting) in zip(REDUCED_METRICS, values.tolist()):
+            if reporting:
+                reduced[name] = total if name.endswith(('_per_second', 'peak_rss_mb')) else total / reporting
+        return reduced
+
+    @staticmethod
+    def _count_tokens(inputs: torch.Tensor) -> int:
+        """Tokens of a (batch, sequence, ...) tensor of token IDs, 0 for any other input"""
+        if inputs.dim() < 2 or inputs.dtype.is_floating_point or inputs.dtype.is_complex or inputs.dtype == torch.bool:
+            return 0
+        return inputs.numel()
+
+    def _checkpoint_state(
+        self,
+        model: torch.nn.Module,
+        optimizer: torch.optim.Optimizer,
+        scaler: Optional[torch.amp.GradScaler],
+        history: Dict,
+        epoch: int,
+        batch: int,
+        step: int,
+        epoch_loss: float,
+        epoch_rng: Optional[Dict],
+        early_stopping: Optional[EarlyStopping] = None
+    ) -> Dict:
+        return {
+            'model': model.state_dict(),
+            'optimizer': optimizer.state_dict(),
+            'scaler': scaler.state_dict() if scaler is not None else None,
+            'history': {name: list(values) for name, values in history.items()},
+            'epoch': epoch,
+            'batch': batch,
+            'step': step,
+            'epoch_loss': epoch_loss,
+            'epoch_rng': epoch_rng,
+            'early_stopping': early_stopping.state_dict() if early_stopping is not None else None,
+            'rng': rng_state()
+        }
\ No newline at end of file
@@ -0,0 +1,36 @@
+from typing import Any, Dict
+from .base_handler import BaseModelHandler
+
+_handlers: Dict[str, BaseModelHandler] = {}
+_handler_options: Dict[str, Dict[str, Any]] = {}
+
+
+def configure_handler(framework: str, **options) -> None:
+    """Set constructor options for a framework's handler, applied on its next creation"""
+    _handler_options[framework] = options
+    _handlers.pop(framework, None)
+
+
+def get_handler(framework: str) -> BaseModelHandler:
+    """
+    Return the shared handler for a framework.
+    Framework modules are imported on first use, so a serving process only
+    pays for the frameworks its models need (ONNX models never import TensorFlow).
+    """
+    if framework not in _handlers:
+        options = _handler_options.get(framework, {})
+        if framework == "pytorch":
+            from .pytorch_handler import PyTorchHandler
+            _handlers[framework] = PyTorchHandler(**options)
+        elif framework == "tensorflow":
+            from .tensorflow_handler import TensorFlowHandler
+            _handlers[framework] = TensorFlowHandler(**options)
+        elif framework == "scikit-learn":
+            from .sklearn_handler import SklearnHandler
+            _handlers[framework] = SklearnHandler(**options)
+        elif framework == "onnx":
+            from .onnx_handler import OnnxRuntimeHandler
+            _handlers[framework] = OnnxRuntimeHandler(**options)
+        else:
+            raise ValueError(f"Unsupported framework: {framework}")
+    return _handlers[framework]
@@ -1,15 +1,43 @@
-from sklearn.base import BaseEstimator
+from sklearn.base import BaseEstimator, is_classifier
+import copy
 import joblib
-from typing import Any, Dict
+import logging
+import time
+from typing import Callable, Dict, Optional, Union
 import numpy as np
 from .base_handler import BaseModelHandler
+from app.ml.training.cancellation import CancellationToken
+from app.ml.training.chunks import ChunkedDataset, Holdout
+from app.ml.training.early_stopping import EarlyStopping
+from app.ml.training.instrumentation import StepStats
+
+logger = logging.getLogger(__name__)
+
+def _is_clusterer(model: BaseEstimator) -> bool:
+    try:
+        from sklearn.base import is_clusterer
+    except ImportError:  # scikit-learn < 1.6
+        return getattr(model, '_estimator_type', None) == 'clusterer'
+    return is_clusterer(model)
 
 class SklearnHandler(BaseModelHandler):
-    def load_model(self, path: str) -> BaseEstimator:
-        return joblib.load(path)
+    def load_model(self, path: str, mmap_mode: Optional[str] = None) -> BaseEstimator:
+        """
+        Load an estimator saved with joblib.
+        With mmap_mode='r' the numpy arrays held by the estimator (coefficients,
+        support vectors, stored training data) are memory-mapped read-only from an
+        uncompressed dump, so every worker shares the same page-cache pages instead
+        of its own copy. Compressed dumps are loaded normally.
+        """
+        return joblib.load(path, mmap_mode=mmap_mode)
     
-    def save_model(self, model: BaseEstimator, path: str) -> str:
-        joblib.dump(model, path)
+    def save_model(self, model: BaseEstimator, path: str, compress: int = 0) -> str:
+        """
+        Save an estimator with joblib.
+        The default uncompressed dump is the one load_model(mmap_mode='r') can
+        memory-map; a compressed one (compress > 0) is smaller but always copied.
+        """
+        joblib.dump(model, path, compress=compress)
         return path
     
     def predict(self, model: BaseEstimator, data: np.ndarray) -> np.ndarray:
@@ -18,13 +46,140 @@ class SklearnHandler(BaseModelHandler):
     def train(
         self,
         model: BaseEstimator,
-        X_train: np.ndarray,
-        y_train: np.ndarray,
+        X_train: Union[np.ndarray, ChunkedDataset],
+        y_train: Optional[np.ndarray] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        X_val: Optional[Union[np.ndarray, ChunkedDataset]] = None,
+        y_val: Optional[np.ndarray] = None,
+        epochs: int = 1,
+        early_stopping: Optional[EarlyStopping] = None,
+        epoch_callback: Optional[Callable[[int, Dict], None]] = None,
+        **kwargs
+    ) -> Dict:
+        """
+        A ChunkedDataset as X_train is streamed through train_chunked when the
+        estimator implements partial_fit, and read into memory otherwise, as
+        is one passed as X_val.
+        Fit and return per-epoch train_score, val_score when X_val is given,
+        and the StepStats metrics of each pass; epoch_callback(epoch, history)
+        follows each of them.
+        With epochs > 1 or early_stopping, estimators that implement partial_fit
+        take one pass over the data per epoch and stop once early_stopping's
+        metric ('val_score' or 'train_score') plateaus, keeping the best epoch's
+        estimator; others are fitted once.
+        fit() cannot be interrupted, so cancel_token is only checked between
+        passes; the scheduler's grace-period kill covers long fits.
+        """
+        if isinstance(X_train, ChunkedDataset) and hasattr(model, 'partial_fit'):
+            return self.train_chunked(
+                model, X_train, epochs=epochs, cancel_token=cancel_token, early_stopping=early_stopping,
+                epoch_callback=epoch_callback, **kwargs
+            )
+        supervised = not _is_clusterer(model)
+        if isinstance(X_train, ChunkedDataset):
+            X_train, y_train = X_train.read(supervised)
+        if isinstance(X_val, ChunkedDataset):
+            X_val, y_val = X_val.read(supervised)
+        incremental = hasattr(model, 'partial_fit') and (epochs > 1 or early_stopping is not None)
+        if not incremental and (epochs > 1 or early_stopping is not None):
+            logger.warning(f"{type(model).__name__} has no partial_fit, fitting it once")
+        if incremental and is_classifier(model):
+            # partial_fit needs every class up front
+            kwargs.setdefault('classes', np.unique(y_train))
+        fit = model.partial_fit if incremental else model.fit
+
+        history = {'train_score': []}
+        if X_val is not None:
+            history['val_score'] = []
+        for epoch in range(epochs if incremental else 1):
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            stats = StepStats()
+            started = time.perf_counter()
+            fit(X_train, y_train, **kwargs)
+            stats.record(time.perf_counter() - started, len(X_train))
+            for name, value in stats.summary().items():
+                history.setdefault(name, []).append(value)
+            history['train_score'].append(model.score(X_train, y_train))
+            if X_val is not None:
+                history['val_score'].append(model.score(X_val, y_val))
+            stop = early_stopping is not None and early_stopping.update(epoch + 1, history, lambda: copy.deepcopy(model))
+            if epoch_callback is not None:
+                epoch_callback(epoch + 1, history)
+            if stop:
+                break
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+
+        if early_stopping is not None and early_stopping.best_weights is not None:
+            model.__setstate__(early_stopping.best_weights.__getstate__())
+        return history
+
+    def train_chunked(
+        self,
+        model: BaseEstimator,
+        dataset: ChunkedDataset,
+        epochs: int = 1,
+        holdout_size: int = 1000,
+        holdout_fraction: float = 0.1,
+        cancel_token: Optional[CancellationToken] = None,
+        early_stopping: Optional[EarlyStopping] = None,
+        chunk_callback: Optional[Callable[[int, int, int, float], None]] = None,
+        epoch_callback: Optional[Callable[[int, Dict], None]] = None,
         **kwargs
     ) -> Dict:
-        model.fit(X_train, y_train, **kwargs)
-        train_score = model.score(X_train, y_train)
-        return {'train_score': train_score}
+        """
+        Out-of-core training of an estimator that implements partial_fit.
+        Each epoch streams the dataset chunk by chunk, so memory holds one
+        chunk and the held-out sample (see Holdout) rather than the dataset.
+        history has holdout_score after every epoch, which early_stopping can
+        monitor, the StepStats metrics of each epoch with a chunk as the step
+        (reading it counts as data wait), and chunk_time with every chunk's
+        seconds. chunk_callback(epoch, chunk, rows, seconds) follows each chunk
+        and epoch_callback(epoch, history) each epoch.
+        Classifiers get their classes from a scan of the target column unless
+        classes is passed.
+        """
+        if not hasattr(model, 'partial_fit'):
+            raise ValueError(f"{type(model).__name__} does not implement partial_fit and cannot be trained in chunks")
+        supervised = not _is_clusterer(model)
+        if supervised and is_classifier(model) and 'classes' not in kwargs:
+            kwargs['classes'] = dataset.classes()
+        holdout = Holdout(size=holdout_size, fraction=holdout_fraction)
+
+        history = {'holdout_score': [], 'chunk_time': []}
+        for epoch in range(epochs):
+            stats = StepStats()
+            started = time.perf_counter()
+            for index, frame in enumerate(dataset.chunks()):
+                read = time.perf_counter()
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                X, y = holdout.split(index, *dataset.split(frame, supervised))
+                if len(X):
+                    if supervised:
+                        model.partial_fit(X, y, **kwargs)
+                    else:
+                        model.partial_fit(X, **kwargs)
+                finished = time.perf_counter()
+                stats.record(finished - started, len(X), data_wait=read - started)
+                history['chunk_time'].append(finished - started)
+                if chunk_callback is not None:
+                    chunk_callback(epoch + 1, index, len(X), finished - started)
+                started = time.perf_counter()
+
+            for name, value in stats.summary().items():
+                history.setdefault(name, []).append(value)
+            history['holdout_score'].append(holdout.score(model))
+            stop = early_stopping is not None and early_stopping.update(epoch + 1, history, lambda: copy.deepcopy(model))
+            if epoch_callback is not None:
+                epoch_callback(epoch + 1, history)
+            if stop:
+                break
+
+        if early_stopping is not None and early_stopping.best_weights is not None:
+            model.__setstate__(early_stopping.best_weights.__getstate__())
+        return history
     
     def get_params(self, model: BaseEstimator) -> Dict:
         return model.get_params()
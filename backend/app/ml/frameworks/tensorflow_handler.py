@@ -1,14 +1,95 @@
 import tensorflow as tf
-from typing import Any, Dict
+import logging
+import time
+from typing import Any, Callable, Dict, Optional, Union
 from .base_handler import BaseModelHandler
+from app.ml.training.cancellation import CancellationToken
+from app.ml.training.early_stopping import EarlyStopping
+from app.ml.training.instrumentation import StepStats
+from app.ml.training.tf_data import TFDataSpec, build_tf_dataset
+
+logger = logging.getLogger(__name__)
+
+class CancellationCallback(tf.keras.callbacks.Callback):
+    """Stops fit() at the next batch once the job's cancellation token is set"""
+
+    def __init__(self, cancel_token: CancellationToken):
+        super().__init__()
+        self.cancel_token = cancel_token
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self.cancel_token.raise_if_cancelled()
+
+class InstrumentationCallback(tf.keras.callbacks.Callback):
+    """
+    Adds StepStats metrics to fit()'s epoch logs, and so to its history.
+    The time between the end of a batch and the start of the next one is
+    counted as waiting for data.
+    """
+
+    def __init__(self, num_samples: Optional[int], batch_size: int):
+        super().__init__()
+        self.num_samples = num_samples
+        self.batch_size = batch_size
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.stats = StepStats()
+        self._last_end = time.perf_counter()
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self._batch_start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        now = time.perf_counter()
+        self.stats.record(now - self._last_end, self.batch_size, data_wait=self._batch_start - self._last_end)
+        self._last_end = now
+
+    def on_epoch_end(self, epoch, logs=None):
+        # The last batch of an epoch may be smaller, streamed datasets have no known size
+        if self.num_samples is not None:
+            self.stats.samples = min(self.stats.samples, self.num_samples)
+        if logs is not None:
+            logs.update(self.stats.summary())
+
+class EarlyStoppingCallback(tf.keras.callbacks.Callback):
+    """Runs the shared EarlyStopping on fit()'s epoch logs, restoring the best weights at the end"""
+
+    def __init__(self, early_stopping: EarlyStopping):
+        super().__init__()
+        self.early_stopping = early_stopping
+
+    def on_epoch_end(self, epoch, logs=None):
+        if self.early_stopping.update(epoch + 1, logs or {}, self.model.get_weights):
+            self.model.stop_training = True
+
+    def on_train_end(self, logs=None):
+        if self.early_stopping.best_weights is not None:
+            self.model.set_weights(self.early_stopping.best_weights)
 
 class TensorFlowHandler(BaseModelHandler):
+    def __init__(self, intra_op_threads: int = 0, inter_op_threads: int = 0):
+        """
+        Thread pools of TensorFlow's runtime, 0 lets TensorFlow size them from the
+        available cores. They can only be set before the runtime starts, so a
+        handler created after TensorFlow has run keeps the existing pools.
+        """
+        try:
+            if intra_op_threads:
+                tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+            if inter_op_threads:
+                tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+        except RuntimeError as e:
+            logger.warning(f"Could not configure TensorFlow threads: {str(e)}")
+
     def load_model(self, path: str) -> tf.keras.Model:
         return tf.keras.models.load_model(path)
     
     def save_model(self, model: tf.keras.Model, path: str) -> str:
         model.save(path)
         return path
+
+    def estimate_size(self, model: tf.keras.Model, path: str) -> int:
+        return sum(int(tf.size(w)) * w.dtype.size for w in model.weights)
     
     def predict(self, model: tf.keras.Model, data: Any) -> Any:
         return model.predict(data)
@@ -26,16 +107,46 @@ class TensorFlowHandler(BaseModelHandler):
     def train(
         self,
         model: tf.keras.Model,
-        train_data: tuple,
-        validation_data: tuple = None,
+        train_data: Union[tuple, TFDataSpec, tf.data.Dataset],
+        validation_data: Optional[Union[tuple, TFDataSpec, tf.data.Dataset]] = None,
         epochs: int = 10,
-        batch_size: int = 32
+        batch_size: int = 32,
+        cancel_token: Optional[CancellationToken] = None,
+        early_stopping: Optional[EarlyStopping] = None,
+        epoch_callback: Optional[Callable[[int, Dict], None]] = None
     ) -> Dict:
+        """
+        Fit and return the per-epoch history, which has val_ metrics when
+        validation_data is given and the StepStats metrics. early_stopping
+        monitors Keras' metric names ('val_loss', 'val_accuracy', ...) and
+        epoch_callback(epoch, logs) follows each epoch with its metrics.
+        train_data and validation_data are (inputs, targets) arrays held in
+        memory, or a TFDataSpec (see build_tf_dataset) or tf.data.Dataset
+        streamed from files, which are already batched and ignore batch_size.
+        """
+        if isinstance(train_data, TFDataSpec):
+            batch_size = train_data.batch_size
+            train_data = build_tf_dataset(train_data, training=True)
+        if isinstance(validation_data, TFDataSpec):
+            validation_data = build_tf_dataset(validation_data, training=False)
+        streamed = isinstance(train_data, tf.data.Dataset)
+
+        callbacks = [CancellationCallback(cancel_token)] if cancel_token is not None else []
+        callbacks.append(InstrumentationCallback(None if streamed else len(train_data[0]), batch_size))
+        if early_stopping is not None:
+            callbacks.append(EarlyStoppingCallback(early_stopping))
+        if epoch_callback is not None:
+            callbacks.append(tf.keras.callbacks.LambdaCallback(
+                on_epoch_end=lambda epoch, logs: epoch_callback(epoch + 1, logs or {})
+            ))
+        if streamed:
+            inputs = {"x": train_data}
+        else:
+            inputs = {"x": train_data[0], "y": train_data[1], "batch_size": batch_size}
         history = model.fit(
-            train_data[0],
-            train_data[1],
+            **inputs,
             validation_data=validation_data,
             epochs=epochs,
-            batch_size=batch_size
+            callbacks=callbacks
         )
         return history.history
\ No newline at end of file
@@ -0,0 +1,163 @@
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+from fastapi.concurrency import run_in_threadpool
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _fail(future: asyncio.Future, error: Exception) -> None:
+    if not future.done():
+        future.set_exception(error)
+
+
+class MicroBatcher:
+    """
+    Merge concurrent single-row requests into batched predict calls.
+
+    Rows are queued as they arrive; the worker takes the first waiting row,
+    keeps collecting until max_batch_size rows are queued or max_wait_ms has
+    passed, runs predict_fn on the whole batch in the threadpool and hands each
+    caller its own output row. While a batch runs the next one keeps filling,
+    so batches grow with load and stay at one row when traffic is light.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.loop = asyncio.get_running_loop()
+        self._queue: "asyncio.Queue[Tuple[Any, asyncio.Future]]" = asyncio.Queue()
+        self._worker = self.loop.create_task(self._run())
+        self._closed = False
+        self.batches = 0
+        self.rows = 0
+
+    async def submit(self, row: Any) -> Any:
+        if self._closed or self._worker.done():
+            raise RuntimeError("Batcher is closed")
+        future = self.loop.create_future()
+        await self._queue.put((row, future))
+        if self._closed:
+            # Closed while the row was being queued, after close drained the queue
+            _fail(future, RuntimeError("Batcher is closed"))
+        return await future
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        try:
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+        except asyncio.CancelledError:
+            for _, future in batch:
+                _fail(future, RuntimeError("Batcher is closed"))
+            raise
+        return batch
+
+    async def _predict(self, rows: List[Any]) -> List[Any]:
+        outputs = await run_in_threadpool(self.predict_fn, rows)
+        if len(outputs) != len(rows):
+            raise RuntimeError(f"Prediction returned {len(outputs)} outputs for {len(rows)} rows")
+        return outputs
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            batch = [(row, future) for row, future in batch if not future.cancelled()]
+            if not batch:
+                continue
+            try:
+                await self._run_batch(batch)
+            finally:
+                # Whatever stopped the batch, no caller is left waiting on it
+                for _, future in batch:
+                    _fail(future, RuntimeError("Prediction ended without a result"))
+
+    async def _run_batch(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        rows = [row for row, _ in batch]
+        try:
+            outputs = await self._predict(rows)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # Retry one by one so a single malformed row does not fail the whole batch
+            logger.warning(f"Batched predict of {len(batch)} rows failed, retrying individually: {str(e)}")
+            outputs = []
+            for row, future in batch:
+                try:
+                    outputs.append((await self._predict([row]))[0])
+                except Exception as row_error:
+                    outputs.append(row_error)
+
+        self.batches += 1
+        self.rows += len(batch)
+        for (_, future), output in zip(batch, outputs):
+            if future.cancelled():
+                continue
+            if isinstance(output, Exception):
+                future.set_exception(output)
+            else:
+                future.set_result(output)
+
+    def close(self) -> None:
+        """Stop the worker and fail every row that is still waiting"""
+        self._closed = True
+        self._worker.cancel()
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            _fail(future, RuntimeError("Batcher is closed"))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "average_batch_size": self.rows / self.batches if self.batches else 0.0,
+            "queued": self._queue.qsize()
+        }
+
+
+class BatcherPool:
+    """One MicroBatcher per model key, created on first use"""
+
+    def __init__(self, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._batchers: Dict[Hashable, MicroBatcher] = {}
+
+    def configure(self, max_batch_size: int, max_wait_ms: float) -> None:
+        """Set the batching limits of batchers created from now on"""
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+    def get(self, key: Hashable, predict_fn: Callable[[List[Any]], List[Any]]) -> MicroBatcher:
+        batcher = self._batchers.get(key)
+        if batcher is None or batcher.loop is not asyncio.get_running_loop() or batcher._closed or batcher._worker.done():
+            batcher = MicroBatcher(predict_fn, self.max_batch_size, self.max_wait_ms)
+            self._batchers[key] = batcher
+        return batcher
+
+    def remove(self, key: Hashable) -> None:
+        batcher = self._batchers.pop(key, None)
+        if batcher is not None:
+            batcher.close()
+
+    def stats(self) -> Dict[Hashable, Dict[str, Any]]:
+        return {key: batcher.stats() for key, batcher in self._batchers.items()}
+
+
+# Shared by the inference endpoints and model deletion in this process
+batcher_pool = BatcherPool()
@@ -0,0 +1,32 @@
+from typing import Any, Optional
+import threading
+
+
+class TrainingCancelled(Exception):
+    """Raised inside a training loop once its job has been cancelled"""
+
+
+class CancellationToken:
+    """
+    Cooperative cancellation flag checked by training loops between batches.
+    Backed by a multiprocessing Event when it has to cross into a worker
+    process, by a threading Event otherwise.
+    """
+
+    def __init__(self, event: Optional[Any] = None):
+        self._event = event if event is not None else threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise TrainingCancelled()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Sleep up to timeout, waking early on cancellation; returns whether cancelled"""
+        return self._event.wait(timeout)
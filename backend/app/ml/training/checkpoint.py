@@ -0,0 +1,161 @@
+from typing import Any, Dict, List, Optional
+from dataclasses import dataclass
+import glob
+import logging
+import os
+import random
+import re
+import threading
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_PATTERN = re.compile(r"checkpoint-(\d+)\.pt$")
+
+
+@dataclass
+class CheckpointConfig:
+    directory: str
+    every_steps: Optional[int] = None
+    every_epochs: Optional[int] = 1
+    keep_last: int = 3
+    resume_from: Optional[str] = None  # checkpoint file, or directory to take the latest from
+
+
+def list_checkpoints(directory: str) -> List[str]:
+    """Checkpoint files of a directory, oldest first"""
+    paths = []
+    for path in glob.glob(os.path.join(directory, "checkpoint-*.pt")):
+        match = CHECKPOINT_PATTERN.search(path)
+        if match:
+            paths.append((int(match.group(1)), path))
+    return [path for _, path in sorted(paths)]
+
+
+def latest_checkpoint(directory: str) -> Optional[str]:
+    checkpoints = list_checkpoints(directory) if os.path.isdir(directory) else []
+    return checkpoints[-1] if checkpoints else None
+
+
+def load_checkpoint(path: str, map_location: str = "cpu") -> Dict[str, Any]:
+    if os.path.isdir(path):
+        directory, path = path, latest_checkpoint(path)
+        if path is None:
+            raise FileNotFoundError(f"No checkpoint found in {directory}")
+    return torch.load(path, map_location=map_location, weights_only=False)
+
+
+def rng_state() -> Dict[str, Any]:
+    state = {
+        "python": random.getstate(),
+        "numpy": np.random.get_state(),
+        "torch": torch.get_rng_state()
+    }
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def set_rng_state(state: Dict[str, Any]) -> None:
+    random.setstate(state["python"])
+    np.random.set_state(state["numpy"])
+    torch.set_rng_state(state["torch"])
+    if "cuda" in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+
+
+def snapshot(value: Any) -> Any:
+    """Copy of a (nested) state dict with every tensor cloned to CPU memory"""
+    if isinstance(value, torch.Tensor):
+        return value.detach().to("cpu", copy=True)
+    if isinstance(value, dict):
+        return {key: snapshot(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(snapshot(item) for item in value)
+    return value
+
+
+class CheckpointWriter:
+    """
+    Writes checkpoints from a background thread.
+
+    save() only copies the state to CPU memory; serialization and the disk
+    write happen on the writer thread, into a temporary file that is renamed
+    into place so a crash never leaves a truncated checkpoint. If a write is
+    still running when the next checkpoint arrives, the queued one is replaced
+    by the newer state rather than stalling training. Only the newest
+    keep_last checkpoints are kept.
+    """
+
+    def __init__(self, directory: str, keep_last: int = 3):
+        self.directory = directory
+        self.keep_last = keep_last
+        self.written = 0
+        self.skipped = 0
+        self._pending: Optional[tuple] = None
+        self._writing = False
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._condition = threading.Condition()
+        os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._write_loop, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def save(self, step: int, state: Dict[str, Any]) -> None:
+        copied = snapshot(state)
+        with self._condition:
+            if self._error is not None:
+                raise self._error
+            if self._pending is not None:
+                self.skipped += 1
+            self._pending = (step, copied)
+            self._condition.notify()
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._pending is None:
+                    return
+                step, state = self._pending
+                self._pending = None
+                self._writing = True
+
+            try:
+                self._write(step, state)
+            except BaseException as e:
+                logger.error(f"Checkpoint write failed: {str(e)}")
+                with self._condition:
+                    self._error = e
+            finally:
+                with self._condition:
+                    self._writing = False
+                    self._condition.notify_all()
+
+    def _write(self, step: int, state: Dict[str, Any]) -> None:
+        path = os.path.join(self.directory, f"checkpoint-{step:08d}.pt")
+        temp_path = f"{path}.tmp"
+        torch.save(state, temp_path)
+        os.replace(temp_path, path)
+        self.written += 1
+        for stale in list_checkpoints(self.directory)[:-self.keep_last]:
+            os.remove(stale)
+
+    def flush(self) -> None:
+        """Wait until every saved checkpoint is on disk"""
+        with self._condition:
+            while self._pending is not None or self._writing:
+                self._condition.wait()
+            if self._error is not None:
+                raise self._error
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            with self._condition:
+                self._closed = True
+                self._condition.notify_all()
+            self._thread.join()
@@ -0,0 +1,131 @@
+from typing import Iterator, List, Optional, Tuple
+from dataclasses import dataclass
+import os
+import numpy as np
+import pandas as pd
+
+CHUNKED_FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet"
+}
+
+
+@dataclass
+class ChunkedDataset:
+    """A tabular dataset on disk, read chunk_size rows at a time"""
+    path: str
+    chunk_size: int = 10000
+    format: Optional[str] = None  # 'csv' or 'parquet', inferred from the extension when None
+    target_column: Optional[str] = None  # the last column when None, dropped for unsupervised estimators when set
+
+    @property
+    def dataset_format(self) -> str:
+        dataset_format = self.format or CHUNKED_FORMATS.get(os.path.splitext(self.path)[1].lower())
+        if dataset_format not in CHUNKED_FORMATS.values():
+            raise ValueError(f"Unsupported dataset format: {dataset_format or self.path}")
+        return dataset_format
+
+    def columns(self) -> List[str]:
+        if self.dataset_format == "parquet":
+            import pyarrow.parquet as pq
+            return pq.ParquetFile(self.path).schema_arrow.names
+        return list(pd.read_csv(self.path, nrows=0).columns)
+
+    @property
+    def target(self) -> str:
+        return self.target_column or self.columns()[-1]
+
+    def chunks(self, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """Frames of at most chunk_size rows, in file order"""
+        if self.dataset_format == "parquet":
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(self.path).iter_batches(batch_size=self.chunk_size, columns=columns):
+                yield batch.to_pandas()
+            return
+        yield from pd.read_csv(self.path, chunksize=self.chunk_size, usecols=columns)
+
+    def classes(self) -> np.ndarray:
+        """Distinct targets, read one column at a time"""
+        target = self.target
+        values = set()
+        for frame in self.chunks(columns=[target]):
+            values.update(frame[target].unique().tolist())
+        return np.array(sorted(values))
+
+    def read(self, supervised: bool = True) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """The whole dataset in memory, for estimators that cannot be trained in chunks"""
+        return self.split(pd.concat(self.chunks(), ignore_index=True), supervised)
+
+    def split(self, frame: pd.DataFrame, supervised: bool = True) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        if not supervised:
+            # Without a named target every column is a feature
+            if self.target_column is not None:
+                frame = frame.drop(columns=[self.target_column])
+            return frame.to_numpy(), None
+        target = self.target
+        return frame.drop(columns=[target]).to_numpy(), frame[target].to_numpy()
+
+
+class Holdout:
+    """
+    Held-out sample drawn from a stream of chunks.
+    Every row gets a random key seeded by its chunk's index and the rows with
+    the size smallest keys below fraction are held out, a uniform sample of
+    the whole stream kept as a bounded reservoir. The first epoch trains on
+    none of the rows that are in the reservoir as their chunk passes, and
+    once it has seen every chunk the sample is fixed, so later epochs hold
+    out exactly the same rows and no held-out row is ever trained on.
+    """
+
+    def __init__(self, size: int = 1000, fraction: float = 0.1, seed: int = 0):
+        self.size = size
+        self.fraction = fraction
+        self.seed = seed
+        self.keys = np.empty(0)
+        self.chunks = np.empty(0, dtype=np.int64)
+        self.rows = np.empty(0, dtype=np.int64)
+        self.X: Optional[np.ndarray] = None
+        self.y: Optional[np.ndarray] = None
+        self.seen = set()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def split(
+        self, index: int, X: np.ndarray, y: Optional[np.ndarray]
+    ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Rows of chunk index to train on, offering its rows to the reservoir on the first pass"""
+        if index not in self.seen:
+            self.seen.add(index)
+            self._offer(index, X, y)
+        held = self.rows[self.chunks == index]
+        if not len(held):
+            return X, y
+        keep = np.ones(len(X), dtype=bool)
+        keep[held] = False
+        return X[keep], y[keep] if y is not None else None
+
+    def _offer(self, index: int, X: np.ndarray, y: Optional[np.ndarray]) -> None:
+        keys = np.random.RandomState(self.seed + index).rand(len(X))
+        candidates = np.flatnonzero(keys < self.fraction)
+        if not len(candidates):
+            return
+        if self.X is None:
+            self.X = X[:0]
+            self.y = y[:0] if y is not None else None
+        # Keep the size smallest keys of the reservoir and this chunk's candidates
+        merged = np.concatenate([self.keys, keys[candidates]])
+        order = np.argsort(merged, kind="stable")[:self.size]
+        self.keys = merged[order]
+        self.chunks = np.concatenate([self.chunks, np.full(len(candidates), index)])[order]
+        self.rows = np.concatenate([self.rows, candidates])[order]
+        self.X = np.concatenate([self.X, X[candidates]])[order]
+        if y is not None:
+            self.y = np.concatenate([self.y, y[candidates]])[order]
+
+    def score(self, model) -> float:
+        if not len(self):
+            return float("nan")
+        if self.y is None:
+            return float(model.score(self.X))
+        return float(model.score(self.X, self.y))
@@ -0,0 +1,185 @@
+from typing import Any, Iterator, Optional, Tuple
+from dataclasses import dataclass
+import os
+import numpy as np
+import torch
+from torch.utils.data import (
+    BatchSampler, DataLoader, Dataset, DistributedSampler, RandomSampler, Sampler, SequentialSampler, TensorDataset
+)
+
+DATASET_FORMATS = {
+    ".pt": "torch",
+    ".pth": "torch",
+    ".npz": "npz",
+    ".csv": "csv"
+}
+
+
+@dataclass
+class DatasetSpec:
+    path: str
+    format: Optional[str] = None  # inferred from the extension when None
+    batch_size: int = 32
+    shuffle: bool = True
+    drop_last: bool = False
+    num_workers: Optional[int] = None  # tuned per dataset type when None
+    prefetch_factor: int = 2
+    pin_memory: Optional[bool] = None  # on for CUDA when None
+    inputs_key: str = "X"  # npz array names
+    targets_key: str = "y"
+    target_column: Optional[str] = None  # csv label column, the last one when None
+
+
+def select_device(preferred: Optional[str] = None) -> torch.device:
+    """The requested device, or the best available accelerator falling back to CPU"""
+    if preferred:
+        return torch.device(preferred)
+    if torch.cuda.is_available():
+        return torch.device("cuda")
+    if getattr(torch.backends, "mps", None) is not None and torch.backends.mps.is_available():
+        return torch.device("mps")
+    return torch.device("cpu")
+
+
+def _as_target_tensor(values: np.ndarray) -> torch.Tensor:
+    if np.issubdtype(values.dtype, np.integer):
+        return torch.as_tensor(values, dtype=torch.long)
+    return torch.as_tensor(values, dtype=torch.float32)
+
+
+def load_dataset(spec: DatasetSpec) -> Dataset:
+    dataset_format = spec.format or DATASET_FORMATS.get(os.path.splitext(spec.path)[1].lower())
+    if dataset_format == "torch":
+        data = torch.load(spec.path, weights_only=False)
+        if isinstance(data, Dataset):
+            return data
+        if isinstance(data, (tuple, list)) and len(data) == 2:
+            return TensorDataset(*data)
+        raise ValueError(f"Unsupported dataset format in {spec.path}")
+    if dataset_format == "npz":
+        with np.load(spec.path) as arrays:
+            return TensorDataset(
+                torch.as_tensor(arrays[spec.inputs_key], dtype=torch.float32),
+                _as_target_tensor(arrays[spec.targets_key])
+            )
+    if dataset_format == "csv":
+        import pandas as pd
+        frame = pd.read_csv(spec.path)
+        target_column = spec.target_column or frame.columns[-1]
+        return TensorDataset(
+            torch.as_tensor(frame.drop(columns=[target_column]).to_numpy(dtype=np.float32)),
+            _as_target_tensor(frame[target_column].to_numpy())
+        )
+    raise ValueError(f"Unsupported dataset format: {dataset_format or spec.path}")
+
+
+def default_num_workers(dataset: Dataset) -> int:
+    # In-memory tensors are sliced a whole batch at a time, worker processes would only add IPC
+    if isinstance(dataset, TensorDataset):
+        return 0
+    return min(8, max(1, (os.cpu_count() or 2) // 2))
+
+
+def build_dataloader(spec: DatasetSpec, device: torch.device, rank: int = 0, world_size: int = 1) -> DataLoader:
+    """
+    DataLoader for a dataset spec, over rank's shard of the dataset when
+    world_size > 1 (see set_sampler_epoch).
+    TensorDatasets are indexed with a whole batch of indices at once, which
+    replaces per-sample __getitem__ calls and the collate step with one gather
+    per tensor. Other datasets get worker processes that stay alive across
+    epochs and prefetch prefetch_factor batches each. Batches are collated
+    into pinned memory when training on CUDA.
+    """
+    dataset = load_dataset(spec)
+    num_workers = spec.num_workers if spec.num_workers is not None else default_num_workers(dataset)
+    pin_memory = spec.pin_memory if spec.pin_memory is not None else device.type == "cuda"
+    worker_options = {}
+    if num_workers > 0:
+        worker_options = {"persistent_workers": True, "prefetch_factor": spec.prefetch_factor}
+
+    sampler: Optional[Sampler] = None
+    if world_size > 1:
+        # Shards are padded to the same length so every rank runs the same number of steps
+        sampler = DistributedSampler(dataset, num_replicas=world_size, rank=rank, shuffle=spec.shuffle)
+
+    if isinstance(dataset, TensorDataset):
+        if sampler is None:
+            sampler = RandomSampler(dataset) if spec.shuffle else SequentialSampler(dataset)
+        return DataLoader(
+            dataset,
+            sampler=BatchSampler(sampler, spec.batch_size, spec.drop_last),
+            batch_size=None,
+            num_workers=num_workers,
+            pin_memory=pin_memory,
+            **worker_options
+        )
+    return DataLoader(
+        dataset,
+        batch_size=spec.batch_size,
+        shuffle=spec.shuffle if sampler is None else None,
+        sampler=sampler,
+        drop_last=spec.drop_last,
+        num_workers=num_workers,
+        pin_memory=pin_memory,
+        **worker_options
+    )
+
+
+def set_sampler_epoch(loader: DataLoader, epoch: int) -> None:
+    """Reseed the shuffle of a sharded loader, which is otherwise the same every epoch"""
+    sampler = loader.batch_sampler if loader.batch_sampler is not None else loader.sampler
+    while sampler is not None:
+        if isinstance(sampler, DistributedSampler):
+            sampler.set_epoch(epoch)
+            return
+        sampler = getattr(sampler, "sampler", None)
+
+
+def _to_device(batch: Any, device: torch.device, non_blocking: bool) -> Any:
+    if isinstance(batch, torch.Tensor):
+        return batch.to(device, non_blocking=non_blocking)
+    if isinstance(batch, (tuple, list)):
+        return type(batch)(_to_device(item, device, non_blocking) for item in batch)
+    return batch
+
+
+class DevicePrefetcher:
+    """
+    Iterates over batches already moved to device.
+    On CUDA the next batch is copied on a side stream while the current one is
+    being computed, so host-to-device transfers overlap with compute; elsewhere
+    batches are moved as they are drawn.
+    """
+
+    def __init__(self, batches: Iterator, device: torch.device):
+        self.batches = batches
+        self.device = device
+        self.stream = torch.cuda.Stream(device) if device.type == "cuda" else None
+        self._next = None
+        if self.stream is not None:
+            self._preload()
+
+    def _preload(self) -> None:
+        try:
+            batch = next(self.batches)
+        except StopIteration:
+            self._next = None
+            return
+        with torch.cuda.stream(self.stream):
+            self._next = _to_device(batch, self.device, non_blocking=True)
+
+    def __iter__(self) -> "DevicePrefetcher":
+        return self
+
+    def __next__(self) -> Tuple[Any, ...]:
+        if self.stream is None:
+            return _to_device(next(self.batches), self.device, non_blocking=False)
+        if self._next is None:
+            raise StopIteration
+        torch.cuda.current_stream(self.device).wait_stream(self.stream)
+        batch = self._next
+        for tensor in batch if isinstance(batch, (tuple, list)) else [batch]:
+            if isinstance(tensor, torch.Tensor):
+                tensor.record_stream(torch.cuda.current_stream(self.device))
+        self._preload()
+        return batch
@@ -0,0 +1,179 @@
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+import glob
+import logging
+import multiprocessing
+import os
+import queue
+import re
+import socket
+import threading
+import time
+import torch
+import torch.distributed as dist
+from .cancellation import CancellationToken, TrainingCancelled
+
+logger = logging.getLogger(__name__)
+
+# Seconds ranks get to exit after the job ends before they are terminated
+TERMINATE_TIMEOUT = 5.0
+
+
+def parse_cpu_list(text: str) -> List[int]:
+    """Parse a kernel cpulist such as '0-3,8-11'"""
+    cores = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cores.extend(range(int(first), int(last or first) + 1))
+    return cores
+
+
+def numa_nodes() -> List[List[int]]:
+    """Cores of each NUMA node, a single node holding every core when the topology is unknown"""
+    nodes = []
+    paths = glob.glob("/sys/devices/system/node/node*/cpulist")
+    for path in sorted(paths, key=lambda p: int(re.search(r"node(\d+)", p).group(1))):
+        with open(path) as f:
+            cores = parse_cpu_list(f.read())
+        if cores:
+            nodes.append(cores)
+    return nodes or [list(range(os.cpu_count() or 1))]
+
+
+def available_cores() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def rank_core_sets(world_size: int, nodes: Optional[List[List[int]]] = None) -> List[List[int]]:
+    """
+    Split the cores this process may run on into one set per rank.
+    Cores are ordered node by node and cut into contiguous, equal sets, so when
+    world_size is a multiple of the number of NUMA nodes no rank spans two
+    nodes, and the memory a rank touches first is allocated on its own node.
+    With fewer cores than ranks, every rank shares all of them.
+    """
+    allowed = set(available_cores())
+    nodes = nodes if nodes is not None else numa_nodes()
+    ordered = [core for node in nodes for core in node if core in allowed]
+    ordered += sorted(allowed - set(ordered))
+    if len(ordered) < world_size:
+        return [ordered] * world_size
+    per_rank = len(ordered) // world_size
+    return [ordered[rank * per_rank:(rank + 1) * per_rank] for rank in range(world_size)]
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _exit_with_parent(parent_pid: int) -> None:
+    """Exit when the launching process is gone, it may have been killed without cleaning up"""
+    while os.getppid() == parent_pid:
+        time.sleep(1.0)
+    os._exit(1)
+
+
+def _run_rank(
+    rank: int,
+    world_size: int,
+    port: int,
+    cores: Optional[List[int]],
+    target: Callable,
+    args: Tuple[Any, ...],
+    results: "multiprocessing.Queue",
+    parent_pid: int
+) -> None:
+    threading.Thread(target=_exit_with_parent, args=(parent_pid,), daemon=True).start()
+    if cores:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cores)
+        torch.set_num_threads(len(cores))
+    dist.init_process_group(
+        "gloo", init_method=f"tcp://127.0.0.1:{port}", rank=rank, world_size=world_size
+    )
+    try:
+        result = target(*args)
+        results.put((rank, "completed", result if rank == 0 else None))
+    except TrainingCancelled:
+        results.put((rank, "cancelled", None))
+    except Exception as e:
+        logger.error(f"Rank {rank} failed: {str(e)}")
+        results.put((rank, "failed", str(e)))
+    finally:
+        dist.destroy_process_group()
+        results.close()
+        results.join_thread()
+
+
+def launch(
+    target: Callable,
+    args: Sequence[Any],
+    world_size: int,
+    pin_cores: bool = True,
+    cancel_token: Optional[CancellationToken] = None
+) -> Any:
+    """
+    Run target(*args) in world_size processes joined in a gloo process group,
+    returns rank 0's result.
+    target must be importable from a spawned process; inside it
+    torch.distributed is initialized, so PyTorchHandler.train shards its
+    data and wraps the model in DistributedDataParallel. With pin_cores each
+    rank is bound to its own NUMA-local core set (see rank_core_sets) and
+    runs as many intra-op threads as it has cores. Raises TrainingCancelled
+    when the ranks were cancelled and RuntimeError when one failed.
+    Once cancel_token is set, ranks that have not stopped on their own within
+    TERMINATE_TIMEOUT, for instance because they are still starting, are
+    terminated.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    port = free_port()
+    core_sets = rank_core_sets(world_size) if pin_cores else [None] * world_size
+    processes = [
+        context.Process(
+            target=_run_rank,
+            args=(rank, world_size, port, core_sets[rank], target, tuple(args), results, os.getpid()),
+            name=f"training-rank-{rank}"
+        )
+        for rank in range(world_size)
+    ]
+    for process in processes:
+        process.start()
+
+    outcomes = {}
+    stop_at = None
+    try:
+        while len(outcomes) < world_size:
+            if cancel_token is not None and cancel_token.cancelled:
+                stop_at = stop_at or time.monotonic() + TERMINATE_TIMEOUT
+                if time.monotonic() > stop_at:
+                    raise TrainingCancelled()
+            try:
+                rank, status, value = results.get(timeout=1.0)
+            except queue.Empty:
+                dead = [
+                    rank for rank, process in enumerate(processes)
+                    if rank not in outcomes and process.exitcode is not None
+                ]
+                if dead:
+                    raise RuntimeError(f"Training rank {dead[0]} exited with code {processes[dead[0]].exitcode}")
+                continue
+            outcomes[rank] = (status, value)
+            if status == "failed":
+                # The other ranks would block in their next collective
+                raise RuntimeError(f"Training rank {rank} failed: {value}")
+    finally:
+        for process in processes:
+            process.join(TERMINATE_TIMEOUT if len(outcomes) == world_size else 0)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+    if any(status == "cancelled" for status, _ in outcomes.values()):
+        raise TrainingCancelled()
+    return outcomes[0][1]
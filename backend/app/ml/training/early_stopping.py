@@ -0,0 +1,94 @@
+from typing import Any, Callable, Dict, Optional
+import math
+
+# Monitored metrics that improve by increasing, any other metric is a loss
+MAXIMIZED_SUFFIXES = ("score", "accuracy", "acc", "auc", "f1")
+
+
+class EarlyStopping:
+    """
+    Framework-neutral early stopping, fed one monitored value per epoch.
+
+    Training stops once the metric has not improved by more than min_delta
+    for patience epochs in a row. With restore_best_weights the handler's
+    snapshot of the model at the best epoch is kept in best_weights and
+    restored by the handler when training ends. mode is 'min', 'max', or
+    'auto' to infer it from the metric name.
+    """
+
+    def __init__(
+        self,
+        monitor: str = "val_loss",
+        patience: int = 3,
+        min_delta: float = 0.0,
+        mode: str = "auto",
+        restore_best_weights: bool = True
+    ):
+        if mode == "auto":
+            mode = "max" if monitor.endswith(MAXIMIZED_SUFFIXES) else "min"
+        if mode not in ("min", "max"):
+            raise ValueError("mode must be 'min', 'max' or 'auto'")
+        if patience < 0:
+            raise ValueError("patience must not be negative")
+        self.monitor = monitor
+        self.patience = patience
+        self.min_delta = abs(min_delta)
+        self.mode = mode
+        self.restore_best_weights = restore_best_weights
+        self.best: Optional[float] = None
+        self.best_epoch: Optional[int] = None
+        self.best_weights: Any = None
+        self.stopped_epoch: Optional[int] = None
+        self.wait = 0
+
+    def improved(self, value: float) -> bool:
+        if self.best is None:
+            return True
+        if self.mode == "min":
+            return value < self.best - self.min_delta
+        return value > self.best + self.min_delta
+
+    def update(self, epoch: int, logs: Dict[str, Any], snapshot: Optional[Callable[[], Any]] = None) -> bool:
+        """
+        Record the metrics of an epoch, returns True when training should stop.
+        logs maps metric names to the epoch's value or to its per-epoch list;
+        snapshot() returns a copy of the model weights and is only called
+        when the epoch is the best so far.
+        """
+        if self.monitor not in logs:
+            raise ValueError(f"Early stopping monitors {self.monitor}, which training does not report")
+        value = logs[self.monitor]
+        value = float(value[-1] if isinstance(value, (list, tuple)) else value)
+        if not math.isnan(value) and self.improved(value):
+            self.best, self.best_epoch, self.wait = value, epoch, 0
+            if self.restore_best_weights and snapshot is not None:
+                self.best_weights = snapshot()
+            return False
+        self.wait += 1
+        if self.wait >= self.patience:
+            self.stopped_epoch = epoch
+            return True
+        return False
+
+    def summary(self) -> Dict[str, float]:
+        """Metrics describing the outcome, for the job record"""
+        metrics = {}
+        if self.best is not None:
+            metrics[f"best_{self.monitor}"] = self.best
+            metrics["best_epoch"] = self.best_epoch
+        if self.stopped_epoch is not None:
+            metrics["stopped_epoch"] = self.stopped_epoch
+        return metrics
+
+    def state_dict(self) -> Dict[str, Any]:
+        return {
+            "best": self.best,
+            "best_epoch": self.best_epoch,
+            "best_weights": self.best_weights,
+            "stopped_epoch": self.stopped_epoch,
+            "wait": self.wait
+        }
+
+    def load_state_dict(self, state: Dict[str, Any]) -> None:
+        for name, value in state.items():
+            setattr(self, name, value)
@@ -1,21 +1,141 @@
-from typing import Dict, Any, Callable, List, Optional
+from typing import Dict, Any, Callable, List, Optional, Sequence, Tuple
 import optuna
 from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import shutil
+import tempfile
+import uuid
+import joblib
 import numpy as np
-from sklearn.model_selection import cross_val_score
+from sklearn.base import BaseEstimator, clone, is_classifier
+from sklearn.model_selection import check_cv
+from threadpoolctl import threadpool_limits
+
+PRUNERS = ["median", "successive_halving", "hyperband"]
 
 @dataclass
 class HyperparameterSpace:
     parameters: Dict[str, Dict[str, Any]]
     constraints: Optional[List[Callable]] = None
 
+def allocate_cores(n_workers: int, cv_jobs: int, cores: Optional[int] = None) -> Tuple[int, int, int]:
+    """
+    Split the machine's cores between trial workers, the folds each of them
+    cross-validates in parallel and the BLAS/OpenMP threads of each fold,
+    so that n_workers * cv_jobs * threads never exceeds the cores.
+    cv_jobs=-1 gives each worker's folds all of its share.
+    Returns (n_workers, cv_jobs, threads per fold).
+    """
+    cores = cores or os.cpu_count() or 1
+    n_workers = max(1, min(n_workers, cores))
+    share = max(1, cores // n_workers)
+    cv_jobs = share if cv_jobs == -1 else max(1, min(cv_jobs, share))
+    threads = max(1, share // cv_jobs)
+    return n_workers, cv_jobs, threads
+
+def sqlite_storage(path: str) -> optuna.storages.RDBStorage:
+    """Study storage in a local SQLite file, shared by the processes of one machine"""
+    # Writers wait for each other's transactions instead of failing with 'database is locked'
+    return optuna.storages.RDBStorage(f"sqlite:///{path}", engine_kwargs={"connect_args": {"timeout": 60}})
+
+def make_pruner(name: Optional[str], n_steps: int) -> optuna.pruners.BasePruner:
+    """
+    Pruner for trials that report n_steps intermediate values.
+    'median' cuts a trial whose running score is below the median of earlier
+    trials at the same step, 'successive_halving' and 'hyperband' keep the
+    best fraction of trials at each rung of steps.
+    """
+    if name is None:
+        return optuna.pruners.NopPruner()
+    if name == "median":
+        return optuna.pruners.MedianPruner(n_startup_trials=5)
+    if name == "successive_halving":
+        return optuna.pruners.SuccessiveHalvingPruner()
+    if name == "hyperband":
+        return optuna.pruners.HyperbandPruner(min_resource=1, max_resource=n_steps)
+    raise ValueError(f"pruner must be one of {PRUNERS}")
+
+def _constraint_values(trial: optuna.trial.FrozenTrial) -> List[float]:
+    """Sampler constraints of a trial, positive where it violated a constraint"""
+    return trial.user_attrs.get("constraint_violations", [0.0])
+
+def _rejected(trial: optuna.trial.FrozenTrial) -> bool:
+    return any(value > 0 for value in _constraint_values(trial))
+
+class TrialBudget:
+    """
+    Study callback that stops once the study holds n_trials that passed the
+    constraints (running ones included), or after max_rejections that did not.
+    """
+
+    def __init__(self, n_trials: int, max_rejections: int):
+        self.n_trials = n_trials
+        self.max_rejections = max_rejections
+
+    def __call__(self, study: optuna.Study, trial: optuna.trial.FrozenTrial) -> None:
+        trials = study.get_trials(deepcopy=False)
+        rejections = sum(_rejected(t) for t in trials)
+        if len(trials) - rejections >= self.n_trials or rejections >= self.max_rejections:
+            study.stop()
+
+def _fold_score(model: BaseEstimator, X: np.ndarray, y: np.ndarray, train: np.ndarray, test: np.ndarray) -> float:
+    model.fit(X[train], y[train])
+    return model.score(X[test], y[test])
+
+def _optimize_worker(
+    tuner: "HyperparameterTuner",
+    storage_url: str,
+    study_name: str,
+    n_trials: int,
+    timeout: Optional[int]
+) -> None:
+    """Pull trials from a shared study until it holds n_trials, run in a pool process"""
+    # Trials that are still running count as done, so parallel workers suggest around them
+    tuner.study = optuna.load_study(
+        study_name=study_name, storage=sqlite_storage(storage_url),
+        sampler=tuner.make_sampler(constant_liar=True), pruner=tuner.make_pruner()
+    )
+    tuner._run_trials(n_trials, timeout)
+
 class HyperparameterTuner:
-    def __init__(self, model_creator: Callable, X: np.ndarray, y: np.ndarray):
+    def __init__(
+        self,
+        model_creator: Callable,
+        X: np.ndarray,
+        y: np.ndarray,
+        cv: int = 5,
+        cv_jobs: int = 1,
+        pruner: Optional[str] = None,
+        rungs: Sequence[float] = (1.0,)
+    ):
+        """
+        Trials are scored by cv-fold cross-validation on each data fraction in
+        rungs, smallest first, and report their running mean score after every
+        fold. With a pruner (see make_pruner) a hopeless trial stops at its
+        first folds or on a small fraction, e.g. rungs=(0.1, 0.3, 1.0); its
+        score is the mean over the folds of the last rung.
+        """
+        if not rungs or sorted(rungs) != list(rungs) or rungs[-1] != 1.0:
+            raise ValueError("rungs must be increasing data fractions ending with 1.0")
+        if pruner is not None and pruner not in PRUNERS:
+            raise ValueError(f"pruner must be one of {PRUNERS}")
         self.model_creator = model_creator
         self.X = X
         self.y = y
+        self.cv = cv
+        self.cv_jobs = cv_jobs
+        self.pruner = pruner
+        self.rungs = list(rungs)
+        self.fold_jobs = 1
+        self.threads = None
         self.study = None
         
+    def __getstate__(self) -> Dict[str, Any]:
+        # Pool workers open the study themselves
+        return {**self.__dict__, 'study': None}
+
     def objective(self, trial: optuna.Trial) -> float:
         params = {}
         for name, config in self.param_space.parameters.items():
@@ -28,50 +148,158 @@ class HyperparameterTuner:
                     name, config['low'], config['high'], log=config.get('log', False)
                 )
         
+        # Infeasible parameters are rejected before any model is built, the
+        # sampler learns from the violations to propose feasible ones instead
+        if self.param_space.constraints:
+            violations = [0.0 if constraint(params) else 1.0 for constraint in self.param_space.constraints]
+            trial.set_user_attr("constraint_violations", violations)
+            if any(violations):
+                raise optuna.TrialPruned("Rejected by the parameter constraints")
+
         model = self.model_creator(**params)
-        scores = cross_val_score(model, self.X, self.y, cv=5)
-        return scores.mean()
+        splitter = check_cv(self.cv, self.y, classifier=is_classifier(model))
+        n_splits = splitter.get_n_splits()
+        for rung, fraction in enumerate(self.rungs):
+            X, y = self._subsample(fraction)
+            splits = list(splitter.split(X, y))
+            scores = []
+            # Folds run fold_jobs at a time, the trial can be pruned after each group
+            for start in range(0, len(splits), self.fold_jobs):
+                group = splits[start:start + self.fold_jobs]
+                scores.extend(joblib.Parallel(n_jobs=len(group))(
+                    joblib.delayed(_fold_score)(clone(model), X, y, train, test) for train, test in group
+                ))
+                trial.report(float(np.mean(scores)), rung * n_splits + len(scores))
+                if trial.should_prune():
+                    raise optuna.TrialPruned(f"Pruned at fold {len(scores)} of data fraction {fraction}")
+        return float(np.mean(scores))
+
+    def _subsample(self, fraction: float) -> Tuple[np.ndarray, np.ndarray]:
+        """The same random fraction of the rows for every trial"""
+        if fraction >= 1.0:
+            return self.X, self.y
+        order = np.random.RandomState(0).permutation(len(self.X))
+        # cv may be a splitter object, every fold needs two rows
+        n_splits = check_cv(self.cv).get_n_splits()
+        rows = np.sort(order[:max(int(len(self.X) * fraction), 2 * n_splits)])
+        return self.X[rows], self.y[rows]
+
+    def make_pruner(self) -> optuna.pruners.BasePruner:
+        return make_pruner(self.pruner, len(self.rungs) * check_cv(self.cv).get_n_splits())
+
+    def make_sampler(self, constant_liar: bool = False) -> optuna.samplers.BaseSampler:
+        constraints_func = _constraint_values if self.param_space.constraints else None
+        return optuna.samplers.TPESampler(constraints_func=constraints_func, constant_liar=constant_liar)
     
     def optimize(
         self,
         param_space: HyperparameterSpace,
         n_trials: int = 100,
-        timeout: Optional[int] = None
+        timeout: Optional[int] = None,
+        n_workers: int = 1,
+        storage: Optional[str] = None,
+        study_name: Optional[str] = None,
+        max_rejections: Optional[int] = None
     ) -> Dict[str, Any]:
+        """
+        Search param_space for the parameters with the best cross-validated score.
+        With n_workers > 1 trials run in a pool of processes that draw them from
+        one study in a SQLite file (storage, a temporary file when None), and
+        may slightly overshoot n_trials when several finish at once. Cores are
+        divided between workers, the cv_jobs folds each evaluates in parallel
+        and the threads of each fold (see allocate_cores). A storage path and
+        study_name that already exist continue that study.
+        Parameter sets that violate param_space.constraints are resampled and
+        do not count towards n_trials; the search gives up after max_rejections
+        of them (10 * n_trials when None), and best_params and best_value are
+        None when no trial completed.
+        """
         self.param_space = param_space
-        self.study = optuna.create_study(direction="maximize")
-        
+        self.max_rejections = max_rejections or 10 * n_trials
+        # The configured cv_jobs is kept so each call divides the cores afresh
+        n_workers, self.fold_jobs, self.threads = allocate_cores(n_workers, self.cv_jobs)
+        if n_workers == 1 and storage is None:
+            self.study = optuna.create_study(
+                direction="maximize", sampler=self.make_sampler(), pruner=self.make_pruner()
+            )
+            self._run_trials(n_trials, timeout)
+        else:
+            self._optimize_parallel(n_trials, timeout, n_workers, storage, study_name)
+
+        # None when every trial was rejected or pruned
+        completed = self.study.get_trials(deepcopy=False, states=(optuna.trial.TrialState.COMPLETE,))
+        return {
+            'best_params': self.study.best_params if completed else None,
+            'best_value': self.study.best_value if completed else None,
+            'optimization_history': self.get_optimization_history(),
+            'rejections': sum(_rejected(t) for t in self.study.trials)
+        }
+
+    def _optimize_parallel(
+        self,
+        n_trials: int,
+        timeout: Optional[int],
+        n_workers: int,
+        storage: Optional[str],
+        study_name: Optional[str]
+    ) -> None:
+        temp_dir = None
+        if storage is None:
+            temp_dir = tempfile.mkdtemp(prefix="study-")
+            storage = os.path.join(temp_dir, "study.sqlite3")
+        study_name = study_name or f"study-{uuid.uuid4().hex}"
         try:
+            optuna.create_study(
+                study_name=study_name, storage=sqlite_storage(storage), direction="maximize",
+                pruner=self.make_pruner(), load_if_exists=True
+            )
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=n_workers, mp_context=context) as pool:
+                futures = [
+                    pool.submit(_optimize_worker, self, storage, study_name, n_trials, timeout)
+                    for _ in range(n_workers)
+                ]
+                for future in futures:
+                    future.result()
+            # Read the finished study into memory, the file may be temporary
+            self.study = optuna.create_study(direction="maximize")
+            self.study.add_trials(optuna.load_study(study_name=study_name, storage=sqlite_storage(storage)).trials)
+        finally:
+            if temp_dir is not None:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def _run_trials(self, n_trials: int, timeout: Optional[int]) -> None:
+        # Folds get their share of the cores for their BLAS and OpenMP threads
+        with threadpool_limits(limits=self.threads), joblib.parallel_backend(
+            "loky", inner_max_num_threads=self.threads
+        ):
             self.study.optimize(
                 self.objective,
-                n_trials=n_trials,
                 timeout=timeout,
-                callbacks=[self._check_constraints]
+                callbacks=[TrialBudget(n_trials, self.max_rejections)]
             )
-        except optuna.exceptions.TrialPruned:
-            pass
-        
-        return {
-            'best_params': self.study.best_params,
-            'best_value': self.study.best_value,
-            'optimization_history': self.get_optimization_history()
-        }
-    
-    def _check_constraints(self, study: optuna.Study, trial: optuna.Trial) -> None:
-        if self.param_space.constraints:
-            for constraint in self.param_space.constraints:
-                if not constraint(trial.params):
-                    raise optuna.exceptions.TrialPruned()
     
     def get_optimization_history(self) -> List[Dict[str, Any]]:
+        """
+        Trials that passed the constraints, each with the number of rejected
+        parameter sets sampled since the previous one.
+        """
         if not self.study:
             return []
         
-        return [
-            {
+        history = []
+        rejections = 0
+        for t in self.study.trials:
+            if _rejected(t):
+                rejections += 1
+                continue
+            history.append({
                 'trial_number': t.number,
                 'params': t.params,
-                'value': t.value
-            }
-            for t in self.study.trials
-        ]
\ No newline at end of file
+                'value': t.value,
+                'state': t.state.name.lower(),
+                'steps': len(t.intermediate_values),
+                'rejections': rejections
+            })
+            rejections = 0
+        return history
\ No newline at end of file
@@ -0,0 +1,77 @@
+from typing import Dict, List, Optional
+import sys
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+STEP_TIME_PERCENTILES = (50, 95, 99)
+
+# Per-epoch metrics recorded by the handlers' training loops
+EPOCH_METRICS = [
+    "samples_per_second",
+    "tokens_per_second",
+    "step_time_p50",
+    "step_time_p95",
+    "step_time_p99",
+    "data_wait_time",
+    "compute_time",
+    "optimizer_time",
+    "peak_rss_mb"
+]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far, None where it cannot be read"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS, in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class StepStats:
+    """
+    Timings of one epoch's training steps.
+    A step is one batch: the wait for its data and the forward, backward and
+    (when it steps) optimizer work on it, all in seconds. Tokens are only
+    counted by loops that know them, and optimizer time by loops that can
+    time the optimizer on its own; their metrics are left out otherwise.
+    """
+
+    def __init__(self):
+        self.step_times: List[float] = []
+        self.samples = 0
+        self.tokens = 0
+        self.data_wait_time = 0.0
+        self.optimizer_time = 0.0
+
+    def record(self, step_time: float, samples: int, tokens: int = 0, data_wait: float = 0.0) -> None:
+        self.step_times.append(step_time)
+        self.samples += samples
+        self.tokens += tokens
+        self.data_wait_time += data_wait
+
+    def summary(self) -> Dict[str, float]:
+        total = sum(self.step_times)
+        metrics = {
+            "samples_per_second": self.samples / total if total else 0.0,
+            "data_wait_time": self.data_wait_time,
+            "compute_time": total - self.data_wait_time
+        }
+        if self.optimizer_time:
+            metrics["optimizer_time"] = self.optimizer_time
+        if self.tokens:
+            metrics["tokens_per_second"] = self.tokens / total if total else 0.0
+        if self.step_times:
+            for percentile, value in zip(
+                STEP_TIME_PERCENTILES, np.percentile(self.step_times, STEP_TIME_PERCENTILES)
+            ):
+                metrics[f"step_time_p{percentile}"] = float(value)
+        rss = peak_rss_mb()
+        if rss is not None:
+            metrics["peak_rss_mb"] = rss
+        return metrics
+
@@ -0,0 +1,335 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from dataclasses import dataclass
+import heapq
+import itertools
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from .cancellation import CancellationToken, TrainingCancelled
+
+logger = logging.getLogger(__name__)
+
+# Seconds a terminated worker gets to exit before it is killed
+TERMINATE_TIMEOUT = 5.0
+# Longest wait between claims of a job that is refused a slot
+MAX_CLAIM_INTERVAL = 2.0
+FINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+class SchedulerFullError(Exception):
+    """Raised when the queue is at capacity and a job is not admitted"""
+
+    def __init__(self, max_queued: int):
+        super().__init__(f"Training queue is full ({max_queued} jobs waiting)")
+        self.max_queued = max_queued
+
+
+@dataclass
+class ScheduledJob:
+    job_id: str
+    priority: int
+    args: Tuple[Any, ...]
+    submitted_at: float
+    process: Optional[multiprocessing.process.BaseProcess] = None
+    started_at: Optional[float] = None
+    cancel_token: Optional[CancellationToken] = None
+    kill_at: Optional[float] = None
+    finished: bool = False
+    sequence: int = 0
+
+
+class JobReporter:
+    """Picklable callable a worker uses to send job updates back to the scheduler"""
+
+    def __init__(self, job_id: str, events: "multiprocessing.Queue"):
+        self.job_id = job_id
+        self.events = events
+
+    def __call__(self, **changes) -> None:
+        self.events.put((self.job_id, changes))
+
+
+def _run_job(
+    target: Callable,
+    job_id: str,
+    args: Tuple[Any, ...],
+    events: "multiprocessing.Queue",
+    cancel_token: CancellationToken
+) -> None:
+    report = JobReporter(job_id, events)
+    try:
+        target(job_id, *args, report=report, cancel_token=cancel_token)
+    except TrainingCancelled:
+        logger.info(f"Job {job_id} cancelled")
+        report(status="cancelled")
+    except Exception as e:
+        logger.error(f"Training failed for job {job_id}: {str(e)}")
+        report(status="failed", error_message=str(e))
+    finally:
+        events.close()
+        events.join_thread()
+
+
+class TrainingScheduler:
+    """
+    Priority queue of training jobs, each run in its own worker process.
+
+    At most max_running workers run at once; the rest wait in the queue
+    (higher priority first, then submission order), and submissions beyond
+    max_queued are rejected. Workers are started with the spawn method so
+    they share no interpreter state with the API, and a worker running past
+    max_run_time is terminated. Workers report job changes as keyword
+    arguments to report(), which the dispatcher thread hands to on_update
+    together with the scheduler's own status changes.
+
+    target is called as target(job_id, *args, report=..., cancel_token=...).
+    Cancelling a running job sets its token, which the training loop checks
+    between batches, and kills the worker if it is still alive after
+    cancel_grace_period.
+
+    When several schedulers share the machine (one per API worker), claim is
+    called with the job at the head of the queue before it starts, and the
+    job waits while it returns False, so a shared store can hold the slots.
+    A refused job is claimed again after a back-off that doubles up to
+    MAX_CLAIM_INTERVAL, or as soon as one of this scheduler's jobs finishes.
+    """
+
+    def __init__(
+        self,
+        target: Callable,
+        on_update: Callable[[str, Dict[str, Any]], None],
+        max_running: int,
+        max_queued: int = 100,
+        max_run_time: Optional[float] = None,
+        cancel_grace_period: float = 10.0,
+        poll_interval: float = 0.1,
+        start_method: str = "spawn",
+        claim: Optional[Callable[[str], bool]] = None
+    ):
+        self.target = target
+        self.on_update = on_update
+        self.claim = claim
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.max_run_time = max_run_time
+        self.cancel_grace_period = cancel_grace_period
+        self.poll_interval = poll_interval
+        self._context = multiprocessing.get_context(start_method)
+        self._events = self._context.Queue()
+        self._queue: List[Tuple[int, int, str]] = []
+        self._jobs: Dict[str, ScheduledJob] = {}
+        self._sequence = itertools.count()
+        self._claim_interval = poll_interval
+        self._next_claim = 0.0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, job_id: str, args: Tuple[Any, ...] = (), priority: int = 0) -> int:
+        """Queue a job and return its 1-based queue position"""
+        with self._lock:
+            if len(self._queue) >= self.max_queued:
+                raise SchedulerFullError(self.max_queued)
+            job = ScheduledJob(
+                job_id=job_id,
+                priority=priority,
+                args=args,
+                submitted_at=time.time(),
+                sequence=next(self._sequence)
+            )
+            self._jobs[job_id] = job
+            heapq.heappush(self._queue, (-priority, job.sequence, job_id))
+            position = self._position(job_id)
+        self._ensure_started()
+        return position
+
+    def _position(self, job_id: str) -> Optional[int]:
+        # One pass over the heap: the job's rank is the number of entries ahead of it
+        job = self._jobs.get(job_id)
+        if job is None or job.process is not None:
+            return None
+        entry = (-job.priority, job.sequence, job_id)
+        return 1 + sum(1 for other in self._queue if other < entry)
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """1-based position of a queued job, None once it has started"""
+        with self._lock:
+            return self._position(job_id)
+
+    def dequeue(self, job_id: str) -> bool:
+        """Remove a job that has not started yet"""
+        with self._lock:
+            entries = [entry for entry in self._queue if entry[2] != job_id]
+            if len(entries) == len(self._queue):
+                return False
+            self._queue = entries
+            heapq.heapify(self._queue)
+            del self._jobs[job_id]
+            return True
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Remove a queued job or signal a running one to stop.
+        Does not block: the dispatcher kills the worker if it has not exited
+        within cancel_grace_period.
+        """
+        if self.dequeue(job_id):
+            return True
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.process is None:
+                return False
+            if job.kill_at is None:
+                job.cancel_token.cancel()
+                job.kill_at = time.time() + self.cancel_grace_period
+        return True
+
+    def is_running(self, job_id: str) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job is not None and job.process is not None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.process is not None)
+            return {
+                "queued": len(self._queue),
+                "running": running,
+                "max_running": self.max_running,
+                "max_queued": self.max_queued
+            }
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._dispatch_loop, name="training-scheduler", daemon=True)
+                self._thread.start()
+
+    def _dispatch_loop(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self._drain_events(timeout=self.poll_interval)
+                self._reap()
+                self._start_queued()
+            except Exception as e:
+                logger.error(f"Training scheduler error: {str(e)}")
+
+    def _update(self, job_id: str, changes: Dict[str, Any]) -> None:
+        try:
+            self.on_update(job_id, changes)
+        except Exception as e:
+            logger.error(f"Failed to apply update to job {job_id}: {str(e)}")
+
+    def _drain_events(self, timeout: float = 0) -> None:
+        block = timeout > 0
+        while True:
+            try:
+                job_id, changes = self._events.get(block=block, timeout=timeout if block else None)
+            except queue.Empty:
+                return
+            block = False
+            if changes.get("status") in FINAL_STATUSES:
+                with self._lock:
+                    if job_id in self._jobs:
+                        self._jobs[job_id].finished = True
+            self._update(job_id, changes)
+
+    def _reap(self) -> None:
+        now = time.time()
+        with self._lock:
+            running = [job for job in self._jobs.values() if job.process is not None]
+
+        for job in running:
+            if job.process.is_alive():
+                if job.kill_at is not None and now > job.kill_at:
+                    logger.warning(f"Job {job.job_id} did not stop within {self.cancel_grace_period}s, killing it")
+                    job.process.kill()
+                    job.process.join()
+                    self._finish(job, {"status": "cancelled"})
+                elif self.max_run_time and now - job.started_at > self.max_run_time:
+                    logger.warning(f"Job {job.job_id} exceeded {self.max_run_time}s, terminating")
+                    self._terminate(job.process)
+                    self._finish(job, {
+                        "status": "failed",
+                        "error_message": f"Training exceeded the maximum time of {self.max_run_time}s"
+                    })
+                continue
+
+            job.process.join()
+            # Pick up whatever the worker reported right before exiting
+            self._drain_events()
+            changes = {}
+            if not job.finished:
+                changes = {
+                    "status": "failed",
+                    "error_message": f"Training worker exited with code {job.process.exitcode}"
+                }
+            self._finish(job, changes)
+
+    def _finish(self, job: ScheduledJob, changes: Dict[str, Any]) -> None:
+        with self._lock:
+            self._jobs.pop(job.job_id, None)
+            # A slot was freed, claim the next job right away
+            self._next_claim = 0.0
+        self._update(job.job_id, {**changes, "finished_at": time.time()})
+
+    def _terminate(self, process: multiprocessing.process.BaseProcess) -> None:
+        process.terminate()
+        process.join(TERMINATE_TIMEOUT)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+    def _start_queued(self) -> None:
+        while True:
+            with self._lock:
+                running = sum(1 for job in self._jobs.values() if job.process is not None)
+                if running >= self.max_running or not self._queue:
+                    return
+                job_id = self._queue[0][2]
+                if self.claim is not None and time.monotonic() < self._next_claim:
+                    return
+            if self.claim is not None and not self.claim(job_id):
+                with self._lock:
+                    if self._queue and self._queue[0][2] == job_id:
+                        self._next_claim = time.monotonic() + self._claim_interval
+                        self._claim_interval = min(2 * self._claim_interval, MAX_CLAIM_INTERVAL)
+                        return
+                # claim dequeued the job, try the next one
+                continue
+            with self._lock:
+                if not self._queue or self._queue[0][2] != job_id:
+                    continue
+                self._claim_interval = self.poll_interval
+                heapq.heappop(self._queue)
+                job = self._jobs[job_id]
+                job.started_at = time.time()
+                job.cancel_token = CancellationToken(self._context.Event())
+                job.process = self._context.Process(
+                    target=_run_job,
+                    args=(self.target, job_id, job.args, self._events, job.cancel_token),
+                    name=f"training-{job_id}"
+                )
+            try:
+                job.process.start()
+            except Exception as e:
+                logger.error(f"Could not start worker for job {job_id}: {str(e)}")
+                job.process = None
+                self._finish(job, {"status": "failed", "error_message": f"Could not start worker: {str(e)}"})
+                continue
+            self._update(job_id, {"status": "running", "started_at": job.started_at})
+
+    def shutdown(self) -> None:
+        """Stop dispatching and terminate running workers"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            running = [job for job in self._jobs.values() if job.process is not None]
+            self._queue.clear()
+        for job in running:
+            self._terminate(job.process)
+        self._jobs.clear()
@@ -0,0 +1,377 @@
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+import logging
+from app.core.config import settings
+from .cancellation import CancellationToken
+from .early_stopping import EarlyStopping
+from .instrumentation import EPOCH_METRICS
+
+# The API process imports this module for train_model_task, torch and the
+# modules built on it are only imported by the worker that runs a job
+if TYPE_CHECKING:
+    from .checkpoint import CheckpointConfig
+    from .data import DatasetSpec
+
+logger = logging.getLogger(__name__)
+
+# Classes in torch.optim and torch.nn
+OPTIMIZERS = {
+    "adam": "Adam",
+    "adamw": "AdamW",
+    "sgd": "SGD"
+}
+
+LOSSES = {
+    "cross_entropy": "CrossEntropyLoss",
+    "mse": "MSELoss",
+    "bce_with_logits": "BCEWithLogitsLoss"
+}
+
+# The same losses in tf.keras.losses, with the arguments that make them take logits
+KERAS_LOSSES = {
+    "cross_entropy": ("SparseCategoricalCrossentropy", {"from_logits": True}),
+    "mse": ("MeanSquaredError", {}),
+    "bce_with_logits": ("BinaryCrossentropy", {"from_logits": True})
+}
+
+# Job metric names of the handlers' history entries
+HISTORY_METRICS = {
+    "train_loss": "loss",
+    "loss": "loss",
+    "val_loss": "validation_loss",
+    "accuracy": "accuracy",
+    "val_accuracy": "validation_accuracy",
+    "train_score": "score",
+    "val_score": "validation_score",
+    "holdout_score": "holdout_score"
+}
+
+
+def checkpoint_config(config: Dict[str, Any]) -> "CheckpointConfig":
+    """Checkpoint settings of a job, tuned through its hyperparameters"""
+    from .checkpoint import CheckpointConfig
+    hyperparameters = config.get("hyperparameters") or {}
+    return CheckpointConfig(
+        directory=config["checkpoint_dir"],
+        every_steps=hyperparameters.get("checkpoint_every_steps"),
+        every_epochs=hyperparameters.get("checkpoint_every_epochs", 1),
+        keep_last=hyperparameters.get("keep_checkpoints", 3),
+        resume_from=config.get("resume_from")
+    )
+
+
+def dataset_spec(config: Dict[str, Any], validation: bool = False) -> "DatasetSpec":
+    """Input pipeline settings of a job's training or validation data, tuned through its hyperparameters"""
+    from .data import DatasetSpec
+    hyperparameters = config.get("hyperparameters") or {}
+    return DatasetSpec(
+        path=config["validation_dataset_path"] if validation else config["dataset_path"],
+        shuffle=not validation,
+        format=hyperparameters.get("dataset_format"),
+        batch_size=hyperparameters.get("batch_size", settings.DEFAULT_BATCH_SIZE),
+        num_workers=hyperparameters.get("num_workers"),
+        prefetch_factor=hyperparameters.get("prefetch_factor", 2),
+        target_column=hyperparameters.get("target_column")
+    )
+
+
+def early_stopping_config(
+    config: Dict[str, Any], validation_monitor: str = "val_loss", train_monitor: str = "train_loss"
+) -> Optional[EarlyStopping]:
+    """
+    Early stopping of a job, enabled by the early_stopping_patience hyperparameter.
+    It monitors the handler's validation metric when the job has a validation
+    dataset and its training metric otherwise.
+    """
+    hyperparameters = config.get("hyperparameters") or {}
+    if hyperparameters.get("early_stopping_patience") is None:
+        return None
+    default_monitor = validation_monitor if config.get("validation_dataset_path") else train_monitor
+    return EarlyStopping(
+        monitor=hyperparameters.get("early_stopping_monitor", default_monitor),
+        patience=hyperparameters["early_stopping_patience"],
+        min_delta=hyperparameters.get("early_stopping_min_delta", 0.0),
+        restore_best_weights=hyperparameters.get("restore_best_weights", True)
+    )
+
+
+def run_pytorch_training(
+    config: Dict[str, Any],
+    report: Callable[..., None],
+    cancel_token: CancellationToken,
+    checkpoint: "CheckpointConfig"
+) -> Dict[str, float]:
+    """
+    Fine-tune a stored PyTorch model, returns the job's final metrics.
+    With num_processes > 1 the job trains data-parallel on CPU, one rank
+    per process, each pinned to its own cores unless pin_cores is false.
+    """
+    hyperparameters = config.get("hyperparameters") or {}
+    num_processes = hyperparameters.get("num_processes", settings.TRAINING_PROCESSES)
+    if num_processes <= 1:
+        return train_pytorch_model(config, report, cancel_token, checkpoint)
+
+    from .distributed import launch
+    metrics = launch(
+        train_pytorch_model,
+        (config, report, cancel_token, checkpoint, "cpu"),
+        world_size=num_processes,
+        pin_cores=hyperparameters.get("pin_cores", True),
+        cancel_token=cancel_token
+    )
+    return {**metrics, "processes": num_processes}
+
+
+def train_pytorch_model(
+    config: Dict[str, Any],
+    report: Callable[..., None],
+    cancel_token: CancellationToken,
+    checkpoint: "CheckpointConfig",
+    device: Optional[str] = None
+) -> Dict[str, float]:
+    """Training loop of one process, or of one rank of a data-parallel job"""
+    import torch
+    from app.ml.frameworks.pytorch_handler import PyTorchHandler
+
+    if not config.get("model_path"):
+        raise ValueError(f"Model {config['model_id']} not found")
+    hyperparameters = config.get("hyperparameters") or {}
+    handler = PyTorchHandler(trust_pickled_models=settings.PYTORCH_TRUST_PICKLED_MODELS)
+    model = handler.load_model(config["model_path"])
+    if not isinstance(model, torch.nn.Module):
+        raise ValueError("Training needs a TorchScript archive or a full nn.Module checkpoint, not a state dict")
+
+    optimizer = getattr(torch.optim, OPTIMIZERS[hyperparameters.get("optimizer", "adam")])(
+        model.parameters(), lr=hyperparameters.get("learning_rate", 1e-3)
+    )
+    criterion = getattr(torch.nn, LOSSES[hyperparameters.get("loss", "cross_entropy")])()
+    epochs = hyperparameters.get("epochs", settings.DEFAULT_EPOCHS)
+
+    early_stopping = early_stopping_config(config)
+
+    def on_epoch(epoch: int, history: Dict) -> None:
+        report(progress=epoch / epochs, metrics=epoch_metrics(history))
+
+    history = handler.train(
+        model,
+        dataset_spec(config),
+        criterion,
+        optimizer,
+        epochs=epochs,
+        device=device,
+        cancel_token=cancel_token,
+        checkpoint=checkpoint,
+        precision=hyperparameters.get("precision"),
+        accumulation_steps=hyperparameters.get("gradient_accumulation_steps", 1),
+        epoch_callback=on_epoch,
+        val_loader=dataset_spec(config, validation=True) if config.get("validation_dataset_path") else None,
+        early_stopping=early_stopping
+    )
+    metrics = epoch_metrics(history)
+    if early_stopping is not None:
+        metrics.update(early_stopping.summary())
+    return metrics
+
+
+def epoch_metrics(history: Dict) -> Dict[str, float]:
+    """Job metrics of the latest epoch: losses or scores, throughput, step times and memory"""
+    metrics = {job_name: float(history[name][-1]) for name, job_name in HISTORY_METRICS.items() if history.get(name)}
+    metrics.update({name: float(history[name][-1]) for name in EPOCH_METRICS if history.get(name)})
+    return metrics
+
+
+def run_tensorflow_training(
+    config: Dict[str, Any],
+    report: Callable[..., None],
+    cancel_token: CancellationToken
+) -> Dict[str, float]:
+    """
+    Fine-tune a stored Keras model on csv files, returns the job's final metrics.
+    A model saved without its training configuration is compiled with the
+    optimizer, learning_rate and loss hyperparameters.
+    """
+    import tensorflow as tf
+    from app.ml.frameworks.tensorflow_handler import TensorFlowHandler
+    from .tf_data import TFDataSpec
+
+    if not config.get("model_path"):
+        raise ValueError(f"Model {config['model_id']} not found")
+    hyperparameters = config.get("hyperparameters") or {}
+    handler = TensorFlowHandler()
+    model = handler.load_model(config["model_path"])
+    if getattr(model, "optimizer", None) is None:
+        loss_name = hyperparameters.get("loss", "cross_entropy")
+        loss_class, loss_options = KERAS_LOSSES[loss_name]
+        model.compile(
+            optimizer=getattr(tf.keras.optimizers, OPTIMIZERS[hyperparameters.get("optimizer", "adam")])(
+                learning_rate=hyperparameters.get("learning_rate", 1e-3)
+            ),
+            loss=getattr(tf.keras.losses, loss_class)(**loss_options),
+            metrics=[] if loss_name == "mse" else ["accuracy"]
+        )
+    epochs = hyperparameters.get("epochs", settings.DEFAULT_EPOCHS)
+    early_stopping = early_stopping_config(config, train_monitor="loss")
+
+    def data_spec(path: str, training: bool) -> TFDataSpec:
+        return TFDataSpec(
+            file_pattern=path,
+            format=hyperparameters.get("dataset_format"),
+            batch_size=hyperparameters.get("batch_size", settings.DEFAULT_BATCH_SIZE),
+            shuffle_buffer=hyperparameters.get("shuffle_buffer", 10000) if training else 0,
+            target_column=hyperparameters.get("target_column")
+        )
+
+    def on_epoch(epoch: int, logs: Dict) -> None:
+        report(progress=epoch / epochs, metrics=epoch_metrics({name: [value] for name, value in logs.items()}))
+
+    validation_path = config.get("validation_dataset_path")
+    history = handler.train(
+        model,
+        data_spec(config["dataset_path"], training=True),
+        validation_data=data_spec(validation_path, training=False) if validation_path else None,
+        epochs=epochs,
+        cancel_token=cancel_token,
+        early_stopping=early_stopping,
+        epoch_callback=on_epoch
+    )
+    metrics = epoch_metrics(history)
+    if early_stopping is not None:
+        metrics.update(early_stopping.summary())
+    return metrics
+
+
+def run_sklearn_training(
+    config: Dict[str, Any],
+    report: Callable[..., None],
+    cancel_token: CancellationToken
+) -> Dict[str, float]:
+    """
+    Fine-tune a stored scikit-learn estimator on a csv or parquet file, returns
+    the job's final metrics. Estimators that implement partial_fit stream the
+    file chunk_size rows at a time for epochs passes and are scored on a
+    held-out sample of it (holdout_size rows); any other is fitted once on the
+    whole file and scored on validation_dataset_path when the job has one.
+    """
+    from app.ml.frameworks.sklearn_handler import SklearnHandler
+    from .chunks import ChunkedDataset
+
+    if not config.get("model_path"):
+        raise ValueError(f"Model {config['model_id']} not found")
+    hyperparameters = config.get("hyperparameters") or {}
+    handler = SklearnHandler()
+    model = handler.load_model(config["model_path"])
+    streamed = hasattr(model, "partial_fit")
+    epochs = hyperparameters.get("epochs", settings.DEFAULT_EPOCHS) if streamed else 1
+
+    def dataset(path: str) -> ChunkedDataset:
+        return ChunkedDataset(
+            path=path,
+            chunk_size=hyperparameters.get("chunk_size", 10000),
+            format=hyperparameters.get("dataset_format"),
+            target_column=hyperparameters.get("target_column")
+        )
+
+    if streamed:
+        early_stopping = early_stopping_config(config, "holdout_score", "holdout_score")
+        options = {"holdout_size": hyperparameters.get("holdout_size", 1000)}
+    else:
+        early_stopping = early_stopping_config(config, "val_score", "train_score")
+        validation_path = config.get("validation_dataset_path")
+        options = {"X_val": dataset(validation_path) if validation_path else None}
+
+    def on_epoch(epoch: int, history: Dict) -> None:
+        report(progress=epoch / epochs, metrics=epoch_metrics(history))
+
+    history = handler.train(
+        model,
+        dataset(config["dataset_path"]),
+        epochs=epochs,
+        cancel_token=cancel_token,
+        early_stopping=early_stopping,
+        epoch_callback=on_epoch,
+        **options
+    )
+    metrics = epoch_metrics(history)
+    if early_stopping is not None:
+        metrics.update(early_stopping.summary())
+    return metrics
+
+
+def simulate_training(
+    job_id: str,
+    report: Callable[..., None],
+    cancel_token: CancellationToken,
+    checkpoint: "CheckpointConfig"
+) -> Dict[str, float]:
+    """Stand-in training loop for frameworks without a training pipeline (ONNX)"""
+    from .checkpoint import CheckpointWriter, load_checkpoint
+
+    start_step = 0
+    if checkpoint.resume_from:
+        start_step = load_checkpoint(checkpoint.resume_from)["step"]
+        logger.info(f"Job {job_id} resuming from step {start_step}")
+
+    # Simulate training progress
+    total_steps = 10
+    writer = CheckpointWriter(checkpoint.directory, keep_last=checkpoint.keep_last)
+    try:
+        for i in range(start_step, total_steps):
+            cancel_token.wait(1)  # Simulate work
+            cancel_token.raise_if_cancelled()
+            progress = (i + 1) / total_steps
+            report(progress=progress)
+            if (i + 1) % (checkpoint.every_steps or 1) == 0:
+                writer.save(i + 1, {"step": i + 1})
+            logger.info(f"Job {job_id} progress: {progress:.2%}")
+    finally:
+        writer.close()
+
+    return {
+        "accuracy": 0.95,
+        "loss": 0.05,
+        "validation_accuracy": 0.93,
+        "validation_loss": 0.07
+    }
+
+
+def train_model_task(
+    job_id: str,
+    config: Dict[str, Any],
+    report: Callable[..., None],
+    cancel_token: CancellationToken
+) -> None:
+    """
+    Training job entry point, run by the scheduler in a worker process.
+    Job changes (progress, metrics, status) are sent back through report(),
+    and cancel_token and the checkpoint settings are passed down to the
+    handler's training loop. PyTorch, TensorFlow and scikit-learn jobs train
+    through their handlers and report the same per-epoch metrics; only
+    PyTorch jobs write checkpoints. PyTorch jobs are tuned through
+    hyperparameters: epochs, batch_size, learning_rate, optimizer, loss, precision
+    ('fp32', 'bf16', 'fp16'), gradient_accumulation_steps, and for the input
+    pipeline dataset_format ('torch', 'npz', 'csv'), num_workers,
+    prefetch_factor and target_column, for data-parallel CPU training
+    num_processes and pin_cores, and for early stopping
+    early_stopping_patience, early_stopping_min_delta, early_stopping_monitor
+    and restore_best_weights. A job's validation_dataset_path is evaluated
+    after every epoch. TensorFlow jobs (csv files, dataset_path may be a glob)
+    share epochs, batch_size, learning_rate, optimizer, loss, target_column
+    and the early stopping hyperparameters, see run_tensorflow_training, and
+    scikit-learn jobs take epochs, chunk_size, holdout_size, dataset_format
+    ('csv', 'parquet'), target_column and early stopping, see
+    run_sklearn_training.
+    """
+    logger.info(f"Starting training job {job_id}")
+    checkpoint = checkpoint_config(config)
+
+    framework = config.get("framework")
+    if framework == "pytorch":
+        metrics = run_pytorch_training(config, report, cancel_token, checkpoint)
+    elif framework == "tensorflow":
+        metrics = run_tensorflow_training(config, report, cancel_token)
+    elif framework == "scikit-learn":
+        metrics = run_sklearn_training(config, report, cancel_token)
+    else:
+        metrics = simulate_training(job_id, report, cancel_token, checkpoint)
+
+    report(status="completed", progress=1.0, metrics=metrics)
+    logger.info(f"Job {job_id} completed successfully")
@@ -0,0 +1,113 @@
+from typing import Any, Dict, List, Optional
+from dataclasses import dataclass
+import csv
+import glob
+import os
+import tensorflow as tf
+
+TF_DATASET_FORMATS = {
+    ".tfrecord": "tfrecord",
+    ".tfrecords": "tfrecord",
+    ".csv": "csv"
+}
+
+
+@dataclass
+class TFDataSpec:
+    file_pattern: str  # glob of the dataset's shards
+    format: Optional[str] = None  # 'tfrecord' or 'csv', inferred from the extension when None
+    batch_size: int = 32
+    shuffle_buffer: int = 10000  # examples, 0 disables shuffling
+    cache_path: Optional[str] = None  # local cache file of parsed examples, "" caches in memory
+    features: Optional[Dict[str, Any]] = None  # tfrecord feature spec, name -> tf.io.FixedLenFeature
+    label_key: str = "label"  # tfrecord feature holding the label
+    target_column: Optional[str] = None  # csv label column, the last one when None
+    compression_type: Optional[str] = None  # tfrecord compression, 'GZIP' or 'ZLIB'
+    drop_remainder: bool = False
+    private_threadpool_size: int = 0  # threads of the pipeline's own pool, 0 shares TensorFlow's
+    ram_budget_mb: Optional[int] = None  # cap on the memory autotuned buffers may use
+
+
+def _files(spec: TFDataSpec) -> List[str]:
+    files = sorted(glob.glob(spec.file_pattern))
+    if not files:
+        raise ValueError(f"No dataset files match {spec.file_pattern}")
+    return files
+
+
+def _tfrecord_examples(spec: TFDataSpec, files: tf.data.Dataset) -> tf.data.Dataset:
+    if not spec.features:
+        raise ValueError("TFRecord datasets need a feature spec")
+    features = dict(spec.features)
+
+    def parse(record):
+        example = tf.io.parse_single_example(record, features)
+        label = example.pop(spec.label_key)
+        inputs = next(iter(example.values())) if len(example) == 1 else example
+        return inputs, label
+
+    records = files.interleave(
+        lambda path: tf.data.TFRecordDataset(path, compression_type=spec.compression_type),
+        num_parallel_calls=tf.data.AUTOTUNE
+    )
+    return records.map(parse, num_parallel_calls=tf.data.AUTOTUNE)
+
+
+def _csv_examples(spec: TFDataSpec, files: tf.data.Dataset, first_file: str) -> tf.data.Dataset:
+    with open(first_file, newline="") as f:
+        columns = next(csv.reader(f))
+    target_index = columns.index(spec.target_column) if spec.target_column else len(columns) - 1
+
+    def parse(*row):
+        values = [tf.cast(value, tf.float32) for value in row]
+        label = values.pop(target_index)
+        return tf.stack(values), label
+
+    rows = files.interleave(
+        lambda path: tf.data.experimental.CsvDataset(path, [tf.float32] * len(columns), header=True),
+        num_parallel_calls=tf.data.AUTOTUNE
+    )
+    return rows.map(parse, num_parallel_calls=tf.data.AUTOTUNE)
+
+
+def build_tf_dataset(spec: TFDataSpec, training: bool = True) -> tf.data.Dataset:
+    """
+    Streaming tf.data pipeline over a file-backed dataset.
+    Shards are read in parallel and examples decoded by a parallel map, then
+    optionally cached after decoding, shuffled through a bounded buffer,
+    batched and prefetched with an autotuned depth. Only the shuffle buffer
+    and prefetched batches are held in memory, so datasets larger than RAM
+    stream at a steady rate. Validation pipelines (training=False) keep the
+    file and example order and are not shuffled.
+    """
+    files = _files(spec)
+    dataset_format = spec.format or TF_DATASET_FORMATS.get(os.path.splitext(files[0])[1].lower())
+    file_dataset = tf.data.Dataset.from_tensor_slices(files)
+    if training:
+        file_dataset = file_dataset.shuffle(len(files))
+
+    if dataset_format == "tfrecord":
+        dataset = _tfrecord_examples(spec, file_dataset)
+    elif dataset_format == "csv":
+        dataset = _csv_examples(spec, file_dataset, files[0])
+    else:
+        raise ValueError(f"Unsupported dataset format: {dataset_format or spec.file_pattern}")
+
+    if spec.cache_path is not None:
+        if spec.cache_path:
+            os.makedirs(os.path.dirname(spec.cache_path) or ".", exist_ok=True)
+        dataset = dataset.cache(spec.cache_path)
+    if training and spec.shuffle_buffer:
+        # After the cache, so every epoch gets a new order
+        dataset = dataset.shuffle(spec.shuffle_buffer, reshuffle_each_iteration=True)
+    dataset = dataset.batch(spec.batch_size, drop_remainder=spec.drop_remainder)
+    dataset = dataset.prefetch(tf.data.AUTOTUNE)
+
+    options = tf.data.Options()
+    # Parallel reads and maps may yield examples out of order while training
+    options.deterministic = not training
+    if spec.private_threadpool_size:
+        options.threading.private_threadpool_size = spec.private_threadpool_size
+    if spec.ram_budget_mb:
+        options.autotune.ram_budget = spec.ram_budget_mb * 1024 * 1024
+    return dataset.with_options(options)
@@ -0,0 +1,78 @@
+import asyncio
+import threading
+from app.ml.inference.batcher import MicroBatcher
+
+def test_micro_batcher_merges_concurrent_rows():
+    calls = []
+
+    def predict_fn(rows):
+        calls.append(len(rows))
+        return [row * 2 for row in rows]
+
+    async def run():
+        batcher = MicroBatcher(predict_fn, max_batch_size=8, max_wait_ms=20)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(20)))
+        batcher.close()
+        return results
+
+    assert asyncio.run(run()) == [i * 2 for i in range(20)]
+    assert max(calls) == 8 and sum(calls) == 20
+
+def test_micro_batcher_isolates_failing_rows():
+    def predict_fn(rows):
+        if any(row < 0 for row in rows):
+            raise ValueError("negative input")
+        return rows
+
+    async def run():
+        batcher = MicroBatcher(predict_fn, max_batch_size=4, max_wait_ms=20)
+        results = await asyncio.gather(*(batcher.submit(i) for i in [1, -1, 2]), return_exceptions=True)
+        batcher.close()
+        return results
+
+    ok, failed, ok2 = asyncio.run(run())
+    assert ok == 1 and ok2 == 2 and isinstance(failed, ValueError)
+
+def test_micro_batcher_never_leaves_rows_waiting():
+    def short_predict_fn(rows):
+        return rows[:1]
+
+    class Aborted(BaseException):
+        pass
+
+    def aborting_predict_fn(rows):
+        raise Aborted()
+
+    async def run(predict_fn):
+        batcher = MicroBatcher(predict_fn, max_batch_size=4, max_wait_ms=20)
+        results = await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True), timeout=5
+        )
+        batcher.close()
+        return results
+
+    # Too few outputs fail the batch, and the rows are retried one by one
+    assert asyncio.run(run(short_predict_fn)) == [0, 1, 2]
+    results = asyncio.run(run(aborting_predict_fn))
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+def test_micro_batcher_close_fails_queued_rows():
+    release = threading.Event()
+
+    def blocking_predict_fn(rows):
+        release.wait(5)
+        return rows
+
+    async def run():
+        batcher = MicroBatcher(blocking_predict_fn, max_batch_size=1, max_wait_ms=1)
+        callers = asyncio.gather(*(batcher.submit(i) for i in range(6)), return_exceptions=True)
+        # One row is in predict, the rest are queued behind it
+        await asyncio.sleep(0.05)
+        batcher.close()
+        try:
+            return await asyncio.wait_for(callers, timeout=5)
+        finally:
+            release.set()
+
+    results = asyncio.run(run())
+    assert len(results) == 6 and all(isinstance(result, RuntimeError) for result in results)
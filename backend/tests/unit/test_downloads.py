@@ -0,0 +1,44 @@
+import pytest
+from app.api.utils.downloads import (
+    RangeNotSatisfiableError, etag_matches, if_range_matches, parse_range, plan_download
+)
+
+ETAG = '"abc123"'
+
+def test_parse_range():
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    # Open-ended and suffix ranges
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=-5000", 1000) == (0, 999)
+    assert parse_range("bytes=950-5000", 1000) == (950, 999)
+    # Multi-range and malformed headers serve the whole file
+    assert parse_range("bytes=0-9,20-29", 1000) is None
+    assert parse_range("bytes=abc-", 1000) is None
+    assert parse_range("items=0-9", 1000) is None
+    assert parse_range("bytes=50-10", 1000) is None
+    with pytest.raises(RangeNotSatisfiableError):
+        parse_range("bytes=1000-", 1000)
+
+def test_etag_comparison():
+    assert etag_matches('W/"abc123"', ETAG)
+    assert etag_matches('"other", "abc123"', ETAG)
+    assert etag_matches("*", ETAG)
+    assert not etag_matches('"other"', ETAG)
+    # If-Range needs a strong match
+    assert if_range_matches(ETAG, ETAG)
+    assert not if_range_matches('W/"abc123"', ETAG)
+    assert not if_range_matches("*", ETAG)
+    assert not if_range_matches("Wed, 21 Oct 2015 07:28:00 GMT", ETAG)
+
+def test_plan_download():
+    assert plan_download(1000, ETAG, if_none_match=ETAG) == (304, 0, -1)
+    assert plan_download(1000, ETAG, "bytes=10-19") == (206, 10, 19)
+    assert plan_download(1000, ETAG, "bytes=10-19", if_range=ETAG) == (206, 10, 19)
+    # A stale or weak If-Range gets the whole file
+    assert plan_download(1000, ETAG, "bytes=10-19", if_range='"old"') == (200, 0, 999)
+    assert plan_download(1000, ETAG, "bytes=10-19", if_range='W/"abc123"') == (200, 0, 999)
+    assert plan_download(1000, None, "bytes=10-19", if_range=ETAG) == (200, 0, 999)
+    assert plan_download(1000, ETAG) == (200, 0, 999)
+    with pytest.raises(RangeNotSatisfiableError):
+        plan_download(1000, ETAG, "bytes=2000-")
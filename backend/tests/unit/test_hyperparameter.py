@@ -0,0 +1,102 @@
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from app.ml.training.hyperparameter import HyperparameterSpace, HyperparameterTuner, allocate_cores
+
+def test_allocate_cores_never_oversubscribes():
+    assert allocate_cores(8, 5, cores=64) == (8, 5, 1)
+    assert allocate_cores(4, -1, cores=64) == (4, 16, 1)
+    assert allocate_cores(4, 2, cores=64) == (4, 2, 8)
+    # More workers than cores
+    assert allocate_cores(16, 5, cores=4) == (4, 1, 1)
+
+def test_parallel_search_shares_one_study(tmp_path):
+    rng = np.random.RandomState(0)
+    X = rng.randn(120, 4)
+    y = (X[:, 0] > 0).astype(int)
+    space = HyperparameterSpace(parameters={"C": {"type": "float", "low": 1e-3, "high": 10.0, "log": True}})
+    storage = str(tmp_path / "study.sqlite3")
+
+    tuner = HyperparameterTuner(LogisticRegression, X, y, cv=3)
+    results = tuner.optimize(space, n_trials=6, n_workers=2, storage=storage, study_name="search")
+    # Workers stop once the shared study is full, give or take trials finishing together
+    assert 6 <= len(results["optimization_history"]) <= 7
+    assert results["best_value"] > 0.8
+
+    # The study lives on in its storage and can be continued
+    results = tuner.optimize(space, n_trials=8, n_workers=2, storage=storage, study_name="search")
+    assert len(results["optimization_history"]) >= 8
+
+def test_pruner_cuts_trials_on_small_data_fraction():
+    rng = np.random.RandomState(0)
+    X = rng.randn(400, 4)
+    y = (X[:, 0] + 0.5 * rng.randn(400) > 0).astype(int)
+    # Tiny C values are far worse, so most of the search is hopeless trials
+    space = HyperparameterSpace(parameters={"C": {"type": "float", "low": 1e-6, "high": 10.0, "log": True}})
+
+    tuner = HyperparameterTuner(LogisticRegression, X, y, cv=3, pruner="median", rungs=(0.25, 1.0))
+    results = tuner.optimize(space, n_trials=20)
+    history = results["optimization_history"]
+    pruned = [t for t in history if t["state"] == "pruned"]
+    assert pruned
+    assert all(t["steps"] < 6 for t in pruned)
+    # Completed trials report every fold of both rungs
+    assert all(t["steps"] == 6 for t in history if t["state"] == "complete")
+    assert results["best_value"] > 0.7
+
+def test_constraints_reject_parameters_before_training():
+    rng = np.random.RandomState(0)
+    X = rng.randn(120, 4)
+    y = (X[:, 0] > 0).astype(int)
+    fitted = []
+
+    def create_model(**params):
+        fitted.append(params)
+        return LogisticRegression(**params)
+
+    space = HyperparameterSpace(
+        parameters={"C": {"type": "float", "low": 1e-3, "high": 10.0, "log": True}},
+        # Three quarters of the log-scaled range are infeasible
+        constraints=[lambda params: params["C"] < 0.01]
+    )
+    tuner = HyperparameterTuner(create_model, X, y, cv=3)
+    results = tuner.optimize(space, n_trials=5)
+
+    history = results["optimization_history"]
+    # Rejected parameter sets are resampled and never reach the model
+    assert len(history) == 5
+    assert all(params["C"] < 0.01 for params in fitted)
+    assert results["rejections"] == sum(t["rejections"] for t in history) > 0
+    assert results["best_params"]["C"] < 0.01
+
+def test_infeasible_space_gives_up_after_max_rejections():
+    X = np.random.RandomState(0).randn(60, 2)
+    y = (X[:, 0] > 0).astype(int)
+    space = HyperparameterSpace(
+        parameters={"C": {"type": "float", "low": 1.0, "high": 10.0}},
+        constraints=[lambda params: params["C"] < 0.5]
+    )
+    results = HyperparameterTuner(LogisticRegression, X, y, cv=3).optimize(space, n_trials=5, max_rejections=8)
+    assert results["best_params"] is None and results["best_value"] is None
+    assert results["optimization_history"] == []
+    assert results["rejections"] == 8
+
+def test_optimize_keeps_configured_cv_jobs():
+    X = np.random.RandomState(0).randn(60, 2)
+    y = (X[:, 0] > 0).astype(int)
+    space = HyperparameterSpace(parameters={"C": {"type": "float", "low": 0.1, "high": 10.0}})
+    tuner = HyperparameterTuner(LogisticRegression, X, y, cv=3, cv_jobs=-1)
+    tuner.optimize(space, n_trials=2)
+    # -1 still means all of the worker's share on the next call
+    assert tuner.cv_jobs == -1
+    assert tuner.fold_jobs >= 1
+
+def test_rungs_with_splitter_object():
+    from sklearn.model_selection import KFold
+
+    X = np.random.RandomState(0).randn(80, 2)
+    y = (X[:, 0] > 0).astype(int)
+    space = HyperparameterSpace(parameters={"C": {"type": "float", "low": 0.1, "high": 10.0}})
+    tuner = HyperparameterTuner(LogisticRegression, X, y, cv=KFold(3), rungs=(0.5, 1.0))
+    results = tuner.optimize(space, n_trials=2)
+    # Each trial reports every fold of both rungs
+    assert all(t["steps"] == 6 for t in results["optimization_history"])
@@ -0,0 +1,43 @@
+import asyncio
+from app.api.utils.job_events import JobEventBroadcaster
+
+def test_broadcaster_fans_out_coalesced_deltas():
+    state = {"status": "running", "progress": 0.0}
+    reads = []
+
+    def fetch(job_id):
+        reads.append(job_id)
+        return dict(state)
+
+    async def follow(broadcaster, received):
+        subscription = broadcaster.subscribe("job")
+        while True:
+            delta = await subscription.get(timeout=5)
+            if delta:
+                received.append(delta)
+            elif subscription.closed:
+                return
+
+    async def run():
+        broadcaster = JobEventBroadcaster(fetch, final_statuses=["completed"], interval=0.05, poll_interval=5)
+        clients = [[] for _ in range(20)]
+        tasks = [asyncio.create_task(follow(broadcaster, received)) for received in clients]
+        await asyncio.sleep(0.02)
+        for step in range(1, 101):
+            state["progress"] = step / 100
+            broadcaster.notify("job")
+            await asyncio.sleep(0.002)
+        state["status"] = "completed"
+        broadcaster.notify("job")
+        await asyncio.wait_for(asyncio.gather(*tasks), 5)
+        return clients
+
+    clients = asyncio.run(run())
+    # One upstream reader for every client, and far fewer reads than updates
+    assert len(reads) < 20
+    for received in clients:
+        assert received[0]["status"] == "running"
+        final = {}
+        for delta in received:
+            final.update(delta)
+        assert final == {"status": "completed", "progress": 1.0}
@@ -0,0 +1,75 @@
+import time
+from app.api.utils.job_store import JobStore, new_job_id
+
+def make_job(store, status="queued", submitted_at=None, owner=None):
+    job_id = new_job_id()
+    store.create({
+        "id": job_id,
+        "status": status,
+        "config": {"model_id": "m"},
+        "owner": owner,
+        "submitted_at": submitted_at or time.time()
+    })
+    return job_id
+
+def test_job_store_batches_progress_writes(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"), flush_interval=60)
+    other = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = make_job(store)
+
+    store.update(job_id, {"progress": 0.5})
+    assert store.get(job_id)["progress"] == 0.5
+    assert other.get(job_id)["progress"] == 0.0
+    assert store.flush() == 1
+    assert other.get(job_id)["progress"] == 0.5
+
+    # Status changes are written at once, together with pending progress
+    store.update(job_id, {"progress": 1.0})
+    store.update(job_id, {"status": "completed", "metrics": {"loss": 0.1}})
+    record = other.get(job_id)
+    assert (record["status"], record["progress"], record["metrics"]) == ("completed", 1.0, {"loss": 0.1})
+    assert record["config"] == {"model_id": "m"}
+
+def test_job_store_pages_newest_first(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    ids = [make_job(store, status="failed" if i % 2 else "queued", submitted_at=1000 + i) for i in range(7)]
+
+    seen, cursor = [], None
+    while True:
+        records, cursor = store.page(limit=3, cursor=cursor)
+        seen.extend(record["id"] for record in records)
+        if cursor is None:
+            break
+    assert seen == ids[::-1]
+
+    records, _ = store.page(status="failed", limit=10)
+    assert [record["id"] for record in records] == [ids[5], ids[3], ids[1]]
+
+def test_job_store_fails_orphaned_jobs(tmp_path):
+    import socket
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    orphan = make_job(store, status="running", owner=f"{socket.gethostname()}:999999999")
+    live = make_job(store, status="running", owner=f"{socket.gethostname()}:1")
+    assert store.recover_orphans() == 1
+    assert store.get(orphan)["status"] == "failed"
+    assert store.get(live)["status"] == "running"
+
+def test_job_store_shares_limits_across_workers(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    other = JobStore(str(tmp_path / "jobs.sqlite3"))
+    record = lambda job_id, priority=0: {"id": job_id, "status": "queued", "priority": priority, "submitted_at": time.time()}
+
+    assert store.admit(record("a"), max_queued=2)
+    assert other.admit(record("b", priority=5), max_queued=2)
+    assert not store.admit(record("c"), max_queued=2)
+    assert other.queue_positions() == {"b": 1, "a": 2}
+
+    assert other.claim("b", max_running=1)
+    assert not store.claim("a", max_running=1)
+    assert store.counts() == {"queued": 1, "running": 1}
+
+    # A cancellation written by one worker is not overwritten by another's late report
+    store.update("b", {"status": "cancelled"})
+    assert not other.update("b", {"status": "completed"}, unless_status="cancelled")
+    assert other.get("b")["status"] == "cancelled"
+    assert store.claim("a", max_running=1)
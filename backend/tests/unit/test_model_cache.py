@@ -0,0 +1,37 @@
+import threading
+import time
+from app.ml.frameworks.model_cache import ModelCache
+
+def test_model_cache_evicts_lru_under_budget():
+    cache = ModelCache(max_bytes=100)
+    for key in ["a", "b", "c"]:
+        cache.get_or_load(key, 1, lambda: key, lambda model: 40)
+    assert cache.get_or_load("c", 1, lambda: "reloaded", lambda model: 40) == "c"
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["hits"] == 1 and stats["current_bytes"] == 80
+
+    # A new version replaces the stale entry
+    assert cache.get_or_load("c", 2, lambda: "c2", lambda model: 40) == "c2"
+    assert cache.stats()["current_bytes"] == 80
+
+def test_model_cache_coalesces_concurrent_loads():
+    cache = ModelCache()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        time.sleep(0.1)
+        return object()
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_load("m", 1, loader, lambda model: 1)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert all(result is results[0] for result in results)
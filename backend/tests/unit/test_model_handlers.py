@@ -1,5 +1,7 @@
 import pytest
 import torch
+import numpy as np
+from unittest.mock import patch
 from app.ml.frameworks.pytorch_handler import PyTorchHandler
 
 def test_pytorch_handler():
@@ -8,3 +10,398 @@ def test_pytorch_handler():
     data = torch.randn(5, 10)
     output = handler.predict(model, data)
     assert output.shape == (5, 2)
+
+def test_pytorch_handler_load_cached(tmp_path):
+    handler = PyTorchHandler()
+    path = str(tmp_path / "model.pt")
+    handler.save_model(torch.nn.Linear(10, 2).state_dict(), path)
+    first = handler.load_cached(path, key="model.pt")
+    assert handler.load_cached(path, key="model.pt") is first
+
+def test_pytorch_handler_mmap_conversion(tmp_path):
+    handler = PyTorchHandler()
+    path = str(tmp_path / "legacy.pt")
+    model = torch.nn.Linear(10, 2)
+    torch.save(model.state_dict(), path, _use_new_zipfile_serialization=False)
+
+    assert handler.convert_for_mmap(path)
+    assert not handler.convert_for_mmap(path)
+    state = handler.load_model(path, mmap=True)
+    assert torch.equal(state["weight"], model.weight)
+
+def test_pytorch_handler_refuses_untrusted_pickles(tmp_path):
+    model = torch.nn.Linear(10, 2)
+    pickled, scripted = str(tmp_path / "pickled.pt"), str(tmp_path / "scripted.pt")
+    torch.save(model, pickled)
+    torch.jit.save(torch.jit.script(model), scripted)
+
+    with pytest.raises(ValueError):
+        PyTorchHandler().load_model(pickled)
+    assert isinstance(PyTorchHandler(trust_pickled_models=True).load_model(pickled), torch.nn.Linear)
+    # TorchScript archives carry their architecture without pickled code
+    loaded = PyTorchHandler().load_model(scripted, mmap=True)
+    assert torch.equal(loaded(torch.ones(1, 10)), model(torch.ones(1, 10)))
+    with pytest.raises(ValueError):
+        PyTorchHandler().predict(model.state_dict(), torch.ones(1, 10))
+
+def test_sklearn_handler_mmap_load(tmp_path):
+    from sklearn.svm import SVC
+    from app.ml.frameworks.sklearn_handler import SklearnHandler
+    handler = SklearnHandler()
+    X, y = np.random.randn(50, 4), np.arange(50) % 2
+    path = handler.save_model(SVC().fit(X, y), str(tmp_path / "svc.joblib"))
+
+    model = handler.load_model(path, mmap_mode="r")
+    assert isinstance(model.support_vectors_, np.memmap)
+    assert model.predict(X).shape == (50,)
+
+def test_onnx_export_and_runtime_handler(tmp_path):
+    pytest.importorskip("onnxruntime")
+    from app.ml.frameworks.onnx_export import export_to_onnx
+    from app.ml.frameworks.onnx_handler import OnnxRuntimeHandler
+    model = torch.nn.Sequential(torch.nn.Linear(10, 4), torch.nn.ReLU(), torch.nn.Linear(4, 2))
+    path = export_to_onnx("pytorch", model, [10], str(tmp_path / "model.onnx"))
+
+    handler = OnnxRuntimeHandler(intra_op_threads=1)
+    session = handler.load_model(path)
+    data = np.random.randn(3, 10).astype(np.float32)
+    expected = model(torch.from_numpy(data)).detach().numpy()
+    assert np.allclose(handler.predict(session, data), expected, atol=1e-5)
+
+@pytest.mark.parametrize("compile_mode", ["trace", "script"])
+def test_pytorch_compiled_predict(compile_mode):
+    model = torch.nn.Sequential(torch.nn.Linear(10, 5), torch.nn.ReLU(), torch.nn.Dropout(0.5), torch.nn.Linear(5, 2))
+    handler = PyTorchHandler(compile_mode=compile_mode)
+    data = torch.randn(4, 10)
+
+    expected = PyTorchHandler().predict(model, data)
+    assert torch.allclose(handler.predict(model, data), expected, atol=1e-6)
+    # A different batch size reuses the compiled graph of the signature
+    handler.predict(model, torch.randn(7, 10))
+    assert len(handler._compiled[model]) == 1
+    assert handler._compiled[model][((10,), torch.float32, "cpu")] is not None
+
+def test_pytorch_compile_falls_back_to_eager():
+    class NumpyForward(torch.nn.Module):
+        def forward(self, x):
+            return torch.from_numpy(np.asarray(x) * 2)
+
+    handler = PyTorchHandler(compile_mode="script")
+    model = NumpyForward()
+    data = torch.ones(2, 3)
+    assert torch.equal(handler.predict(model, data), data * 2)
+    assert handler._compiled[model][((3,), torch.float32, "cpu")] is None
+
+def test_pytorch_train_stops_on_cancellation():
+    from app.ml.training.cancellation import CancellationToken, TrainingCancelled
+    model = torch.nn.Linear(10, 2)
+    optimizer = torch.optim.Adam(model.parameters())
+    token = CancellationToken()
+    dataset = torch.utils.data.TensorDataset(torch.randn(64, 10), torch.randint(0, 2, (64,)))
+    loader = torch.utils.data.DataLoader(dataset, batch_size=8)
+
+    class CancelAfterStep(torch.nn.CrossEntropyLoss):
+        steps = 0
+
+        def forward(self, outputs, labels):
+            self.steps += 1
+            if self.steps == 3:
+                token.cancel()
+            return super().forward(outputs, labels)
+
+    criterion = CancelAfterStep()
+    with pytest.raises(TrainingCancelled):
+        PyTorchHandler().train(model, loader, criterion, optimizer, epochs=5, device="cpu", cancel_token=token)
+    assert criterion.steps == 3
+    assert not optimizer.state and model.weight.grad is None
+
+def test_pytorch_train_resumes_from_checkpoint(tmp_path):
+    from app.ml.training.cancellation import CancellationToken, TrainingCancelled
+    from app.ml.training.checkpoint import CheckpointConfig, list_checkpoints
+    dataset = torch.utils.data.TensorDataset(torch.randn(40, 10), torch.randint(0, 2, (40,)))
+
+    def run(token=None, checkpoint=None):
+        torch.manual_seed(0)
+        model = torch.nn.Linear(10, 2)
+        optimizer = torch.optim.SGD(model.parameters(), lr=0.1, momentum=0.9)
+        loader = torch.utils.data.DataLoader(dataset, batch_size=8, shuffle=True)
+        criterion = torch.nn.CrossEntropyLoss()
+        if token is not None:
+            steps = iter(range(1, 1000))
+
+            def cancel_after_seventh_step(*_):
+                if next(steps) == 7:
+                    token.cancel()
+            criterion.register_forward_hook(cancel_after_seventh_step)
+        history = PyTorchHandler().train(
+            model, loader, criterion, optimizer, epochs=3, device="cpu",
+            cancel_token=token, checkpoint=checkpoint
+        )
+        return model, history
+
+    expected, expected_history = run()
+
+    directory = str(tmp_path / "checkpoints")
+    with pytest.raises(TrainingCancelled):
+        run(CancellationToken(), CheckpointConfig(directory=directory, every_steps=3, keep_last=2))
+    # A checkpoint queued behind a running write can be superseded, the newest always lands
+    checkpoints = list_checkpoints(directory)
+    assert len(checkpoints) <= 2 and checkpoints[-1].endswith("checkpoint-00000006.pt")
+
+    resumed, history = run(checkpoint=CheckpointConfig(directory=str(tmp_path / "resumed"), resume_from=directory))
+    assert torch.allclose(resumed.weight, expected.weight, atol=1e-6)
+    assert np.allclose(history["train_loss"], expected_history["train_loss"])
+
+def test_pytorch_gradient_accumulation_matches_large_batches():
+    dataset = torch.utils.data.TensorDataset(torch.randn(32, 10), torch.randint(0, 2, (32,)))
+
+    def run(batch_size, accumulation_steps):
+        torch.manual_seed(0)
+        model = torch.nn.Linear(10, 2)
+        optimizer = torch.optim.SGD(model.parameters(), lr=0.1)
+        loader = torch.utils.data.DataLoader(dataset, batch_size=batch_size)
+        PyTorchHandler().train(
+            model, loader, torch.nn.CrossEntropyLoss(), optimizer, epochs=2, device="cpu",
+            accumulation_steps=accumulation_steps
+        )
+        return model.weight
+
+    assert torch.allclose(run(8, 1), run(2, 4), atol=1e-5)
+
+def test_pytorch_bf16_autocast_training():
+    torch.manual_seed(0)
+    model = torch.nn.Sequential(torch.nn.Linear(10, 16), torch.nn.ReLU(), torch.nn.Linear(16, 2))
+    optimizer = torch.optim.Adam(model.parameters(), lr=0.01)
+    dataset = torch.utils.data.TensorDataset(torch.randn(64, 10), torch.randint(0, 2, (64,)))
+    loader = torch.utils.data.DataLoader(dataset, batch_size=16)
+    history = PyTorchHandler().train(
+        model, loader, torch.nn.CrossEntropyLoss(), optimizer, epochs=5, device="cpu", precision="bf16"
+    )
+    # Weights stay fp32, autocast only changes the compute dtype
+    assert model[0].weight.dtype == torch.float32
+    assert history["train_loss"][-1] < history["train_loss"][0]
+
+def test_pytorch_train_from_dataset_spec(tmp_path):
+    from app.ml.training.data import DatasetSpec, build_dataloader
+
+    path = str(tmp_path / "data.npz")
+    np.savez(path, X=np.random.randn(50, 10).astype(np.float32), y=np.random.randint(0, 2, 50))
+    spec = DatasetSpec(path=path, batch_size=16)
+    loader = build_dataloader(spec, torch.device("cpu"))
+    # TensorDatasets are gathered a whole batch at a time, without workers
+    assert loader.num_workers == 0
+    assert [len(labels) for _, labels in loader] == [16, 16, 16, 2]
+
+    model = torch.nn.Linear(10, 2)
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.1)
+    history = PyTorchHandler().train(model, spec, torch.nn.CrossEntropyLoss(), optimizer, epochs=2, device="cpu")
+    assert len(history["data_wait_time"]) == len(history["compute_time"]) == 2
+    assert all(seconds > 0 for seconds in history["compute_time"])
+
+    # A prebuilt training loader with a validation spec
+    history = PyTorchHandler().train(
+        model, loader, torch.nn.CrossEntropyLoss(), optimizer, epochs=1, device="cpu", val_loader=spec
+    )
+    assert len(history["val_loss"]) == 1
+
+def test_rank_core_sets_stay_numa_local():
+    from app.ml.training.distributed import parse_cpu_list, rank_core_sets
+
+    assert parse_cpu_list("0-2,5\n") == [0, 1, 2, 5]
+    nodes = [[0, 1, 2, 3], [4, 5, 6, 7]]
+    with patch("app.ml.training.distributed.available_cores", return_value=list(range(8))):
+        assert rank_core_sets(2, nodes) == nodes
+        assert rank_core_sets(4, nodes) == [[0, 1], [2, 3], [4, 5], [6, 7]]
+
+def _train_rank(spec, checkpoint):
+    from app.ml.training.instrumentation import peak_rss_mb
+    torch.manual_seed(torch.distributed.get_rank())
+    model = torch.nn.Linear(10, 2)
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.1)
+    history = PyTorchHandler().train(
+        model, spec, torch.nn.CrossEntropyLoss(), optimizer, epochs=2, device="cpu", checkpoint=checkpoint
+    )
+    # DistributedDataParallel keeps every rank's replica identical
+    weights = [torch.empty_like(model.weight) for _ in range(torch.distributed.get_world_size())]
+    torch.distributed.all_gather(weights, model.weight.detach())
+    return history, all(torch.equal(weights[0], other) for other in weights), peak_rss_mb()
+
+def test_pytorch_data_parallel_training(tmp_path):
+    from app.ml.training.checkpoint import CheckpointConfig, list_checkpoints, load_checkpoint
+    from app.ml.training.data import DatasetSpec
+    from app.ml.training.distributed import launch
+
+    path = str(tmp_path / "data.npz")
+    np.savez(path, X=np.random.randn(64, 10).astype(np.float32), y=np.random.randint(0, 2, 64))
+    directory = str(tmp_path / "checkpoints")
+
+    history, replicas_equal, rank_peak_rss = launch(
+        _train_rank, (DatasetSpec(path=path, batch_size=8), CheckpointConfig(directory=directory)),
+        world_size=2, pin_cores=False
+    )
+    assert replicas_equal
+    assert len(history["train_loss"]) == 2
+    # The job's memory is that of both ranks
+    assert history["peak_rss_mb"][-1] > 1.5 * rank_peak_rss
+    # Each rank trained on half of the data: 4 steps per epoch
+    assert load_checkpoint(list_checkpoints(directory)[-1])["step"] == 8
+
+def _reduce_mismatched_metrics():
+    # Ranks report different metrics, in a different order
+    if torch.distributed.get_rank() == 0:
+        metrics = {"train_loss": 1.0, "samples_per_second": 10.0, "step_time_p50": 0.2}
+    else:
+        metrics = {"peak_rss_mb": 100.0, "optimizer_time": 0.5, "samples_per_second": 30.0, "train_loss": 3.0}
+    return PyTorchHandler._reduce_over_ranks(metrics)
+
+def test_reduce_over_ranks_with_mismatched_metrics():
+    from app.ml.training.distributed import launch
+
+    metrics = launch(_reduce_mismatched_metrics, (), world_size=2, pin_cores=False)
+    assert metrics == {
+        "train_loss": 2.0, "samples_per_second": 40.0, "step_time_p50": 0.2,
+        "optimizer_time": 0.5, "peak_rss_mb": 100.0
+    }
+
+def test_early_stopping_patience_and_min_delta():
+    from app.ml.training.early_stopping import EarlyStopping
+
+    stopper = EarlyStopping(monitor="val_loss", patience=2, min_delta=0.1)
+    losses = [1.0, 0.5, 0.45, 0.42]
+    stops = [stopper.update(epoch, {"val_loss": loss}, lambda: epoch) for epoch, loss in enumerate(losses, 1)]
+    # 0.45 and 0.42 are within min_delta of 0.5, the second of them exhausts the patience
+    assert stops == [False, False, False, True]
+    assert stopper.best_epoch == 2 and stopper.best_weights == 2 and stopper.stopped_epoch == 4
+    assert EarlyStopping(monitor="val_score").mode == "max"
+
+def test_pytorch_early_stopping_restores_best_weights():
+    from app.ml.training.early_stopping import EarlyStopping
+
+    torch.manual_seed(0)
+    model = torch.nn.Linear(10, 2)
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.1)
+    train = torch.utils.data.TensorDataset(torch.randn(32, 10), torch.randint(0, 2, (32,)))
+    # Labels unrelated to the inputs: validation loss stops improving quickly
+    val = torch.utils.data.TensorDataset(torch.randn(32, 10), torch.randint(0, 2, (32,)))
+    stopper = EarlyStopping(patience=2)
+    history = PyTorchHandler().train(
+        model, torch.utils.data.DataLoader(train, batch_size=8), torch.nn.CrossEntropyLoss(), optimizer,
+        epochs=100, device="cpu", val_loader=torch.utils.data.DataLoader(val, batch_size=8), early_stopping=stopper
+    )
+    assert stopper.stopped_epoch == len(history["val_loss"]) < 100
+    assert min(history["val_loss"]) == stopper.best == history["val_loss"][stopper.best_epoch - 1]
+    restored = PyTorchHandler().evaluate(model, torch.utils.data.DataLoader(val, batch_size=8), torch.nn.CrossEntropyLoss(), "cpu")
+    assert restored == pytest.approx(stopper.best)
+
+def test_sklearn_incremental_training_with_early_stopping():
+    from sklearn.linear_model import SGDClassifier
+    from app.ml.frameworks.sklearn_handler import SklearnHandler
+    from app.ml.training.early_stopping import EarlyStopping
+
+    rng = np.random.RandomState(0)
+    X = rng.randn(200, 5)
+    y = (X[:, 0] > 0).astype(int)
+    stopper = EarlyStopping(monitor="val_score", patience=2)
+    history = SklearnHandler().train(
+        SGDClassifier(random_state=0), X[:150], y[:150], X_val=X[150:], y_val=y[150:],
+        epochs=50, early_stopping=stopper
+    )
+    assert len(history["val_score"]) == stopper.stopped_epoch < 50
+    assert stopper.best == max(history["val_score"])
+
+def test_pytorch_training_step_metrics():
+    model = torch.nn.Sequential(torch.nn.Embedding(100, 8), torch.nn.Flatten(), torch.nn.Linear(8 * 12, 2))
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.1)
+    dataset = torch.utils.data.TensorDataset(torch.randint(0, 100, (40, 12)), torch.randint(0, 2, (40,)))
+    history = PyTorchHandler().train(
+        model, torch.utils.data.DataLoader(dataset, batch_size=8), torch.nn.CrossEntropyLoss(), optimizer,
+        epochs=2, device="cpu"
+    )
+    for name in ["samples_per_second", "tokens_per_second", "step_time_p50", "step_time_p99",
+                 "data_wait_time", "compute_time", "optimizer_time", "peak_rss_mb"]:
+        assert len(history[name]) == 2
+    # 12 tokens per sample
+    assert history["tokens_per_second"][0] == pytest.approx(12 * history["samples_per_second"][0])
+    assert history["step_time_p50"][0] <= history["step_time_p95"][0] <= history["step_time_p99"][0]
+
+def test_tensorflow_streams_tf_data_pipeline(tmp_path):
+    tf = pytest.importorskip("tensorflow")
+    from app.ml.frameworks.tensorflow_handler import TensorFlowHandler
+    from app.ml.training.tf_data import TFDataSpec, build_tf_dataset
+
+    for shard in range(3):
+        X = np.random.randn(40, 4)
+        np.savetxt(
+            tmp_path / f"part-{shard}.csv", np.column_stack([X, X[:, 0] > 0]),
+            delimiter=",", header="a,b,c,d,label", comments=""
+        )
+    spec = TFDataSpec(
+        file_pattern=str(tmp_path / "part-*.csv"), batch_size=16, shuffle_buffer=64,
+        cache_path=str(tmp_path / "cache" / "train")
+    )
+    inputs, labels = next(iter(build_tf_dataset(spec)))
+    assert inputs.shape == (16, 4) and labels.shape == (16,)
+
+    model = tf.keras.Sequential([tf.keras.Input((4,)), tf.keras.layers.Dense(1, activation="sigmoid")])
+    model.compile(optimizer="adam", loss="binary_crossentropy")
+    history = TensorFlowHandler().train(model, spec, epochs=2)
+    assert len(history["loss"]) == 2 and len(history["samples_per_second"]) == 2
+
+def test_sklearn_chunked_training(tmp_path):
+    import pandas as pd
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.linear_model import SGDClassifier
+    from app.ml.frameworks.sklearn_handler import SklearnHandler
+    from app.ml.training.chunks import ChunkedDataset, Holdout
+
+    rng = np.random.RandomState(0)
+    X = rng.randn(5000, 4)
+    frame = pd.DataFrame(X, columns=["a", "b", "c", "d"]).assign(label=(X[:, 0] + X[:, 1] > 0).astype(int))
+    path = str(tmp_path / "data.csv")
+    frame.to_csv(path, index=False)
+    dataset = ChunkedDataset(path=path, chunk_size=500)
+    chunks = []
+
+    history = SklearnHandler().train(
+        SGDClassifier(random_state=0), dataset, epochs=3, holdout_size=300,
+        chunk_callback=lambda epoch, chunk, rows, seconds: chunks.append((epoch, rows))
+    )
+    assert len(history["chunk_time"]) == len(chunks) == 30
+    # The sample is fixed after the first epoch, which also skips rows it later gave back
+    trained = [sum(rows for epoch, rows in chunks if epoch == e) for e in (1, 2, 3)]
+    assert trained[0] < trained[1] == trained[2] == 4700
+    assert history["holdout_score"][-1] > 0.9
+    assert len(history["step_time_p95"]) == 3
+
+    # The held-out rows come from the whole file, not its first chunks
+    holdout = Holdout(size=300)
+    for index, chunk in enumerate(dataset.chunks()):
+        holdout.split(index, *dataset.split(chunk))
+    assert len(holdout) == 300 and len(set(holdout.chunks.tolist())) == 10
+
+    history = SklearnHandler().train(MiniBatchKMeans(n_clusters=2, random_state=0, n_init=1), dataset, epochs=1)
+    assert history["holdout_score"][0] < 0
+    # A named target is not a feature of an unsupervised model
+    model = MiniBatchKMeans(n_clusters=2, random_state=0, n_init=1)
+    SklearnHandler().train(model, ChunkedDataset(path=path, chunk_size=500, target_column="label"), epochs=1)
+    assert model.n_features_in_ == 4
+
+def test_sklearn_fits_chunked_dataset_in_memory(tmp_path):
+    import pandas as pd
+    from sklearn.linear_model import LogisticRegression
+    from app.ml.frameworks.sklearn_handler import SklearnHandler
+    from app.ml.training.chunks import ChunkedDataset
+
+    X = np.random.RandomState(0).randn(300, 3)
+    frame = pd.DataFrame(X, columns=["a", "b", "c"]).assign(label=(X[:, 0] > 0).astype(int))
+    frame[:200].to_csv(tmp_path / "train.csv", index=False)
+    frame[200:].to_csv(tmp_path / "val.csv", index=False)
+    epochs = []
+
+    # Without partial_fit the chunks are read into one array and fitted once
+    history = SklearnHandler().train(
+        LogisticRegression(), ChunkedDataset(path=str(tmp_path / "train.csv"), chunk_size=64),
+        X_val=ChunkedDataset(path=str(tmp_path / "val.csv")), epoch_callback=lambda epoch, h: epochs.append(epoch)
+    )
+    assert epochs == [1]
+    assert history["val_score"][0] > 0.9 and len(history["samples_per_second"]) == 1
@@ -0,0 +1,79 @@
+import pytest
+import os
+from app.api.utils.blob_store import BlobStore
+from app.api.utils.model_index import ModelIndex
+
+def _stage(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+def test_blob_store_deduplicates_and_collects(tmp_path):
+    store = BlobStore(str(tmp_path / "models"))
+    digest = "ab" * 32
+
+    assert not store.put(_stage(tmp_path, "1.part", b"weights"), digest, "a_1.pt")
+    assert store.put(_stage(tmp_path, "2.part", b"weights"), digest, "b_1.pt")
+    assert store.refcount(digest) == 2
+    assert store.digest("b_1.pt") == digest
+    assert sorted(store.list_ids()) == ["a_1.pt", "b_1.pt"]
+
+    assert store.delete("a_1.pt")
+    assert os.path.exists(store.blob_path(digest))
+    assert store.delete("b_1.pt")
+    assert not os.path.exists(store.blob_path(digest))
+
+def test_blob_store_rejects_path_traversal(tmp_path):
+    store = BlobStore(str(tmp_path / "models"))
+    assert store.resolve("../secret") is None
+    with pytest.raises(ValueError):
+        store.put(_stage(tmp_path, "1.part", b"x"), "cd" * 32, "../escape.pt")
+
+def test_model_index_cursor_pagination(tmp_path):
+    index = ModelIndex(str(tmp_path / "index.sqlite3"))
+    for i in range(5):
+        index.upsert({
+            "id": f"m{i}.pt", "name": f"m{i}", "framework": "pytorch" if i % 2 else "tensorflow",
+            "status": "available", "size": i, "created_at": f"2024-01-0{i + 1}"
+        })
+
+    page, cursor = index.page(limit=2, sort_by="size", descending=True)
+    assert [r["id"] for r in page] == ["m4.pt", "m3.pt"]
+    page, cursor = index.page(limit=2, sort_by="size", descending=True, cursor=cursor)
+    assert [r["id"] for r in page] == ["m2.pt", "m1.pt"]
+
+    page, cursor = index.page(framework="pytorch")
+    assert [r["id"] for r in page] == ["m1.pt", "m3.pt"] and cursor is None
+
+def test_model_index_update_never_restores_deleted_models(tmp_path):
+    index = ModelIndex(str(tmp_path / "index.sqlite3"))
+    index.upsert({
+        "id": "m.pt", "name": "m", "framework": "pytorch", "status": "available", "size": 1,
+        "created_at": "2024-01-01"
+    })
+    record = index.update("m.pt", {"description": "tuned", "params": {"layers": 2}})
+    assert record["description"] == "tuned" and record["params"] == {"layers": 2}
+
+    index.delete("m.pt")
+    assert index.update("m.pt", {"description": "late"}) is None
+    assert index.get("m.pt") is None
+
+def test_blob_store_imports_legacy_model_files(tmp_path):
+    root = tmp_path / "models"
+    root.mkdir()
+    (root / "my_model_20240101_120000.pt").write_bytes(b"weights")
+    (root / "index.sqlite3").write_bytes(b"")
+    store = BlobStore(str(root))
+
+    assert store.import_files(str(root), [".pt"]) == 1
+    assert store.import_files(str(root), [".pt"]) == 0
+    assert not (root / "my_model_20240101_120000.pt").exists()
+    path = store.resolve("my_model_20240101_120000.pt")
+    with open(path, "rb") as buffer:
+        assert buffer.read() == b"weights"
+    # Refs share the blob, so stored content is read-only
+    assert not os.stat(path).st_mode & 0o222
+
+    index = ModelIndex(str(tmp_path / "index.sqlite3"))
+    assert index.sync(store) == 1
+    assert index.get("my_model_20240101_120000.pt")["name"] == "my_model"
@@ -0,0 +1,129 @@
+import pytest
+import threading
+import time
+from app.ml.training.scheduler import SchedulerFullError, TrainingScheduler
+
+def quick_task(job_id, duration, report, cancel_token):
+    for _ in range(int(duration * 10)):
+        cancel_token.raise_if_cancelled()
+        time.sleep(0.1)
+    report(progress=1.0)
+    report(status="completed")
+
+def crashing_task(job_id, report, cancel_token):
+    import os
+    os._exit(3)
+
+def stuck_task(job_id, report, cancel_token):
+    time.sleep(60)
+
+class JobUpdates:
+    def __init__(self):
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, job_id, changes):
+        with self.lock:
+            self.jobs.setdefault(job_id, {}).update(changes)
+
+    def wait_finished(self, job_ids, timeout=30):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            with self.lock:
+                if all("finished_at" in self.jobs.get(job_id, {}) for job_id in job_ids):
+                    return
+            time.sleep(0.05)
+        raise TimeoutError(job_ids)
+
+def test_scheduler_orders_by_priority_and_rejects_overflow():
+    scheduler = TrainingScheduler(quick_task, JobUpdates(), max_running=0, max_queued=3)
+    try:
+        assert scheduler.submit("first", (0,)) == 1
+        assert scheduler.submit("low", (0,), priority=0) == 2
+        assert scheduler.submit("high", (0,), priority=5) == 1
+        assert [scheduler.queue_position(job_id) for job_id in ["high", "first", "low"]] == [1, 2, 3]
+        with pytest.raises(SchedulerFullError):
+            scheduler.submit("overflow", (0,))
+        assert scheduler.cancel("first")
+        assert scheduler.queue_position("low") == 2
+    finally:
+        scheduler.shutdown()
+
+def test_scheduler_caps_running_jobs():
+    updates = JobUpdates()
+    scheduler = TrainingScheduler(quick_task, updates, max_running=1)
+    try:
+        for job_id in ["a", "b", "c"]:
+            scheduler.submit(job_id, (0.2,))
+        updates.wait_finished(["a", "b", "c"])
+        jobs = sorted(updates.jobs.values(), key=lambda job: job["started_at"])
+        assert all(job["status"] == "completed" and job["progress"] == 1.0 for job in jobs)
+        assert all(prev["finished_at"] <= job["started_at"] for prev, job in zip(jobs, jobs[1:]))
+    finally:
+        scheduler.shutdown()
+
+def test_scheduler_fails_crashed_and_overrunning_workers():
+    updates = JobUpdates()
+    crashed = TrainingScheduler(crashing_task, updates, max_running=2)
+    slow = TrainingScheduler(quick_task, updates, max_running=2, max_run_time=0.5)
+    try:
+        crashed.submit("crashed")
+        slow.submit("slow", (30,))
+        updates.wait_finished(["crashed", "slow"])
+        assert updates.jobs["crashed"]["status"] == "failed"
+        assert "code 3" in updates.jobs["crashed"]["error_message"]
+        assert updates.jobs["slow"]["status"] == "failed"
+        assert "maximum time" in updates.jobs["slow"]["error_message"]
+    finally:
+        crashed.shutdown()
+        slow.shutdown()
+
+def test_scheduler_cancels_running_jobs():
+    updates = JobUpdates()
+    scheduler = TrainingScheduler(quick_task, updates, max_running=2, cancel_grace_period=30)
+    stuck = TrainingScheduler(stuck_task, updates, max_running=2, cancel_grace_period=0.5)
+    try:
+        scheduler.submit("cooperative", (60,))
+        stuck.submit("stuck")
+        while not (scheduler.is_running("cooperative") and stuck.is_running("stuck")):
+            time.sleep(0.05)
+        time.sleep(1)
+        assert scheduler.cancel("cooperative") and stuck.cancel("stuck")
+        updates.wait_finished(["cooperative", "stuck"], timeout=10)
+        assert updates.jobs["cooperative"]["status"] == "cancelled"
+        assert updates.jobs["stuck"]["status"] == "cancelled"
+        assert not scheduler.is_running("cooperative")
+    finally:
+        scheduler.shutdown()
+        stuck.shutdown()
+
+def test_scheduler_waits_for_claimed_slot():
+    updates = JobUpdates()
+    slot = threading.Event()
+    scheduler = TrainingScheduler(quick_task, updates, max_running=1, claim=lambda job_id: slot.is_set())
+    try:
+        scheduler.submit("waiting", (0,))
+        time.sleep(0.5)
+        assert scheduler.queue_position("waiting") == 1
+        slot.set()
+        updates.wait_finished(["waiting"])
+        assert updates.jobs["waiting"]["status"] == "completed"
+    finally:
+        scheduler.shutdown()
+
+def test_scheduler_backs_off_refused_claims():
+    claims = []
+
+    def refuse(job_id):
+        claims.append(time.monotonic())
+        return False
+
+    scheduler = TrainingScheduler(quick_task, JobUpdates(), max_running=1, poll_interval=0.01, claim=refuse)
+    try:
+        scheduler.submit("waiting", (0,))
+        time.sleep(1.5)
+        # Polling every 0.01s would claim about 150 times, the back-off doubles the wait instead
+        assert 3 <= len(claims) <= 12
+        assert claims[-1] - claims[-2] > 0.2
+    finally:
+        scheduler.shutdown()
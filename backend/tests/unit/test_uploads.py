@@ -0,0 +1,52 @@
+import pytest
+import asyncio
+import hashlib
+from app.api.utils.uploads import (
+    UploadSessionStore, UploadTooLargeError, UploadOffsetError, stream_to_file
+)
+
+async def _chunks(data, size):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+def test_stream_to_file_enforces_max_size(tmp_path):
+    path = str(tmp_path / "model.part")
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(stream_to_file(_chunks(b"x" * 100, 10), path, max_size=50, chunk_size=16))
+    assert (tmp_path / "model.part").stat().st_size == 0
+
+def test_upload_session_resume(tmp_path):
+    store = UploadSessionStore(str(tmp_path), chunk_size=16)
+    data = bytes(range(256)) * 4
+    session = store.create("model.pt", total_size=len(data))
+    upload_id = session["upload_id"]
+
+    asyncio.run(store.append(upload_id, _chunks(data[:300], 7), 0, max_size=len(data)))
+    with pytest.raises(UploadOffsetError):
+        asyncio.run(store.append(upload_id, _chunks(data[:300], 7), 0, max_size=len(data)))
+
+    # A fresh store has lost the running hash and must recompute it
+    store = UploadSessionStore(str(tmp_path), chunk_size=16)
+    offset = store.get(upload_id)["offset"]
+    asyncio.run(store.append(upload_id, _chunks(data[offset:], 50), offset, max_size=len(data)))
+    part_path, size, digest = asyncio.run(store.finalize(upload_id))
+    assert size == len(data)
+    assert digest == hashlib.sha256(data).hexdigest()
+
+def test_interrupted_append_keeps_digest(tmp_path):
+    store = UploadSessionStore(str(tmp_path), chunk_size=16)
+    data = bytes(range(256)) * 4
+    upload_id = store.create("model.pt", total_size=len(data))["upload_id"]
+    asyncio.run(store.append(upload_id, _chunks(data[:100], 10), 0, max_size=len(data)))
+
+    async def dropped():
+        yield data[100:150]
+        raise ConnectionResetError()
+
+    with pytest.raises(ConnectionResetError):
+        asyncio.run(store.append(upload_id, dropped(), 100, max_size=len(data)))
+    assert store.get(upload_id)["offset"] == 100
+
+    asyncio.run(store.append(upload_id, _chunks(data[100:], 10), 100, max_size=len(data)))
+    part_path, size, digest = asyncio.run(store.finalize(upload_id))
+    assert digest == hashlib.sha256(data).hexdigest()